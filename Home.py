@@ -1,30 +1,30 @@
-from asyncio import events
 import streamlit as st
-import pandas as pd
 from components.intro import render_intro
 import time
-from utils.getLatestFiles import get_latest_master_events, get_latest_master_matches, get_latest_master_players
+from utils.appGetFiles import get_app_summary, get_leaderboards
 # Import the functions from your utility and component folders
 
 
-with st.spinner('Loading Data...'):    
-    events_df = get_latest_master_events()
-    matches_df, update_date = get_latest_master_matches()
-    players_df = get_latest_master_players()
-
+# Must be the first Streamlit call of the page
 st.set_page_config(
     page_title="Table Tennis Stats Dashboard",
     page_icon="🏓",
     layout="wide"
 )
 
+# The landing page only reads the small summary artifact; each page loads the datasets
+# (and columns) it declares through utils.appGetFiles.load_page_data
+with st.spinner('Loading Data...'):    
+    summary = get_app_summary()
+    leaderboards_df = get_leaderboards()
+
 
 st.title("🏓 Table Tennis Stats Exploration📈 ")
 
 st.markdown("Author: **Marcus Annegarn**")
 
 now_date = time.strftime("%Y-%m-%d")
-update_date = update_date.strftime("%Y-%m-%d")
+update_date = summary["update_date"]
 if update_date == now_date:
     update_date = "Today"
     st.markdown(f"Today's Date: {now_date} | Data Updated: {update_date} ✔️")
@@ -40,7 +40,7 @@ else:
 
 
 
-theme = render_intro(events_df, matches_df, players_df)
+theme = render_intro(summary, leaderboards_df)
 # Page config and Title (These must be in app.py)
 
 
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from components.intro import render_intro
-from utils.appGetFiles import get_app_data
+from utils.appGetFiles import get_app_summary
 # Import the functions from your utility and component folders
 
 # import components.intro
@@ -15,9 +15,9 @@ st.set_page_config(
 
 st.title("🏓 Table Tennis Stats Exploration📈 ")
 
-master_events_df, master_matches_df, master_players_df = get_app_data()
+summary = get_app_summary()
 
-theme = render_intro(master_events_df, master_matches_df, master_players_df)
+theme = render_intro(summary)
 
 
 # Load all data (This calls your cached function)
@@ -3,9 +3,10 @@ from calendar import c
 import streamlit as st
 import pandas as pd
 from streamlit_theme import st_theme
+from components.leaderboards import render_leaderboards
 
 
-def render_intro(master_events_df,  master_matches_df, master_players_df):
+def render_intro(summary, leaderboards_df=None):
 
     theme_dict = st_theme() # Call the component ONCE
         
@@ -57,22 +58,23 @@ def render_intro(master_events_df,  master_matches_df, master_players_df):
 
     
 
-    if not master_matches_df.empty and not master_players_df.empty and not master_events_df.empty:
+    # summary: dataset metrics from utils.appGetFiles.get_app_summary (no master data is loaded here)
+    if summary["total_matches"] and summary["total_players"] and summary["total_events"]:
         with st.expander("Dataset Scope", expanded=True):        
         # Create 4 columns for the high-level stats
             col1, col2, col3= st.columns(3)
 
           
-            col3.metric("Total Matches", f"{len(master_matches_df):,}")
-            col3.metric("Total Players", f"{len(master_players_df):,}")
+            col3.metric("Total Matches", f"{summary['total_matches']:,}")
+            col3.metric("Total Players", f"{summary['total_players']:,}")
 
 
-            total_womens_count = len(master_matches_df[master_matches_df["subEventName"].str.contains("women", case=False)])
-            female_count = len(master_players_df[master_players_df["Gender"] == "F"])
-            male_count = len(master_players_df[master_players_df["Gender"] == "M"])
+            total_womens_count = summary["womens_matches"]
+            female_count = summary["female_players"]
+            male_count = summary["male_players"]
 
             col1.metric("Women's Matches", f"{total_womens_count:,}   ")
-            col2.metric("Men's Matches", f"{len(master_matches_df) - total_womens_count:,}  ")
+            col2.metric("Men's Matches", f"{summary['mens_matches']:,}  ")
 
             
             col1.metric("Women's Players", f"{female_count:,}")
@@ -86,16 +88,14 @@ def render_intro(master_events_df,  master_matches_df, master_players_df):
         # Create 4 columns for the high-level stats
             col1, col2 = st.columns(2)
               #########################
-            total_event_count = len(master_events_df)
+            total_event_count = summary["total_events"]
             col2.metric("Total Events", f"{total_event_count:,}")
 
-            first_event = master_events_df.iloc[0]
-            first_event_name = first_event["EventName"]
-            first_event_date = first_event["StartDate"]
+            first_event_name = summary["first_event_name"]
+            first_event_date = summary["first_event_date"]
             
-            last_event = master_events_df.iloc[-1]
-            last_event_name = last_event["EventName"]
-            last_event_date = last_event["StartDate"]                
+            last_event_name = summary["last_event_name"]
+            last_event_date = summary["last_event_date"]                
          
             col1.metric(f"Earliest Event - **{first_event_date}**", f"{first_event_name}")
             col1.metric(f"Latest Event - **{last_event_date}**", f"{last_event_name}")
@@ -103,4 +103,6 @@ def render_intro(master_events_df,  master_matches_df, master_players_df):
 
     
         st.header("🏆 Player Leaderboards (Top 5)")
+        if leaderboards_df is not None:
+            render_leaderboards(leaderboards_df, top_n=5)
         return theme
\ No newline at end of file
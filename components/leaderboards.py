@@ -0,0 +1,32 @@
+import streamlit as st
+from utils.leaderboards import LEADERBOARD_METRICS, get_leaderboard
+
+
+def render_leaderboards(leaderboards_df, top_n: int = 5):
+    """
+    Renders the men's and women's top-N of every leaderboard metric, side by side,
+    from the precomputed leaderboards artifact (utils.appGetFiles.get_leaderboards).
+    """
+    if leaderboards_df.empty:
+        st.info("No leaderboards found - run the leaderboards step of the pipeline.")
+        return
+
+    columns = st.columns(len(LEADERBOARD_METRICS))
+    for col, (metric, title) in zip(columns, LEADERBOARD_METRICS.items()):
+        with col:
+            st.subheader(title)
+            for gender, label in [("M", "Men"), ("F", "Women")]:
+                st.markdown(f"##### {label}")
+                st.dataframe(
+                    get_leaderboard(leaderboards_df, gender, metric, top_n)[["HeadShot", "flagUrl", "playerName", metric]],
+                    hide_index=True,
+                    width="stretch",
+                    column_config={
+                        "HeadShot": st.column_config.ImageColumn("", width="small"),
+                        "flagUrl": st.column_config.ImageColumn("", width="small"),
+                        "playerName": st.column_config.TextColumn("Player", width="medium"),
+                        "totalMatches": st.column_config.NumberColumn("Matches", format="%d"),
+                        "WinRate": st.column_config.ProgressColumn("Win Rate", format="%.1f%%", min_value=0, max_value=100),
+                        "ratingFinal": st.column_config.NumberColumn("Rating", format="%.0f"),
+                    },
+                )
@@ -12,8 +12,8 @@ from streamlit_theme import st_theme
 
 try:
     from utils.getLatestFiles import get_latest_master_players, get_latest_master_matches, get_latest_master_events
-    from utils.glickoHelpers import calculate_glicko2_ratings, get_final_player_stats
-    from utils.winrates import get_player_winrates
+    from utils.appGetFiles import get_leaderboards
+    from utils.leaderboards import get_leaderboard
 except ImportError:
     st.error("Could not import helper functions. Make sure 'utils/getLatestFiles.py' exists.")
     st.stop()
@@ -139,71 +139,11 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
    
     st.header("🏆 Player Leaderboards (Top 5)")
 
-    # --- Helper Function to prepare all data (cached for performance) ---
-    def get_leaderboard_data(players_df, matches_df):
-        """
-        Runs all Glicko and WinRate calculations for Men and Women
-        and merges final player metadata for display.
-        """
-        # 1. Get player ID sets for filtering
-        men_player_ids = set(players_df[players_df['Gender'] == 'M']['playerId'])
-        women_player_ids = set(players_df[players_df['Gender'] == 'F']['playerId'])
-        
-        # 2. Filter matches
-        men_matches_filter = matches_df['winnerId'].isin(men_player_ids) & \
-                             matches_df['loserId'].isin(men_player_ids)
-        men_matches = matches_df[men_matches_filter]
-        
-        women_matches_filter = matches_df['winnerId'].isin(women_player_ids) & \
-                               matches_df['loserId'].isin(women_player_ids)
-        women_matches = matches_df[women_matches_filter]
-
-        # 3. Filter players
-        men_players = players_df[players_df['Gender'] == 'M']
-        women_players = players_df[players_df['Gender'] == 'F']
-
-        # 4. Run your Glicko and WinRate functions
-        men_ratings_hist_df = calculate_glicko2_ratings(men_players, men_matches)
-        women_ratings_hist_df = calculate_glicko2_ratings(women_players, women_matches)
-
-        men_winrates_df = get_player_winrates(men_players, men_matches, min_matches=10)
-        women_winrates_df = get_player_winrates(women_players, women_matches, min_matches=10)
-
-        men_final_stats_df = get_final_player_stats(men_ratings_hist_df)
-        women_final_stats_df = get_final_player_stats(women_ratings_hist_df)
-        
-        # 5. Merge WinRate stats
-        men_stats = men_final_stats_df.merge(
-            men_winrates_df[['playerId', 'WinRate']], on='playerId', how='left'
-        )
-        women_stats = women_final_stats_df.merge(
-            women_winrates_df[['playerId', 'WinRate']], on='playerId', how='left'
-        )
-        
-        # --- 6. *** NEW FIX: Merge Player Metadata *** ---
-        # ADD 'Gender' to this list
-        metadata_cols = ['playerId', 'HeadShot', 'flagUrl', 'Gender'] 
-        
-        men_stats = men_stats.merge(
-            players_df[metadata_cols], # Pass 'Gender' from the main players_df
-            on='playerId',
-            how='left'
-        )
-        women_stats = women_stats.merge(
-            players_df[metadata_cols], # Pass 'Gender' from the main players_df
-            on='playerId',
-            how='left'
-        )
-        # --- End of Fix ---
-        
-        return men_stats, women_stats
-
-    # --- Run the data preparation ---
-    # (This will be skipped if the cache is hot)
-    try:
-        men_stats_df, women_stats_df = get_leaderboard_data(master_players_df, master_matches_df)
-    except Exception as e:
-        st.error(f"Error generating leaderboard data: {e}")
+    # --- Leaderboards are materialized by the pipeline (utils.leaderboards.build_leaderboards) ---
+    # The app only reads the latest artifact, so no ratings are recomputed on a rerun
+    leaderboards_df = get_leaderboards()
+    if leaderboards_df.empty:
+        st.error("No leaderboards found. Run the leaderboards step of the pipeline.")
         st.stop()
 
 
@@ -215,7 +155,7 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
         st.subheader("Most Matches Played")
         
         # --- MEN ---
-        top_men_matches = men_stats_df.sort_values(by='totalMatches', ascending=False).head(5)
+        top_men_matches = get_leaderboard(leaderboards_df, 'M', 'totalMatches', 5)
         st.markdown("##### Men")
         st.dataframe(
             top_men_matches[['playerName', 'totalMatches']], 
@@ -223,7 +163,7 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
         )
         
         # --- WOMEN ---
-        top_women_matches = women_stats_df.sort_values(by='totalMatches', ascending=False).head(5)
+        top_women_matches = get_leaderboard(leaderboards_df, 'F', 'totalMatches', 5)
         st.markdown("##### Women")
         st.dataframe(
             top_women_matches[['playerName', 'totalMatches']], 
@@ -235,7 +175,7 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
         st.subheader("Best Win Rate (%)")
         
         # --- MEN ---
-        top_men_winrate = men_stats_df.sort_values(by='WinRate', ascending=False).head(5)
+        top_men_winrate = get_leaderboard(leaderboards_df, 'M', 'WinRate', 5)
         st.markdown("##### Men")
         st.dataframe(
             top_men_winrate[['playerName', 'WinRate']],
@@ -246,7 +186,7 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
         )
         
         # --- WOMEN ---
-        top_women_winrate = women_stats_df.sort_values(by='WinRate', ascending=False).head(5)
+        top_women_winrate = get_leaderboard(leaderboards_df, 'F', 'WinRate', 5)
         st.markdown("##### Women")
         st.dataframe(
             top_women_winrate[['playerName', 'WinRate']],
@@ -261,7 +201,7 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
         st.subheader("Highest Glicko-2 Rating")
         
         # --- MEN ---
-        top_men_rating = men_stats_df.sort_values(by='ratingFinal', ascending=False).head(5)
+        top_men_rating = get_leaderboard(leaderboards_df, 'M', 'ratingFinal', 5)
         st.markdown("##### Men")
         st.dataframe(
             top_men_rating[['playerName', 'ratingFinal']], 
@@ -269,7 +209,7 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
         )
         
         # --- WOMEN ---
-        top_women_rating = women_stats_df.sort_values(by='ratingFinal', ascending=False).head(5)
+        top_women_rating = get_leaderboard(leaderboards_df, 'F', 'ratingFinal', 5)
         st.markdown("##### Women")
         st.dataframe(
             top_women_rating[['playerName', 'ratingFinal']], 
@@ -361,12 +301,12 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
         st.subheader("Most Matches Played")
         
         # --- MEN ---
-        top_men_matches = men_stats_df.sort_values(by='totalMatches', ascending=False).head(5)
+        top_men_matches = get_leaderboard(leaderboards_df, 'M', 'totalMatches', 5)
         st.markdown("##### Men")
         display_final_leaderboard(top_men_matches, "totalMatches", "Total Matches")
         
         # --- WOMEN ---
-        top_women_matches = women_stats_df.sort_values(by='totalMatches', ascending=False).head(5)
+        top_women_matches = get_leaderboard(leaderboards_df, 'F', 'totalMatches', 5)
         st.markdown("##### Women")
         display_final_leaderboard(top_women_matches, "totalMatches", "Total Matches")
 
@@ -375,12 +315,12 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
         st.subheader("Best Win Rate (%)")
         
         # --- MEN ---
-        top_men_winrate = men_stats_df.sort_values(by='WinRate', ascending=False).head(5)
+        top_men_winrate = get_leaderboard(leaderboards_df, 'M', 'WinRate', 5)
         st.markdown("##### Men")
         display_final_leaderboard(top_men_winrate, "WinRate", "Win Rate")
         
         # --- WOMEN ---
-        top_women_winrate = women_stats_df.sort_values(by='WinRate', ascending=False).head(5)
+        top_women_winrate = get_leaderboard(leaderboards_df, 'F', 'WinRate', 5)
         st.markdown("##### Women")
         display_final_leaderboard(top_women_winrate, "WinRate", "Win Rate")
 
@@ -389,11 +329,11 @@ if not master_matches_df.empty and not master_players_df.empty and not master_ev
         st.subheader("Highest Glicko-2 Rating")
         
         # --- MEN ---
-        top_men_rating = men_stats_df.sort_values(by='ratingFinal', ascending=False).head(5)
+        top_men_rating = get_leaderboard(leaderboards_df, 'M', 'ratingFinal', 5)
         st.markdown("##### Men")
         display_final_leaderboard(top_men_rating, "ratingFinal", "Glicko-2 Rating")
         
         # --- WOMEN ---
-        top_women_rating = women_stats_df.sort_values(by='ratingFinal', ascending=False).head(5)
+        top_women_rating = get_leaderboard(leaderboards_df, 'F', 'ratingFinal', 5)
         st.markdown("##### Women")
         display_final_leaderboard(top_women_rating, "ratingFinal", "Glicko-2 Rating")
\ No newline at end of file
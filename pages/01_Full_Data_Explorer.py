@@ -4,15 +4,32 @@ from matplotlib.style import available
 import streamlit as st
 import pandas as pd
 import numpy as np
-from utils.getLatestFiles import get_latest_master_events, get_latest_master_matches, get_latest_master_players
-from utils.showFullData import filter_dataframes_by_text, render_events_table, render_players_table, render_matches_table
+from utils.appGetFiles import load_page_data, load_dataset, get_update_date
+from utils.showFullData import filter_dataframes_by_text, render_events_table, render_players_table, render_matches_table, render_head_to_head
+from utils.headToHead import get_head_to_head
 
 st.set_page_config(page_title="Data Explorer", page_icon="🔎", layout="wide")
 st.title("🔎 Dataset Explorer")
 
-events_df = get_latest_master_events()
-matches_df, update_date = get_latest_master_matches()
-players_df = get_latest_master_players()
+# Events and players are small and shown in full; matches are projected onto the columns
+# the tables, the text search (name, event, location) and head-to-head use
+# (every column is only read for the raw data view)
+MATCH_COLUMNS = [
+    "eventId", "documentCode", "subEventName", "EventName", "Round", "matchDate", "venueName",
+    "winnerId", "winnerName", "winnerCountry", "loserId", "loserName", "loserCountry",
+    "overallScore", "gameScore", "duration (unreliable)", "bestOf",
+    "winnerSets", "loserSets", "winnerTotalPoints", "loserTotalPoints",
+]
+
+events_df, matches_df, players_df = load_page_data(events=None, matches=MATCH_COLUMNS, players=None)
+update_date = get_update_date()
+
+
+@st.cache_resource
+def load_head_to_head(update_date, _matches_df):
+    # Built (or read from Data/Master/HeadToHead) once per data update, not on every rerun
+    return get_head_to_head(_matches_df)
+
 
 match_counts = matches_df.groupby('eventId').size().reset_index(name='Match Count')
 events_df = events_df.merge(
@@ -28,7 +45,7 @@ events_df.set_index('eventId', inplace=True)
 
 
 # --- 2. Build your Tabs and Tables (Same code as before) ---
-tab1, tab2, tab3 = st.tabs(["📅 Events", "👤 Players", "🏓 Matches"])
+tab1, tab2, tab3, tab4 = st.tabs(["📅 Events", "👤 Players", "🏓 Matches", "🤝 Head to Head"])
 
 with tab1: 
     st.subheader("📅 Master Events Data")  
@@ -44,4 +61,10 @@ with tab2:
 with tab3:
     st.subheader("🏓 Master Matches Data")   
         
-    render_matches_table(matches_df)
\ No newline at end of file
+    render_matches_table(matches_df, load_raw_matches=lambda: load_dataset("matches"))
+
+with tab4:
+    st.subheader("🤝 Head to Head")
+
+    head_to_head = load_head_to_head(update_date, matches_df)
+    render_head_to_head(head_to_head, matches_df, players_df)
@@ -0,0 +1,77 @@
+import streamlit as st
+from utils.appGetFiles import load_page_data, get_update_date
+from utils.tableTypes import (
+    DEFAULT_PRIOR_MATCHES, UNKNOWN_LABEL, build_table_type_aggregates, compute_table_type_effects, get_table_type_leaders
+)
+
+st.set_page_config(page_title="Table Types", page_icon="🏓", layout="wide")
+st.title("🏓 Table Type Analysis")
+
+events_df, matches_df, players_df = load_page_data(
+    events=["eventId", "TableSponsor"],
+    matches=["eventId", "winnerId", "loserId", "winnerSets", "loserSets", "winnerTotalPoints", "loserTotalPoints"],
+    players=["playerId", "PlayerName", "Gender", "CountryName"],
+)
+update_date = get_update_date()
+
+
+@st.cache_data
+def load_table_type_aggregates(update_date, _matches_df, _events_df):
+    # Built once per data update (the dataframes themselves are not hashed)
+    return build_table_type_aggregates(_matches_df, _events_df)
+
+
+aggregates_df = load_table_type_aggregates(update_date, matches_df, events_df)
+
+col_gender, col_prior, col_min = st.columns(3)
+with col_gender:
+    gender = st.radio("Gender", ["All", "M", "F"], horizontal=True)
+with col_prior:
+    prior_matches = st.slider("Shrinkage (pseudo-matches)", min_value=0, max_value=100, value=DEFAULT_PRIOR_MATCHES, step=5)
+with col_min:
+    min_matches = st.slider("Minimum matches on the table", min_value=1, max_value=50, value=10)
+
+if gender != "All":
+    gender_ids = players_df.loc[players_df["Gender"] == gender, "playerId"]
+    aggregates_df = aggregates_df[aggregates_df["playerId"].isin(gender_ids)]
+
+effects_df = compute_table_type_effects(aggregates_df, prior_matches=prior_matches, min_matches=min_matches)
+
+column_config = {
+    "playerId": st.column_config.NumberColumn("ID", format="%d"),
+    "PlayerName": st.column_config.TextColumn("Player", width="medium"),
+    "CountryName": st.column_config.TextColumn("Country"),
+    "TotalMatches": st.column_config.NumberColumn("Matches"),
+    "MatchWinRate": st.column_config.NumberColumn("Win Rate (Table)", format="%.2f%%"),
+    "MatchWinRateAll": st.column_config.NumberColumn("Win Rate (All Tables)", format="%.2f%%"),
+    "MatchWinRateEffect": st.column_config.NumberColumn("Win Rate Effect", format="%+.2f"),
+    "PointWinRate": st.column_config.NumberColumn("Point Win Rate (Table)", format="%.2f%%"),
+    "PointWinRateEffect": st.column_config.NumberColumn("Point Win Rate Effect", format="%+.2f"),
+}
+display_cols = list(column_config)
+
+tab1, tab2 = st.tabs(["📋 By Table", "👤 By Player"])
+
+with tab1:
+    sponsors = [s for s in aggregates_df["TableSponsor"].cat.categories if s != UNKNOWN_LABEL]
+    table_sponsor = st.selectbox("Table", sponsors)
+    top_n = st.slider("Players", min_value=5, max_value=50, value=20, step=5)
+
+    col_best, col_worst = st.columns(2)
+    for col, ascending, caption in [(col_best, False, "Best"), (col_worst, True, "Worst")]:
+        with col:
+            st.caption(f"{caption} on {table_sponsor} (shrunk win rate vs all tables)")
+            leaders_df = get_table_type_leaders(effects_df, table_sponsor, players_df, top_n, ascending=ascending)
+            st.dataframe(leaders_df[[c for c in display_cols if c in leaders_df.columns]],
+                         width="stretch", hide_index=True, column_config=column_config)
+
+with tab2:
+    names = players_df.dropna(subset=["PlayerName"]).drop_duplicates(subset="playerId")
+    names = names[names["playerId"].isin(effects_df["playerId"])].sort_values(by="PlayerName")
+    player_options = dict(zip(names["PlayerName"] + " (" + names["playerId"].astype(str) + ")", names["playerId"]))
+    player_label = st.selectbox("Player", list(player_options), index=None, placeholder="Search player")
+
+    if player_label is not None:
+        player_effects_df = effects_df[effects_df["playerId"] == player_options[player_label]]
+        st.bar_chart(player_effects_df.set_index("TableSponsor")["MatchWinRateEffect"], horizontal=True)
+        st.dataframe(player_effects_df.drop(columns=["playerId"]), width="stretch", hide_index=True, column_config=column_config)
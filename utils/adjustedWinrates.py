@@ -0,0 +1,202 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence, Tuple
+
+from utils.glickoEngine import expected_outcome
+from utils.fingerprints import dataset_fingerprint, prune_cache
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_WINRATES_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Winrates')
+
+# Winrates are also reported against opponents rated at least this much before the match
+DEFAULT_RATING_THRESHOLDS = [1600, 1800]
+
+# Columns identifying a match in the matches and the ratings history
+MATCH_KEY_COLUMNS = ['eventId', 'documentCode', 'winnerId', 'loserId']
+
+
+def encode_match_keys(event_ids: np.ndarray, document_codes: np.ndarray) -> np.ndarray:
+    """
+    One int64 key per match: eventId * n_codes + the documentCode's factorized code
+    (-1 if the eventId is missing). All the documentCodes to compare are factorized together.
+    """
+    codes, uniques = pd.factorize(document_codes)
+    keys = event_ids * max(len(uniques), 1) + codes
+    return np.where((codes >= 0) & (event_ids >= 0), keys, -1)
+
+
+def align_pre_match_ratings(matches_df: pd.DataFrame, history_df: pd.DataFrame,
+                            info_string: str = "") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pre-match ratings of the winner and loser of every row of matches_df, taken from the
+    ratings history by array alignment on (eventId, documentCode): the history keys are
+    sorted once and every match key is found with one searchsorted.
+    Matches that were not rated (dnf, unknown players) get NaN.
+
+    Args:
+        matches_df (pd.DataFrame): Matches containing 'eventId' and 'documentCode'.
+        history_df (pd.DataFrame): Output of calculate_ratings_history (or get_latest_ratings_history).
+        info_string (str, optional): Suffix of the history rating columns. Defaults to "".
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: winner and loser pre-match ratings, aligned with matches_df.
+    """
+    suffix = f" ({info_string})" if f"winner_rating_pre ({info_string})" in history_df.columns else ""
+    n_history = len(history_df)
+    if n_history == 0:
+        return np.full(len(matches_df), np.nan), np.full(len(matches_df), np.nan)
+
+    def event_ids(df):
+        return pd.to_numeric(df['eventId'], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+
+    keys = encode_match_keys(np.concatenate([event_ids(history_df), event_ids(matches_df)]),
+                             np.concatenate([history_df['documentCode'].to_numpy(dtype=object),
+                                             matches_df['documentCode'].to_numpy(dtype=object)]))
+    history_keys, match_keys = keys[:n_history], keys[n_history:]
+
+    order = np.argsort(history_keys, kind='stable')
+    sorted_keys = history_keys[order]
+    positions = np.clip(np.searchsorted(sorted_keys, match_keys), 0, n_history - 1)
+    found = (match_keys >= 0) & (sorted_keys[positions] == match_keys)
+    rows = order[positions]
+
+    def aligned(col):
+        values = history_df[f"{col}{suffix}"].to_numpy(dtype=float)
+        return np.where(found, values[rows], np.nan)
+
+    return aligned('winner_rating_pre'), aligned('loser_rating_pre')
+
+
+def compute_adjusted_winrates(matches_df: pd.DataFrame,
+                              history_df: pd.DataFrame,
+                              info_string: str,
+                              rating_thresholds: Sequence[float] = DEFAULT_RATING_THRESHOLDS,
+                              history_info_string: Optional[str] = None) -> pd.DataFrame:
+    """
+    Opponent-strength-adjusted win rates for every player in one pass.
+
+    Each rated match is scored against the Glicko-2 expectation of its pre-match ratings
+    (expected_outcome). Per player, the winner and loser views are stacked once and every
+    total is reduced with np.bincount, as in compute_winrates.
+
+    Args:
+        matches_df (pd.DataFrame): Matches containing 'winnerId', 'loserId', 'eventId', 'documentCode'
+                                   (and 'Winner' for ties). PRE-FILTER it for a slice (e.g. by year).
+        history_df (pd.DataFrame): Ratings history of ALL matches, for the pre-match ratings.
+        info_string (str): Suffix for the data columns, e.g. "Overall".
+        rating_thresholds (Sequence[float], optional): Opponent pre-match ratings for the
+                                                       "vs {threshold}+" win rates. Defaults to [1600, 1800].
+        history_info_string (str, optional): Suffix of the history rating columns. Defaults to info_string.
+
+    Returns:
+        pd.DataFrame: playerId, RatedMatches, ExpectedWins, WinsAboveExpected, ExpectedWinRate,
+                      PerformanceAboveExpectation (actual minus expected win rate, in percentage
+                      points), AvgOpponentRating and TotalMatches / TotalWins / MatchWinRate
+                      "vs {threshold}+", sorted by playerId.
+    """
+    if (info_string == "") or (not isinstance(info_string, str)) or (info_string.isspace()):
+        print(f"❌ Please specify a valid info_string: {info_string}")
+        return None
+
+    matches_df = matches_df[matches_df['winnerId'].notna() & matches_df['loserId'].notna()]
+    winner_pre, loser_pre = align_pre_match_ratings(
+        matches_df, history_df, info_string if history_info_string is None else history_info_string)
+    n_matches = len(matches_df)
+
+    winner_score = np.where(matches_df['Winner'].to_numpy() == 'tie', 0.5, 1.0) \
+        if 'Winner' in matches_df.columns else np.ones(n_matches)
+    winner_expected = expected_outcome(winner_pre, loser_pre)
+    is_rated = np.tile(~np.isnan(winner_expected), 2)
+
+    # --- 1. Stack winner and loser views ---
+    player_idx, player_ids = pd.factorize(
+        np.concatenate([matches_df['winnerId'].to_numpy(dtype=np.int64), matches_df['loserId'].to_numpy(dtype=np.int64)]),
+        sort=True)
+    n_players = len(player_ids)
+    score = np.concatenate([winner_score, 1 - winner_score])
+    expected = np.nan_to_num(np.concatenate([winner_expected, 1 - winner_expected]))
+    opponent_rating = np.concatenate([loser_pre, winner_pre])
+    is_win = np.repeat([1.0, 0.0], n_matches)
+
+    def total(values, mask=is_rated):
+        return np.bincount(player_idx, weights=np.where(mask, values, 0.0), minlength=n_players)
+
+    # --- 2. Grouped reductions over the same dense index ---
+    rated_matches = total(np.ones(2 * n_matches))
+    actual_score = total(score)
+    expected_wins = total(expected)
+
+    def rate(won, played):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.round(np.nan_to_num(won / played * 100), 2)
+
+    stats = pd.DataFrame({'playerId': np.asarray(player_ids, dtype=np.int64)})
+    data_cols = {
+        'RatedMatches': rated_matches.astype(np.int64),
+        'ExpectedWins': np.round(expected_wins, 2),
+        'WinsAboveExpected': np.round(actual_score - expected_wins, 2),
+        'ExpectedWinRate': rate(expected_wins, rated_matches),
+        'PerformanceAboveExpectation': rate(actual_score - expected_wins, rated_matches),
+        'AvgOpponentRating': np.round(total(np.nan_to_num(opponent_rating)) / np.maximum(rated_matches, 1), 2),
+    }
+    for threshold in rating_thresholds:
+        label = f"vs {int(threshold)}+"
+        strong_opponent = is_rated & (np.nan_to_num(opponent_rating) >= threshold)
+        played = total(np.ones(2 * n_matches), strong_opponent)
+        wins = total(is_win, strong_opponent)
+        data_cols[f"TotalMatches {label}"] = played.astype(np.int64)
+        data_cols[f"TotalWins {label}"] = wins.astype(np.int64)
+        data_cols[f"MatchWinRate {label}"] = rate(wins, played)
+
+    for col, values in data_cols.items():
+        stats[f"{col} ({info_string})"] = values
+    stats.loc[rated_matches == 0, f"AvgOpponentRating ({info_string})"] = np.nan
+
+    return stats
+
+
+def _dataset_version(matches_df: pd.DataFrame, history_df: pd.DataFrame, rating_thresholds: Sequence[float]) -> str:
+    """
+    Fingerprint of the match keys, the history keys and pre-match ratings and the thresholds.
+    """
+    rating_cols = [col for col in history_df.columns if col.startswith(('winner_rating_pre', 'loser_rating_pre'))]
+    return dataset_fingerprint((matches_df, MATCH_KEY_COLUMNS), (history_df, MATCH_KEY_COLUMNS + rating_cols),
+                               extra=rating_thresholds)
+
+
+def get_adjusted_winrates(matches_df: pd.DataFrame,
+                          history_df: pd.DataFrame,
+                          info_string: str,
+                          rating_thresholds: Sequence[float] = DEFAULT_RATING_THRESHOLDS,
+                          history_info_string: Optional[str] = None,
+                          cache_dir: Optional[str] = DEFAULT_WINRATES_DIR) -> pd.DataFrame:
+    """
+    compute_adjusted_winrates, cached next to the winrate outputs as
+    adjusted_winrates_{INFO_STRING}_{dataset version}.csv so each slice is computed once per dataset version.
+    """
+    if (info_string == "") or (not isinstance(info_string, str)) or (info_string.isspace()):
+        print(f"❌ Please specify a valid info_string: {info_string}")
+        return None
+
+    cache_path = None
+    if cache_dir:
+        safe_label = info_string.upper().replace(" ", "_")
+        version = _dataset_version(matches_df, history_df, rating_thresholds)
+        cache_path = os.path.join(cache_dir, f"adjusted_winrates_{safe_label}_{version}.csv")
+        if os.path.isfile(cache_path):
+            print(f"✅ Loaded cached adjusted winrates: {cache_path}")
+            return pd.read_csv(cache_path)
+
+    stats = compute_adjusted_winrates(matches_df, history_df, info_string, rating_thresholds, history_info_string)
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        stats.to_csv(cache_path, index=False)
+        print(f"✅✅Saved adjusted winrates to {cache_path}")
+        prune_cache(cache_dir, f"adjusted_winrates_{safe_label}_", version)
+
+    return stats
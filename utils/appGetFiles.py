@@ -0,0 +1,205 @@
+import os
+import re
+import glob
+import json
+import pandas as pd
+import streamlit as st
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+from utils.leaderboards import DEFAULT_LEADERBOARDS_DIR, get_latest_leaderboards_file, read_leaderboards
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_APP_SUMMARY_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'App')
+
+# Master datasets the app can load: directory and file name pattern of each
+APP_DATASETS = {
+    'matches': (os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Matches'), r'^\d{8}_master_matches\.csv$'),
+    'events': (os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Events'), r'^\d{8}_master_events\.csv$'),
+    'players': (os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Players'), r'^\d{8}_master_players\.csv$'),
+}
+
+# Columns build_app_summary needs from each dataset
+SUMMARY_COLUMNS = {
+    'matches': ['subEventName'],
+    'events': ['EventName', 'StartDate'],
+    'players': ['Gender'],
+}
+
+
+def get_latest_dataset_file(name: str) -> Optional[str]:
+    """
+    Path of the latest master file of an APP_DATASETS dataset (None if there is none).
+    Only the directory listing is read.
+    """
+    if name not in APP_DATASETS:
+        raise ValueError(f"Unknown app dataset: {name} (use one of {list(APP_DATASETS)})")
+
+    master_dir, master_regex = APP_DATASETS[name]
+    files = sorted(file for file in glob.glob(os.path.join(master_dir, "*.csv"))
+                   if re.match(master_regex, os.path.basename(file)))
+    if not files:
+        print(f"❌ No existing MASTER files in format: {master_regex} in {master_dir}")
+        return None
+    return files[-1]
+
+
+@st.cache_data
+def _read_dataset(file_path: str, columns: Optional[Tuple[str, ...]]) -> pd.DataFrame:
+    """
+    Reads one master CSV, parsing only the requested columns. Cached per (file, columns),
+    so a new master file is a new cache entry.
+    """
+    usecols = None
+    if columns is not None:
+        header = pd.read_csv(file_path, nrows=0).columns
+        usecols = [col for col in columns if col in header]
+    return pd.read_csv(file_path, usecols=usecols, low_memory=False)
+
+
+def load_dataset(name: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    The latest master dataset ('matches', 'events' or 'players') with only the given columns
+    (columns missing from the file are skipped); None loads every column.
+
+    Returns:
+        pd.DataFrame: The data, or an empty DataFrame with the requested columns if no file is found.
+    """
+    file_path = get_latest_dataset_file(name)
+    if file_path is None:
+        return pd.DataFrame(columns=list(columns or []))
+
+    try:
+        return _read_dataset(file_path, tuple(columns) if columns is not None else None)
+    except Exception as e:
+        print(f"❌ Error reading latest MASTER {name}, {file_path}: {e}")
+        return pd.DataFrame(columns=list(columns or []))
+
+
+def load_page_data(**page_columns: Optional[Sequence[str]]) -> Tuple[pd.DataFrame, ...]:
+    """
+    Loads the datasets a page declares, each projected onto its columns, e.g.
+
+        matches_df, players_df = load_page_data(matches=["winnerId", "loserId"], players=None)
+
+    Returns:
+        Tuple[pd.DataFrame, ...]: One DataFrame per keyword, in the given order.
+    """
+    return tuple(load_dataset(name, columns) for name, columns in page_columns.items())
+
+
+def get_update_date() -> Optional[pd.Timestamp]:
+    """
+    Date of the latest master matches file, from its name.
+    """
+    file_path = get_latest_dataset_file('matches')
+    if file_path is None:
+        return None
+    return pd.to_datetime(os.path.basename(file_path)[:8], format='%Y%m%d')
+
+
+def _source_files() -> Dict[str, Optional[str]]:
+    return {name: (os.path.basename(path) if path else None)
+            for name, path in ((name, get_latest_dataset_file(name)) for name in APP_DATASETS)}
+
+
+def build_app_summary(events_df: pd.DataFrame, matches_df: pd.DataFrame, players_df: pd.DataFrame) -> dict:
+    """
+    The dataset metrics of the landing page (render_intro) as a small dict.
+    """
+    womens_matches = int(matches_df["subEventName"].astype(str).str.contains("women", case=False).sum()) \
+        if "subEventName" in matches_df.columns else 0
+    has_events = len(events_df) > 0
+
+    return {
+        "total_matches": int(len(matches_df)),
+        "womens_matches": womens_matches,
+        "mens_matches": int(len(matches_df)) - womens_matches,
+        "total_players": int(len(players_df)),
+        "female_players": int((players_df["Gender"] == "F").sum()) if "Gender" in players_df.columns else 0,
+        "male_players": int((players_df["Gender"] == "M").sum()) if "Gender" in players_df.columns else 0,
+        "total_events": int(len(events_df)),
+        "first_event_name": str(events_df["EventName"].iloc[0]) if has_events else None,
+        "first_event_date": str(events_df["StartDate"].iloc[0]) if has_events else None,
+        "last_event_name": str(events_df["EventName"].iloc[-1]) if has_events else None,
+        "last_event_date": str(events_df["StartDate"].iloc[-1]) if has_events else None,
+    }
+
+
+def save_app_summary(summary: dict, summary_dir: str = DEFAULT_APP_SUMMARY_DIR) -> str:
+    """
+    Saves the summary as {date}_app_summary.json.
+    """
+    os.makedirs(summary_dir, exist_ok=True)
+    date_string = datetime.now().strftime("%Y%m%d")
+    summary_filepath = os.path.join(summary_dir, f"{date_string}_app_summary.json")
+    with open(summary_filepath, "w") as f:
+        json.dump(summary, f, indent=1)
+    print(f"✅✅Saved app summary to {summary_filepath}")
+    return summary_filepath
+
+
+@st.cache_data
+def _read_app_summary(summary_filepath: str, modified_time: float) -> dict:
+    # modified_time is part of the cache key, so a summary rewritten on the same day is re-read
+    with open(summary_filepath) as f:
+        return json.load(f)
+
+
+def get_app_summary(summary_dir: str = DEFAULT_APP_SUMMARY_DIR) -> dict:
+    """
+    The latest app summary. It is rebuilt (from the SUMMARY_COLUMNS of each dataset only)
+    and saved when there is none or when it was built from older master files.
+    """
+    source_files = _source_files()
+    search_pattern = re.compile(r'^\d{8}_app_summary\.json$')
+    files = sorted(file for file in glob.glob(os.path.join(summary_dir, "*.json"))
+                   if search_pattern.match(os.path.basename(file)))
+
+    if files:
+        try:
+            summary = _read_app_summary(files[-1], os.path.getmtime(files[-1]))
+            if summary.get("source_files") == source_files:
+                return summary
+        except Exception as e:
+            print(f"❌ Error reading latest app summary, {files[-1]}: {e}")
+
+    print(f"🟢 Building app summary from {source_files}")
+    events_df, matches_df, players_df = load_page_data(events=SUMMARY_COLUMNS['events'],
+                                                       matches=SUMMARY_COLUMNS['matches'],
+                                                       players=SUMMARY_COLUMNS['players'])
+    summary = build_app_summary(events_df, matches_df, players_df)
+    update_date = get_update_date()
+    summary["update_date"] = update_date.strftime("%Y-%m-%d") if update_date is not None else None
+    summary["source_files"] = source_files
+    try:
+        save_app_summary(summary, summary_dir)
+    except OSError as e:
+        print(f"❌ Could not save app summary: {e}")
+    return summary
+
+
+@st.cache_data
+def _read_leaderboards(leaderboards_filepath: str, modified_time: float) -> pd.DataFrame:
+    return read_leaderboards(leaderboards_filepath)
+
+
+def get_leaderboards(leaderboards_dir: str = DEFAULT_LEADERBOARDS_DIR) -> pd.DataFrame:
+    """
+    The latest leaderboards artifact (utils.leaderboards), read once per file version.
+    The app never recomputes ratings for them.
+    """
+    leaderboards_filepath = get_latest_leaderboards_file(leaderboards_dir)
+    if leaderboards_filepath is None:
+        return read_leaderboards(None)
+    return _read_leaderboards(leaderboards_filepath, os.path.getmtime(leaderboards_filepath))
+
+
+def get_app_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    All three master datasets with every column (events, matches, players).
+    """
+    return load_page_data(events=None, matches=None, players=None)
@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import cg
+from typing import Optional, Tuple
+
+from utils.glickoEngine import DEFAULT_RATING, DEFAULT_RD, select_matches_to_rate
+from utils.networks import build_player_index
+
+BATCH_METHODS = ('bradley_terry', 'massey')
+
+# Bradley-Terry strengths are shown on the Elo scale, so expected_outcome of two
+# ratings is exactly the fitted win probability
+ELO_SCALE = 400 / np.log(10)
+
+# Massey ratings: rating points per game of expected margin
+MASSEY_SCALE = 100.0
+MASSEY_RIDGE = 0.1
+
+MAX_NEWTON_STEPS = 50
+NEWTON_TOLERANCE = 1e-8
+SOLVER_TOLERANCE = 1e-10
+
+
+def match_weights(match_dates: pd.Series, half_life_days: Optional[float] = None,
+                  as_of: Optional[str] = None) -> np.ndarray:
+    """
+    Time decay weight of every match: 0.5 ** (age in days / half_life_days), with the age
+    counted back from as_of (default: the latest match). No half-life gives every match weight 1.
+    """
+    if not half_life_days:
+        return np.ones(len(match_dates))
+
+    dates = pd.to_datetime(match_dates, errors='coerce', utc=True)
+    reference = pd.to_datetime(as_of, utc=True) if as_of else dates.max()
+    age_days = ((reference - dates) / pd.Timedelta(days=1)).clip(lower=0).fillna(0).to_numpy(dtype=float)
+    return np.power(0.5, age_days / half_life_days)
+
+
+def _laplacian(winner_idx: np.ndarray, loser_idx: np.ndarray, weights: np.ndarray, n_players: int) -> sp.csr_matrix:
+    """
+    X^T diag(weights) X for the sparse design X (one row per match: +1 winner, -1 loser).
+    """
+    rows = np.concatenate([winner_idx, loser_idx, winner_idx, loser_idx])
+    cols = np.concatenate([winner_idx, loser_idx, loser_idx, winner_idx])
+    data = np.concatenate([weights, weights, -weights, -weights])
+    return sp.coo_matrix((data, (rows, cols)), shape=(n_players, n_players)).tocsr()
+
+
+def _solve(matrix: sp.csr_matrix, rhs: np.ndarray) -> np.ndarray:
+    """
+    Solves the symmetric positive definite system by Jacobi-preconditioned conjugate gradient.
+    Direct factorization fills in badly on the match graph.
+    """
+    preconditioner = sp.diags(1 / matrix.diagonal())
+    solution, _ = cg(matrix, rhs, rtol=SOLVER_TOLERANCE, atol=0.0, M=preconditioner, maxiter=10 * matrix.shape[0])
+    return solution
+
+
+def _signed_sum(winner_idx: np.ndarray, loser_idx: np.ndarray, values: np.ndarray, n_players: int) -> np.ndarray:
+    """
+    X^T values: per player, the sum of values as winner minus the sum as loser.
+    """
+    return np.bincount(winner_idx, values, n_players) - np.bincount(loser_idx, values, n_players)
+
+
+def fit_bradley_terry(winner_idx: np.ndarray, loser_idx: np.ndarray, n_players: int,
+                      score: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None,
+                      prior_rd: float = DEFAULT_RD,
+                      initial_strength: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted Bradley-Terry fit, P(winner beats loser) = 1 / (1 + exp(s_loser - s_winner)),
+    by Newton's method on the sparse design. A normal prior on the strengths (sd prior_rd
+    on the rating scale) keeps unbeaten players and separate components finite.
+
+    Args:
+        score (np.ndarray, optional): Winner's score per match (1, or 0.5 for a tie). Defaults to 1.
+        weights (np.ndarray, optional): Match weights (e.g. match_weights). Defaults to 1.
+        initial_strength (np.ndarray, optional): Starting point, e.g. a fit on similar data. Defaults to 0.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: strengths and their approximate standard errors (log-odds scale).
+    """
+    score = np.ones(len(winner_idx)) if score is None else score
+    weights = np.ones(len(winner_idx)) if weights is None else weights
+    ridge = (ELO_SCALE / prior_rd) ** 2
+
+    strength = np.zeros(n_players) if initial_strength is None else np.array(initial_strength, dtype=float)
+    for _ in range(MAX_NEWTON_STEPS):
+        probability = 1 / (1 + np.exp(strength[loser_idx] - strength[winner_idx]))
+        gradient = _signed_sum(winner_idx, loser_idx, weights * (score - probability), n_players) - ridge * strength
+        hessian = _laplacian(winner_idx, loser_idx, weights * probability * (1 - probability), n_players) \
+            + ridge * sp.identity(n_players, format='csr')
+
+        step = _solve(hessian, gradient)
+        strength += step
+        if np.max(np.abs(step), initial=0) < NEWTON_TOLERANCE:
+            break
+
+    return strength, 1 / np.sqrt(hessian.diagonal())
+
+
+def fit_massey(winner_idx: np.ndarray, loser_idx: np.ndarray, n_players: int,
+               margin: np.ndarray, weights: Optional[np.ndarray] = None,
+               ridge: float = MASSEY_RIDGE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted Massey fit: least squares of margin ~ r_winner - r_loser, solved in one sparse
+    linear system. The ridge term pulls players with few matches towards 0.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: ratings (margin units) and their approximate standard errors.
+    """
+    weights = np.ones(len(winner_idx)) if weights is None else weights
+    normal_matrix = _laplacian(winner_idx, loser_idx, weights, n_players) + ridge * sp.identity(n_players, format='csr')
+    rating = _solve(normal_matrix, _signed_sum(winner_idx, loser_idx, weights * margin, n_players))
+
+    residuals = margin - (rating[winner_idx] - rating[loser_idx])
+    residual_variance = np.sum(weights * residuals ** 2) / max(np.sum(weights) - n_players, 1)
+    return rating, np.sqrt(residual_variance / normal_matrix.diagonal())
+
+
+def match_margins(matches_df: pd.DataFrame) -> np.ndarray:
+    """
+    Games margin of every match (winnerSets - loserSets); 1 if the set counts are missing, 0 for ties.
+    """
+    if {'winnerSets', 'loserSets'}.issubset(matches_df.columns):
+        margin = (pd.to_numeric(matches_df['winnerSets'], errors='coerce')
+                  - pd.to_numeric(matches_df['loserSets'], errors='coerce')).fillna(1).to_numpy(dtype=float)
+    else:
+        margin = np.ones(len(matches_df))
+    if 'Winner' in matches_df.columns:
+        margin = np.where(matches_df['Winner'].to_numpy() == 'tie', 0.0, margin)
+    return margin
+
+
+def calculate_batch_ratings(players_df: pd.DataFrame,
+                            matches_df: pd.DataFrame,
+                            method: str = 'bradley_terry',
+                            half_life_days: Optional[float] = None,
+                            start_date: Optional[str] = None,
+                            end_date: Optional[str] = None,
+                            info_string: str = "") -> pd.DataFrame:
+    """
+    Rates every player in a match window with one batch fit, as an alternative to the
+    sequential Glicko-2 engine. The fit does not depend on match order, so any slice
+    (date window, gender, table sponsor...) can be rated on demand.
+
+    Args:
+        players_df (pd.DataFrame): Players containing 'playerId'.
+        matches_df (pd.DataFrame): Matches, as for calculate_ratings_history.
+        method (str, optional): 'bradley_terry' (win / loss) or 'massey' (games margin).
+                                Defaults to 'bradley_terry'.
+        half_life_days (float, optional): Time decay half-life of match weights. Defaults to no decay.
+        start_date (str, optional): First matchDate of the window ('YYYY-MM-DD').
+        end_date (str, optional): Last matchDate of the window ('YYYY-MM-DD', inclusive).
+                                  Also the reference date for the time decay.
+        info_string (str, optional): Column suffix. Defaults to "".
+
+    Returns:
+        pd.DataFrame: Same columns as get_final_player_stats. ratingAvg / ratingMax equal
+                      ratingFinal (a batch fit has one rating per player) and rdFinal is
+                      the approximate standard error on the rating scale.
+    """
+    if method not in BATCH_METHODS:
+        print(f"❌ Unknown batch rating method: {method} (use one of {BATCH_METHODS}) \n❌ Returning empty DataFrame")
+        return pd.DataFrame()
+
+    print(f"--- 🧮 Batch {method} ratings ({info_string or 'Default'}) ---")
+    window_df = select_matches_to_rate(players_df, matches_df)
+    match_dates = window_df['matchDate'].astype(str)
+    if start_date:
+        window_df = window_df[match_dates >= start_date]
+    if end_date:
+        window_df = window_df[window_df['matchDate'].astype(str).str[:10] <= end_date]
+
+    if window_df.empty:
+        print("❌ No matches to rate in the window \n❌ Returning empty DataFrame")
+        return pd.DataFrame()
+
+    player_ids, winner_idx, loser_idx = build_player_index(window_df['winnerId'], window_df['loserId'])
+    n_players = len(player_ids)
+    weights = match_weights(window_df['matchDate'], half_life_days, end_date)
+    print(f"🏓 {len(window_df)} matches, {n_players} players")
+
+    if method == 'bradley_terry':
+        score = np.where(window_df['Winner'].to_numpy() == 'tie', 0.5, 1.0) \
+            if 'Winner' in window_df.columns else None
+        strength, std_error = fit_bradley_terry(winner_idx, loser_idx, n_players, score, weights)
+        rating, rd = DEFAULT_RATING + ELO_SCALE * strength, ELO_SCALE * std_error
+    else:
+        strength, std_error = fit_massey(winner_idx, loser_idx, n_players, match_margins(window_df), weights)
+        rating, rd = DEFAULT_RATING + MASSEY_SCALE * strength, MASSEY_SCALE * std_error
+
+    # Name, country and date of each player's last match in the window
+    stacked_df = pd.concat([
+        pd.DataFrame({'idx': winner_idx, 'playerName': window_df['winnerName'].to_numpy(),
+                      'playerCountry': window_df['winnerCountry'].to_numpy(),
+                      'matchDate': window_df['matchDate'].astype(str).to_numpy(), 'is_win': 1}),
+        pd.DataFrame({'idx': loser_idx, 'playerName': window_df['loserName'].to_numpy(),
+                      'playerCountry': window_df['loserCountry'].to_numpy(),
+                      'matchDate': window_df['matchDate'].astype(str).to_numpy(), 'is_win': 0}),
+    ], ignore_index=True)
+    last_df = stacked_df.sort_values(by='matchDate', kind='stable').groupby('idx').last()
+
+    total_matches = np.bincount(stacked_df['idx'], minlength=n_players)
+    total_wins = np.bincount(winner_idx, minlength=n_players)
+    last_date = last_df['matchDate'].str[:10].to_numpy()
+
+    player_stats = pd.DataFrame({
+        'playerId': player_ids,
+        'playerName': last_df['playerName'].to_numpy(),
+        'playerCountry': last_df['playerCountry'].to_numpy(),
+        'ratingFinal': rating,
+        'totalMatches': total_matches,
+        'totalWins': total_wins,
+        'winRate': total_wins / total_matches * 100,
+        'ratingAvg': rating,
+        'ratingMax': rating,
+        'ratingMaxDate': last_date,
+        'rdFinal': rd,
+        'ratingFinalDate': last_date,
+    }).sort_values(by='ratingFinal', ascending=False)
+
+    float_cols = [col for col in player_stats.columns if player_stats[col].dtype == np.float64]
+    player_stats[float_cols] = player_stats[float_cols].round(2)
+
+    if info_string:
+        suffix = f" ({info_string})"
+        player_stats = player_stats.rename(columns={
+            col: f"{col}{suffix}" for col in player_stats.columns
+            if col not in ('playerId', 'playerName', 'playerCountry')
+        })
+
+    print(f"✅ Batch ratings complete for {n_players} players.")
+    return player_stats.reset_index(drop=True)
@@ -0,0 +1,211 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from utils.glickoEngine import GlickoState, select_matches_to_rate, run_glicko2
+from utils.batchRatings import fit_bradley_terry, ELO_SCALE
+from utils.networks import build_player_index
+from utils.fingerprints import dataset_fingerprint, prune_cache
+from utils.segments import share_arrays, attach_shared_arrays, release_shared_arrays
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_BOOTSTRAP_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Bootstrap')
+
+# 'bradley_terry' and 'winrate' weight each match by its resample count;
+# 'glicko' reruns the sequential engine on the resampled matches in date order
+BOOTSTRAP_METRICS = ('bradley_terry', 'winrate', 'glicko')
+
+# Columns of the matches to rate, fingerprinted as the dataset version of cached results
+BOOTSTRAP_FINGERPRINT_COLUMNS = ['winnerId', 'loserId', 'Winner']
+
+# Replicates per task; fixed so results for a seed do not depend on the number of workers
+BOOTSTRAP_CHUNK = 50
+
+# Worker process globals, set by _init_bootstrap_worker
+_BOOTSTRAP_BLOCKS = []
+_BOOTSTRAP_ARRAYS: Dict[str, np.ndarray] = {}
+
+
+def _init_bootstrap_worker(array_specs) -> None:
+    blocks, arrays = attach_shared_arrays(array_specs)
+    _BOOTSTRAP_BLOCKS.extend(blocks)
+    _BOOTSTRAP_ARRAYS.update(arrays)
+
+
+def _metric_values(metric: str, sample: np.ndarray) -> np.ndarray:
+    """
+    The leaderboard metric of every player, from the matches at positions sample (with repeats).
+    """
+    winner_idx, loser_idx, score = _BOOTSTRAP_ARRAYS['winner_idx'], _BOOTSTRAP_ARRAYS['loser_idx'], _BOOTSTRAP_ARRAYS['score']
+    n_players = len(_BOOTSTRAP_ARRAYS['player_ids'])
+
+    if metric == 'glicko':
+        sample = np.sort(sample)
+        state = GlickoState.fresh(np.arange(n_players))
+        run_glicko2(state, winner_idx[sample], loser_idx[sample], score[sample])
+        return state.rating
+
+    counts = np.bincount(sample, minlength=len(winner_idx)).astype(float)
+    if metric == 'winrate':
+        wins = np.bincount(winner_idx, counts, n_players)
+        played = wins + np.bincount(loser_idx, counts, n_players)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return wins / played * 100
+
+    # Replicates start from the full-data fit, which is close to their own solution
+    strength, _ = fit_bradley_terry(winner_idx, loser_idx, n_players, score, counts,
+                                    initial_strength=_BOOTSTRAP_ARRAYS.get('full_strength'))
+    return strength * ELO_SCALE
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """
+    Leaderboard ranks (1 = best); players without a value rank last.
+    """
+    order = np.argsort(-np.nan_to_num(values, nan=-np.inf), kind='stable')
+    ranks = np.empty(len(values), dtype=np.int32)
+    ranks[order] = np.arange(1, len(values) + 1)
+    return ranks
+
+
+def _bootstrap_chunk(metric: str, n_replicates: int, seed_sequence: np.random.SeedSequence) -> np.ndarray:
+    """
+    Ranks of the leaderboard players in n_replicates resamples of the matches, shape (n_replicates, n_ranked).
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n_matches = len(_BOOTSTRAP_ARRAYS['winner_idx'])
+    ranked_idx = _BOOTSTRAP_ARRAYS['ranked_idx']
+
+    ranks = np.empty((n_replicates, len(ranked_idx)), dtype=np.int32)
+    for replicate in range(n_replicates):
+        sample = rng.integers(0, n_matches, n_matches)
+        ranks[replicate] = _rank(_metric_values(metric, sample)[ranked_idx])
+    return ranks
+
+
+def bootstrap_rank_intervals(players_df: pd.DataFrame,
+                             matches_df: pd.DataFrame,
+                             metric: str = 'bradley_terry',
+                             n_replicates: int = 1000,
+                             confidence: float = 0.9,
+                             min_matches: int = 0,
+                             seed: int = 0,
+                             max_workers: Optional[int] = None,
+                             info_string: str = "Overall",
+                             cache_dir: Optional[str] = DEFAULT_BOOTSTRAP_DIR) -> pd.DataFrame:
+    """
+    Bootstrap confidence intervals for leaderboard ranks.
+
+    Every replicate resamples the matches with replacement and recomputes the metric
+    for every player; players are ranked among those with at least min_matches matches
+    in the full data. Replicates run in chunks across a process pool, with the match
+    arrays in shared memory. Results are cached per slice (info_string), dataset version
+    (a hash of the prepared matches) and parameters.
+
+    Args:
+        players_df (pd.DataFrame): Players containing 'playerId' ('PlayerName' and 'Gender' are merged in).
+        matches_df (pd.DataFrame): Matches, as for calculate_ratings_history.
+        metric (str, optional): 'bradley_terry', 'winrate' or 'glicko'. Defaults to 'bradley_terry'.
+        n_replicates (int, optional): Bootstrap replicates. Defaults to 1000.
+        confidence (float, optional): Width of the rank interval. Defaults to 0.9.
+        min_matches (int, optional): Minimum matches to appear on the leaderboard. Defaults to 0.
+        seed (int, optional): Random seed; a seed gives the same intervals for any max_workers. Defaults to 0.
+        max_workers (int, optional): Worker processes. Defaults to the CPU count.
+        info_string (str, optional): Label of the players / matches slice in the cache name,
+                                     e.g. "Men" or "Women". Defaults to "Overall".
+        cache_dir (str, optional): Directory for cached results. None disables the cache.
+
+    Returns:
+        pd.DataFrame: playerId, totalMatches, metric value and rank on the full data,
+                      rankMedian, rankLow, rankHigh, sorted by rank.
+    """
+    if metric not in BOOTSTRAP_METRICS:
+        print(f"❌ Unknown bootstrap metric: {metric} (use one of {BOOTSTRAP_METRICS}) \n❌ Returning empty DataFrame")
+        return pd.DataFrame()
+
+    print(f"--- 🎲 Bootstrapping {metric} leaderboard ranks ({n_replicates} replicates) ---")
+    matches_to_rate_df = select_matches_to_rate(players_df, matches_df)
+    if matches_to_rate_df.empty:
+        print("❌ No matches to resample \n❌ Returning empty DataFrame")
+        return pd.DataFrame()
+
+    player_ids, winner_idx, loser_idx = build_player_index(matches_to_rate_df['winnerId'], matches_to_rate_df['loserId'])
+    score = np.where(matches_to_rate_df['Winner'].to_numpy() == 'tie', 0.5, 1.0) \
+        if 'Winner' in matches_to_rate_df.columns else np.ones(len(matches_to_rate_df))
+    total_matches = np.bincount(winner_idx, minlength=len(player_ids)) + np.bincount(loser_idx, minlength=len(player_ids))
+    ranked_idx = np.flatnonzero(total_matches >= min_matches)
+
+    arrays = {'player_ids': player_ids, 'winner_idx': winner_idx, 'loser_idx': loser_idx,
+              'score': score, 'ranked_idx': ranked_idx}
+
+    cache_path = None
+    if cache_dir:
+        version = dataset_fingerprint((matches_to_rate_df, BOOTSTRAP_FINGERPRINT_COLUMNS))
+        safe_label = info_string.upper().replace(" ", "_")
+        cache_name = f"bootstrap_{metric}_{safe_label}_{version}_{n_replicates}_{confidence}_{min_matches}_{seed}.csv"
+        cache_path = os.path.join(cache_dir, cache_name)
+        if os.path.isfile(cache_path):
+            print(f"✅ Loaded cached bootstrap ranks: {cache_path}")
+            return pd.read_csv(cache_path)
+
+    start_time = time.perf_counter()
+    chunk_sizes = [BOOTSTRAP_CHUNK] * (n_replicates // BOOTSTRAP_CHUNK)
+    if n_replicates % BOOTSTRAP_CHUNK:
+        chunk_sizes.append(n_replicates % BOOTSTRAP_CHUNK)
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    _BOOTSTRAP_ARRAYS.update(arrays)
+    full_values = _metric_values(metric, np.arange(len(winner_idx)))
+    _BOOTSTRAP_ARRAYS.clear()
+    if metric == 'bradley_terry':
+        arrays['full_strength'] = full_values / ELO_SCALE
+
+    if max_workers <= 1:
+        _BOOTSTRAP_ARRAYS.update(arrays)
+        rank_chunks = [_bootstrap_chunk(metric, size, seq) for size, seq in zip(chunk_sizes, seed_sequences)]
+        _BOOTSTRAP_ARRAYS.clear()
+    else:
+        blocks, specs = share_arrays(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_bootstrap_worker,
+                                     initargs=(specs,)) as executor:
+                rank_chunks = list(executor.map(_bootstrap_chunk, [metric] * len(chunk_sizes),
+                                                chunk_sizes, seed_sequences))
+        finally:
+            release_shared_arrays(blocks)
+
+    ranks = np.vstack(rank_chunks)
+    tail = (1 - confidence) / 2 * 100
+
+    results_df = pd.DataFrame({
+        'playerId': player_ids[ranked_idx],
+        'totalMatches': total_matches[ranked_idx],
+        metric: np.round(full_values[ranked_idx], 2),
+        'rank': _rank(full_values[ranked_idx]),
+        'rankMedian': np.median(ranks, axis=0),
+        'rankLow': np.floor(np.percentile(ranks, tail, axis=0)).astype(int),
+        'rankHigh': np.ceil(np.percentile(ranks, 100 - tail, axis=0)).astype(int),
+    })
+
+    player_cols = [col for col in ['playerId', 'PlayerName', 'Gender'] if col in players_df.columns]
+    results_df = results_df.merge(players_df[player_cols].drop_duplicates(subset='playerId'), on='playerId', how='left')
+    results_df = results_df.sort_values(by='rank').reset_index(drop=True)
+
+    print(f"✅ Bootstrap complete in {time.perf_counter() - start_time:.1f}s for {len(ranked_idx)} ranked players.")
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        results_df.to_csv(cache_path, index=False)
+        print(f"✅✅Saved bootstrap ranks to {cache_path}")
+        prune_cache(cache_dir, f"bootstrap_{metric}_{safe_label}_", version)
+
+    return results_df
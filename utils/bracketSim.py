@@ -0,0 +1,201 @@
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from utils.glickoEngine import DEFAULT_RATING, expected_outcome
+
+# Round part of a documentCode (characters 22-26), by number of players in the round
+ROUND_CODES = {'R256': 256, 'R128': 128, 'R64': 64, 'R32': 32, '8FNL': 16, 'QFNL': 8, 'SFNL': 4, 'FNL': 2}
+ROUND_LABELS = {256: 'R256', 128: 'R128', 64: 'R64', 32: 'R32', 16: 'R16', 8: 'QF', 4: 'SF', 2: 'F', 1: 'Winner'}
+# Qualification knockout rounds (RND1 is the first), played before the main draw under the same sub event
+QUALIFICATION_ROUND_PREFIX = 'RND'
+
+# Empty draw slot; a bye loses every match
+BYE_ID = -1
+
+# Simulations per task; fixed so results for a seed do not depend on the number of workers
+SIMULATION_CHUNK = 20_000
+
+
+def parse_round(document_codes: pd.Series) -> pd.DataFrame:
+    """
+    Round code and match number of main draw documentCodes,
+    e.g. 'TTEMSINGLES-----------R1280016...' -> ('R128', 16).
+    Other codes (groups, RND1-RND4 qualification rounds) get NaN.
+    """
+    codes = document_codes.astype(str)
+    round_code = codes.str[22:26].str.rstrip('-')
+    match_number = pd.to_numeric(codes.str[26:30], errors='coerce')
+    is_knockout = round_code.isin(list(ROUND_CODES))
+    return pd.DataFrame({
+        'roundCode': round_code.where(is_knockout),
+        'roundSize': round_code.map(ROUND_CODES),
+        'matchNumber': match_number.where(is_knockout),
+    }, index=document_codes.index)
+
+
+def get_event_draw(matches_df: pd.DataFrame, event_id: int, sub_event_name: str) -> np.ndarray:
+    """
+    The main draw of one event in bracket order, from its knockout rounds.
+
+    Match k of the first round is slots 2k-2 (home) and 2k-1 (away); the winners of
+    matches 2j-1 and 2j meet in match j of the next round. A player who first plays in a
+    later round (after a bye) is placed in the first slot their side of that match covers;
+    slots left without a player are byes. Qualification rounds (RND1-RND4) are not part
+    of the main draw and are ignored.
+
+    Args:
+        matches_df (pd.DataFrame): Matches containing 'eventId', 'subEventName', 'documentCode',
+                                   'winnerId', 'loserId' and 'Winner' ('home' / 'away').
+        event_id (int): The eventId.
+        sub_event_name (str): e.g. 'Men Singles'.
+
+    Returns:
+        np.ndarray: playerIds by draw slot (BYE_ID for byes), or an empty array if no draw is found.
+    """
+    event_df = matches_df[(matches_df['eventId'] == event_id) & (matches_df['subEventName'] == sub_event_name)]
+    rounds_df = parse_round(event_df['documentCode']).dropna()
+
+    if rounds_df.empty:
+        round_codes = event_df['documentCode'].astype(str).str[22:26]
+        if round_codes.str.startswith(QUALIFICATION_ROUND_PREFIX).any():
+            print(f"❌ Only qualification rounds (RND1-RND4) found for eventId {event_id}, {sub_event_name}: "
+                  f"they are not a main draw")
+        else:
+            print(f"❌ No knockout matches found for eventId {event_id}, {sub_event_name}")
+        return np.array([], dtype=np.int64)
+
+    draw_size = int(rounds_df['roundSize'].max())
+    knockout_df = event_df.loc[rounds_df.index]
+    home_won = (knockout_df['Winner'] == 'home').to_numpy()
+    winner_ids = knockout_df['winnerId'].to_numpy(dtype=np.int64)
+    loser_ids = knockout_df['loserId'].to_numpy(dtype=np.int64)
+    home_ids = np.where(home_won, winner_ids, loser_ids)
+    away_ids = np.where(home_won, loser_ids, winner_ids)
+
+    round_sizes = rounds_df['roundSize'].to_numpy(dtype=np.int64)
+    match_numbers = rounds_df['matchNumber'].to_numpy(dtype=np.int64)
+
+    # Largest round first, so a side is only filled from a later round if no earlier match covers it
+    draw = np.full(draw_size, BYE_ID, dtype=np.int64)
+    for i in np.argsort(-round_sizes, kind='stable'):
+        side_size = draw_size // round_sizes[i]
+        if not 1 <= match_numbers[i] <= round_sizes[i] // 2:
+            continue
+        for player_id, start in [(home_ids[i], (2 * match_numbers[i] - 2) * side_size),
+                                 (away_ids[i], (2 * match_numbers[i] - 1) * side_size)]:
+            if (draw[start:start + side_size] == BYE_ID).all() and player_id not in draw:
+                draw[start] = player_id
+
+    print(f"✅ Draw of {draw_size} for eventId {event_id}, {sub_event_name}: "
+          f"{(draw != BYE_ID).sum()} players")
+    return draw
+
+
+def draw_win_matrix(draw: np.ndarray, ratings_df: pd.DataFrame, rating_col: str = 'ratingFinal') -> np.ndarray:
+    """
+    Slot-by-slot win probabilities for a draw: [i, j] is the probability that the
+    player in slot i beats the player in slot j (expected_outcome of their ratings).
+    Unrated players get the starting rating; a bye loses to everyone.
+
+    Args:
+        draw (np.ndarray): playerIds by slot, e.g. from get_event_draw.
+        ratings_df (pd.DataFrame): Ratings containing 'playerId' and rating_col
+                                   (e.g. get_latest_ratings_summary(info_string)).
+        rating_col (str, optional): Defaults to 'ratingFinal'.
+    """
+    ratings = pd.Series(ratings_df[rating_col].to_numpy(dtype=float), index=ratings_df['playerId'].to_numpy())
+    slot_ratings = ratings.reindex(draw).fillna(DEFAULT_RATING).to_numpy()
+
+    win_matrix = expected_outcome(slot_ratings[:, None], slot_ratings[None, :])
+    is_bye = draw == BYE_ID
+    win_matrix[is_bye, :] = 0.0
+    win_matrix[:, is_bye] = 1.0
+    win_matrix[is_bye[:, None] & is_bye[None, :]] = 0.5
+    return win_matrix
+
+
+def _simulate_chunk(win_matrix: np.ndarray, n_simulations: int, seed_sequence: np.random.SeedSequence) -> np.ndarray:
+    """
+    Plays n_simulations brackets at once.
+
+    Returns:
+        np.ndarray: (n_rounds + 1, n_slots) counts of simulations in which each slot
+                    reached each round (row 0 is the first round, the last row is winning).
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n_slots = len(win_matrix)
+    n_rounds = int(np.log2(n_slots))
+
+    reach_counts = np.zeros((n_rounds + 1, n_slots), dtype=np.int64)
+    reach_counts[0] = n_simulations
+
+    alive = np.broadcast_to(np.arange(n_slots, dtype=np.int32), (n_simulations, n_slots))
+    for round_number in range(1, n_rounds + 1):
+        home, away = alive[:, 0::2], alive[:, 1::2]
+        home_wins = rng.random(home.shape) < win_matrix[home, away]
+        alive = np.where(home_wins, home, away)
+        reach_counts[round_number] = np.bincount(alive.ravel(), minlength=n_slots)
+
+    return reach_counts
+
+
+def simulate_bracket(draw: np.ndarray,
+                     ratings_df: pd.DataFrame,
+                     rating_col: str = 'ratingFinal',
+                     n_simulations: int = 100_000,
+                     seed: Optional[int] = None,
+                     max_workers: int = 1) -> pd.DataFrame:
+    """
+    Monte Carlo simulation of a knockout draw. Each round is played for all simulations
+    at once as vectorized draws against the win-probability matrix.
+
+    Simulations run in chunks of SIMULATION_CHUNK, each with its own child seed of seed,
+    so a given seed gives the same result for any max_workers.
+
+    Args:
+        draw (np.ndarray): playerIds by slot (length a power of 2), e.g. from get_event_draw.
+        ratings_df (pd.DataFrame): Ratings containing 'playerId' and rating_col (e.g. Ratings_Summary).
+        rating_col (str, optional): Defaults to 'ratingFinal'.
+        n_simulations (int, optional): Simulated tournaments. Defaults to 100,000.
+        seed (int, optional): Random seed for reproducible results.
+        max_workers (int, optional): Worker processes for the chunks. Defaults to 1 (no pool).
+
+    Returns:
+        pd.DataFrame: One row per player with the probability of reaching each round
+                      ('R128', ..., 'QF', 'SF', 'F') and of winning ('Winner'), best first.
+    """
+    draw = np.asarray(draw, dtype=np.int64)
+    n_slots = len(draw)
+    if n_slots < 2 or n_slots & (n_slots - 1):
+        print(f"❌ Draw size must be a power of 2 (got {n_slots}) \n❌ Returning empty DataFrame")
+        return pd.DataFrame()
+
+    print(f"--- 🎲 Simulating a {n_slots}-player draw {n_simulations} times ---")
+    start_time = time.perf_counter()
+
+    win_matrix = draw_win_matrix(draw, ratings_df, rating_col)
+    chunk_sizes: List[int] = [SIMULATION_CHUNK] * (n_simulations // SIMULATION_CHUNK)
+    if n_simulations % SIMULATION_CHUNK:
+        chunk_sizes.append(n_simulations % SIMULATION_CHUNK)
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    if max_workers <= 1 or len(chunk_sizes) == 1:
+        chunk_counts = [_simulate_chunk(win_matrix, size, seq) for size, seq in zip(chunk_sizes, seed_sequences)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(chunk_sizes))) as executor:
+            chunk_counts = list(executor.map(_simulate_chunk, [win_matrix] * len(chunk_sizes),
+                                             chunk_sizes, seed_sequences))
+
+    reach_probability = np.sum(chunk_counts, axis=0) / n_simulations
+
+    round_sizes = [n_slots >> round_number for round_number in range(len(reach_probability))]
+    results_df = pd.DataFrame(reach_probability.T, columns=[ROUND_LABELS.get(size, f'R{size}') for size in round_sizes])
+    results_df.insert(0, 'playerId', draw)
+    results_df.insert(1, 'slot', np.arange(n_slots))
+    results_df = results_df[results_df['playerId'] != BYE_ID]
+
+    print(f"✅ Simulation complete in {time.perf_counter() - start_time:.2f}s")
+    return results_df.sort_values(by=['Winner', 'slot'], ascending=[False, True]).reset_index(drop=True)
@@ -0,0 +1,284 @@
+import io
+import os
+import time
+import itertools
+import contextlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from utils.glickoEngine import (
+    RATING_PERIODS, DEFAULT_TAU, DEFAULT_RD, DEFAULT_VOL, MARGIN_MODES,
+    GlickoState, select_matches_to_rate, get_match_arrays, run_glicko2, expected_outcome
+)
+from utils.ratings import calculate_ratings_history, calculate_margin_ratings_history
+from utils.segments import share_arrays, attach_shared_arrays, release_shared_arrays
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_CALIBRATION_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Calibration')
+
+# Share of the most recent matches held out for scoring; earlier matches are rating burn-in
+DEFAULT_HOLDOUT_FRACTION = 0.25
+PROBABILITY_CLIP = 1e-15
+
+# Glicko-2 system constant, starting RD and starting volatility
+DEFAULT_PARAMETER_GRID = {
+    'tau': [0.2, 0.3, 0.5, 0.75, 1.0, 1.2],
+    'rd': [150, 200, 250, 300, 350],
+    'vol': [0.03, 0.06, 0.09, 0.12],
+}
+
+# Blend weights of the margin share tried by compare_margin_ratings
+DEFAULT_MARGIN_WEIGHTS = [0.25, 0.5, 0.75, 1.0]
+
+# Worker process globals, set by _init_sweep_worker
+_SWEEP_BLOCKS = []
+_SWEEP_ARRAYS: Dict[str, np.ndarray] = {}
+
+
+def holdout_start_date(matches_df: pd.DataFrame, holdout_fraction: float = DEFAULT_HOLDOUT_FRACTION) -> str:
+    """
+    matchDate from which the last holdout_fraction of matches are scored.
+    """
+    match_dates = matches_df['matchDate'].dropna().astype(str).sort_values().to_numpy()
+    if len(match_dates) == 0:
+        return ""
+    return match_dates[int(len(match_dates) * (1 - holdout_fraction))] if holdout_fraction < 1 else match_dates[0]
+
+
+def score_predictions(history_df: pd.DataFrame, info_string: str = "",
+                      eval_start_date: Optional[str] = None) -> Dict[str, float]:
+    """
+    Scores the pre-match win probabilities of a ratings history.
+
+    The probability is the expected_outcome formula applied to the pre-match ratings
+    (the stored expected_outcome column is rounded to 2dp, too coarse for log-loss).
+    Outcomes are from the winner's side: 1 for a win, 0.5 for a tie.
+
+    Args:
+        history_df (pd.DataFrame): Output of calculate_ratings_history.
+        info_string (str, optional): The info_string used for history_df. Defaults to "".
+        eval_start_date (str, optional): Only matches on or after this matchDate are scored.
+
+    Returns:
+        Dict[str, float]: n_scored, log_loss, brier, accuracy (ties excluded from accuracy).
+    """
+    suffix = f" ({info_string})" if info_string else ""
+
+    scored_df = history_df
+    if eval_start_date:
+        scored_df = history_df[history_df['matchDate'].astype(str) >= eval_start_date]
+
+    probability = expected_outcome(scored_df[f'winner_rating_pre{suffix}'].to_numpy(dtype=float),
+                                   scored_df[f'loser_rating_pre{suffix}'].to_numpy(dtype=float))
+    outcome = np.where(scored_df['Winner'].to_numpy() == 'tie', 0.5, 1.0)
+    return prediction_scores(probability, outcome)
+
+
+def prediction_scores(probability: np.ndarray, outcome: np.ndarray) -> Dict[str, float]:
+    """
+    n_scored, log_loss, brier and accuracy of the winner's win probabilities
+    (outcome 1 for a win, 0.5 for a tie; ties are excluded from accuracy).
+    """
+    probability = np.clip(probability, PROBABILITY_CLIP, 1 - PROBABILITY_CLIP)
+
+    if len(outcome) == 0:
+        return {'n_scored': 0, 'log_loss': np.nan, 'brier': np.nan, 'accuracy': np.nan}
+
+    decided = outcome != 0.5
+    return {
+        'n_scored': int(len(outcome)),
+        'log_loss': float(-np.mean(outcome * np.log(probability) + (1 - outcome) * np.log(1 - probability))),
+        'brier': float(np.mean((probability - outcome) ** 2)),
+        'accuracy': float(np.mean(probability[decided] > 0.5)) if decided.any() else np.nan,
+    }
+
+
+def compare_rating_periods(players_df: pd.DataFrame, matches_df: pd.DataFrame,
+                           rating_periods: Iterable[str] = RATING_PERIODS,
+                           holdout_fraction: float = DEFAULT_HOLDOUT_FRACTION) -> pd.DataFrame:
+    """
+    Benchmarks the per-match engine against the rating-period modes:
+    run time of calculate_ratings_history and predictive scores on the held-out
+    (most recent) matches.
+
+    Returns:
+        pd.DataFrame: one row per rating_period with seconds, n_scored, log_loss, brier, accuracy,
+                      sorted by log_loss.
+    """
+    eval_start_date = holdout_start_date(matches_df, holdout_fraction)
+    print(f"--- ⏱️ Comparing rating periods {tuple(rating_periods)} (scoring matches from {eval_start_date}) ---")
+
+    rows = []
+    for rating_period in rating_periods:
+        with contextlib.redirect_stdout(io.StringIO()):
+            # warm-up run so one-off compilation of the engine is not timed
+            calculate_ratings_history(players_df, matches_df.head(100), rating_period=rating_period)
+
+        start_time = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            history_df = calculate_ratings_history(players_df, matches_df, rating_period=rating_period)
+        seconds = time.perf_counter() - start_time
+
+        scores = score_predictions(history_df, eval_start_date=eval_start_date)
+        rows.append({'rating_period': rating_period, 'seconds': round(seconds, 3), **scores})
+        print(f"✅ {rating_period}: {seconds:.2f}s, log-loss {scores['log_loss']:.4f}")
+
+    return pd.DataFrame(rows).sort_values(by='log_loss').reset_index(drop=True)
+
+
+def compare_margin_ratings(players_df: pd.DataFrame, matches_df: pd.DataFrame,
+                           margin_modes: Iterable[str] = MARGIN_MODES,
+                           margin_weights: Iterable[float] = DEFAULT_MARGIN_WEIGHTS,
+                           holdout_fraction: float = DEFAULT_HOLDOUT_FRACTION) -> pd.DataFrame:
+    """
+    Scores the margin-aware ratings against standard Glicko-2 on the held-out matches.
+    Every run of calculate_margin_ratings_history rates both sets in one scan, so the
+    standard row comes from the first run and each margin mode / weight adds one row.
+    All ratings are scored on predicting the match winner.
+
+    Returns:
+        pd.DataFrame: one row per margin_mode / margin_weight ('result' for standard Glicko-2) with
+                      seconds (of the dual run), n_scored, log_loss, brier, accuracy, sorted by log_loss.
+    """
+    margin_modes, margin_weights = list(margin_modes), list(margin_weights)
+    eval_start_date = holdout_start_date(matches_df, holdout_fraction)
+    print(f"--- ⏱️ Comparing margin ratings {tuple(margin_modes)} x {tuple(margin_weights)} "
+          f"(scoring matches from {eval_start_date}) ---")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # warm-up run so one-off compilation of the engine is not timed
+        calculate_margin_ratings_history(players_df, matches_df.head(100))
+
+    rows = []
+    for margin_mode in margin_modes:
+        for margin_weight in margin_weights:
+            start_time = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                history_df, margin_history_df = calculate_margin_ratings_history(
+                    players_df, matches_df, margin_mode=margin_mode, margin_weight=margin_weight, margin_info_string="")
+            seconds = time.perf_counter() - start_time
+
+            if not rows:
+                scores = score_predictions(history_df, eval_start_date=eval_start_date)
+                rows.append({'margin_mode': 'result', 'margin_weight': 0.0, 'seconds': round(seconds, 3), **scores})
+                print(f"✅ result: log-loss {scores['log_loss']:.4f}")
+
+            scores = score_predictions(margin_history_df, eval_start_date=eval_start_date)
+            rows.append({'margin_mode': margin_mode, 'margin_weight': margin_weight,
+                         'seconds': round(seconds, 3), **scores})
+            print(f"✅ {margin_mode} x {margin_weight}: {seconds:.2f}s, log-loss {scores['log_loss']:.4f}")
+
+    return pd.DataFrame(rows).sort_values(by='log_loss').reset_index(drop=True)
+
+
+def _init_sweep_worker(array_specs) -> None:
+    blocks, arrays = attach_shared_arrays(array_specs)
+    _SWEEP_BLOCKS.extend(blocks)
+    _SWEEP_ARRAYS.update(arrays)
+
+
+def _score_parameters(params: Dict[str, float]) -> Dict[str, float]:
+    """
+    Runs the engine over all matches with one parameter set and scores the held-out matches.
+    """
+    state = GlickoState.fresh(_SWEEP_ARRAYS['player_ids'], rd=params['rd'], vol=params['vol'], tau=params['tau'])
+    ratings = run_glicko2(state, _SWEEP_ARRAYS['winner_idx'], _SWEEP_ARRAYS['loser_idx'], _SWEEP_ARRAYS['score'])
+
+    eval_mask = _SWEEP_ARRAYS['eval_mask']
+    probability = expected_outcome(ratings['winner_rating_pre'][eval_mask], ratings['loser_rating_pre'][eval_mask])
+    return {**params, **prediction_scores(probability, _SWEEP_ARRAYS['score'][eval_mask])}
+
+
+def _parameter_points(parameter_grid: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    """
+    Every combination of the grid values; parameters missing from the grid keep the defaults.
+    """
+    defaults = {'tau': DEFAULT_TAU, 'rd': DEFAULT_RD, 'vol': DEFAULT_VOL}
+    unknown = set(parameter_grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown rating parameters: {sorted(unknown)} (use {list(defaults)})")
+
+    grid = {name: list(parameter_grid.get(name, [default])) for name, default in defaults.items()}
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+def sweep_rating_parameters(players_df: pd.DataFrame,
+                            matches_df: pd.DataFrame,
+                            parameter_grid: Optional[Dict[str, List[float]]] = None,
+                            holdout_fraction: float = DEFAULT_HOLDOUT_FRACTION,
+                            max_workers: Optional[int] = None,
+                            report_dir: Optional[str] = DEFAULT_CALIBRATION_DIR) -> pd.DataFrame:
+    """
+    Scores every point of a Glicko-2 parameter grid (tau, starting RD, starting volatility)
+    by log-loss, Brier score and accuracy of the expected_outcome probabilities on the
+    held-out most recent matches. Each point rates all matches in order, so held-out
+    predictions only use earlier results.
+
+    Matches are prepared once and shared with the worker processes through shared memory;
+    a task only carries its parameter values.
+
+    Args:
+        players_df (pd.DataFrame): Players containing 'playerId'.
+        matches_df (pd.DataFrame): All matches, as for calculate_ratings_history.
+        parameter_grid (Dict[str, List[float]], optional): Values per parameter ('tau', 'rd', 'vol').
+                                                           Defaults to DEFAULT_PARAMETER_GRID.
+        holdout_fraction (float, optional): Share of the latest matches to score. Defaults to 0.25.
+        max_workers (int, optional): Worker processes. Defaults to the CPU count.
+        report_dir (str, optional): Where the ranked report CSV is written. None skips writing.
+
+    Returns:
+        pd.DataFrame: One row per parameter point, ranked by log-loss (rank 1 = best).
+    """
+    parameter_points = _parameter_points(parameter_grid or DEFAULT_PARAMETER_GRID)
+    print(f"--- 🎯 Rating parameter sweep: {len(parameter_points)} configurations ---")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        matches_to_rate_df = select_matches_to_rate(players_df, matches_df)
+    state = GlickoState.fresh(players_df['playerId'].dropna())
+    winner_idx, loser_idx, score = get_match_arrays(state, matches_to_rate_df)
+
+    eval_start_date = holdout_start_date(matches_to_rate_df, holdout_fraction)
+    eval_mask = (matches_to_rate_df['matchDate'].astype(str) >= eval_start_date).to_numpy()
+    print(f"🏓 {len(matches_to_rate_df)} rated matches, {eval_mask.sum()} scored (from {eval_start_date})")
+
+    arrays = {'player_ids': state.player_ids, 'winner_idx': winner_idx, 'loser_idx': loser_idx,
+              'score': score, 'eval_mask': eval_mask}
+
+    start_time = time.perf_counter()
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    if max_workers <= 1:
+        _SWEEP_ARRAYS.update(arrays)
+        rows = [_score_parameters(params) for params in parameter_points]
+        _SWEEP_ARRAYS.clear()
+    else:
+        blocks, specs = share_arrays(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                                     initargs=(specs,)) as executor:
+                chunksize = max(1, len(parameter_points) // (4 * max_workers))
+                rows = list(executor.map(_score_parameters, parameter_points, chunksize=chunksize))
+        finally:
+            release_shared_arrays(blocks)
+
+    report_df = pd.DataFrame(rows).sort_values(by=['log_loss', 'brier']).reset_index(drop=True)
+    report_df.insert(0, 'rank', np.arange(1, len(report_df) + 1))
+    print(f"✅ Sweep complete in {time.perf_counter() - start_time:.1f}s. "
+          f"Best: tau={report_df.loc[0, 'tau']}, rd={report_df.loc[0, 'rd']}, vol={report_df.loc[0, 'vol']} "
+          f"(log-loss {report_df.loc[0, 'log_loss']:.4f})")
+
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+        date_string = datetime.now().strftime("%Y%m%d")
+        report_path = os.path.join(report_dir, f"{date_string}_rating_calibration.csv")
+        report_df.to_csv(report_path, index=False)
+        print(f"✅✅Saved calibration report to {report_path}")
+
+    return report_df
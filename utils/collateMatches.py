@@ -0,0 +1,734 @@
+import os
+import glob
+import json
+import hashlib
+import pandas as pd
+from datetime import date
+from typing import List, Dict, Tuple, Optional, Set
+
+from utils.fingerprints import dataset_fingerprint
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_RAW_MATCH_DETAILS_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Raw', 'Match_details')
+DEFAULT_CLEANED_MATCHES_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Processed', 'Matches')
+DEFAULT_SCORE_AMENDMENTS_PATH = os.path.join(DEFAULT_CLEANED_MATCHES_DIR, 'score_errors_AMENDED.csv')
+DEFAULT_ID_FIXES_PATH = os.path.join(DEFAULT_CLEANED_MATCHES_DIR, 'fuzzy_matches_fixed.csv')
+
+# --- Default Constants for Functions ---
+MANIFEST_FILENAME = "collate_manifest.json"
+MATCH_DETAILS_PATTERN = "*_match_details.json"
+STABLE_KEY = ['eventId', 'documentCode']
+# Event columns joined into the cleaned rows
+EVENT_INPUT_COLUMNS = ['eventId', 'EventName', 'StartDate']
+
+DROP_COLUMNS_START = ["resultStatus", "playByPlaySequenceNumber"]
+JUNK_PATTERN_CAPTURE = r'([^\d,-]+)'
+JUNK_PATTERN_CLEAN = r'[^\d,-]+'
+
+SCORE_RENAME_DICT = {
+    "gameScores": "A_rawGameScores",
+    "resultsGameScores": "B_rawGameScores",
+    "overallScores": "A_rawOverallScore",
+    "resultOverallScores": "B_rawOverallScore"
+}
+
+DATES_HIERARCHY = ['matchStartTimeUTC', 'startDateUTC', 'startDateLocal', 'EventStartDate']
+
+# Macau World Cup 2024 / 2025 group games are not played to a fixed best-of.
+WORLD_CUP_EVENT_IDS = [2937, 3109]
+PARIS_OLYMPICS_EVENT_ID = 2603
+
+
+def hash_file(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Returns the sha256 hex digest of a file, read in chunks so large
+    match details files do not need to be held in memory.
+    """
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def load_manifest(cleaned_dir: str = DEFAULT_CLEANED_MATCHES_DIR) -> Dict:
+    """
+    Loads the collate manifest stored next to the cleaned matches output.
+    The manifest records which cleaned file was written last, the hash,
+    size and mtime of every raw match details file it was built from and
+    the hashes of the other inputs (get_input_hashes).
+
+    Returns:
+        Dict: the manifest, or an empty manifest if none exists / it is unreadable.
+    """
+    manifest_path = os.path.join(cleaned_dir, MANIFEST_FILENAME)
+    empty_manifest = {"cleaned_file": None, "files": {}, "inputs": {}}
+
+    if not os.path.isfile(manifest_path):
+        return empty_manifest
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"❌ Error reading collate manifest {manifest_path}: {e}. Rebuilding from scratch.")
+        return empty_manifest
+
+    manifest.setdefault("cleaned_file", None)
+    manifest.setdefault("files", {})
+    manifest.setdefault("inputs", {})
+    return manifest
+
+
+def save_manifest(manifest: Dict, cleaned_dir: str = DEFAULT_CLEANED_MATCHES_DIR) -> None:
+    os.makedirs(cleaned_dir, exist_ok=True)
+    manifest_path = os.path.join(cleaned_dir, MANIFEST_FILENAME)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4)
+
+
+def get_changed_match_files(raw_dir: str, manifest: Dict) -> Tuple[List[str], List[str], Dict]:
+    """
+    Compares the raw match details files on disk against the manifest.
+    Files whose size and mtime are unchanged are trusted without rehashing,
+    so only new or touched files are read from disk.
+
+    Returns:
+        Tuple[List[str], List[str], Dict]:
+            1. changed_files: paths of new or modified files (by hash)
+            2. removed_files: filenames in the manifest that no longer exist
+            3. file_records: updated manifest 'files' entries for every file on disk
+    """
+    previous_records = manifest.get("files", {})
+    all_files = sorted(glob.glob(os.path.join(raw_dir, MATCH_DETAILS_PATTERN)))
+
+    changed_files = []
+    file_records = {}
+
+    for file in all_files:
+        filename = os.path.basename(file)
+        stat = os.stat(file)
+        previous = previous_records.get(filename)
+
+        if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+            file_records[filename] = previous
+            continue
+
+        file_hash = hash_file(file)
+        file_records[filename] = {"sha256": file_hash, "size": stat.st_size, "mtime": stat.st_mtime}
+
+        if not previous or previous.get("sha256") != file_hash:
+            changed_files.append(file)
+
+    removed_files = [filename for filename in previous_records if filename not in file_records]
+
+    return changed_files, removed_files, file_records
+
+
+def event_id_from_filename(filename: str) -> Optional[int]:
+    event_id = os.path.basename(filename).split('_')[0]
+    return int(event_id) if event_id.isdigit() else None
+
+
+def _event_ids(filenames) -> Set[int]:
+    event_ids = {event_id_from_filename(filename) for filename in filenames}
+    event_ids.discard(None)
+    return event_ids
+
+
+def get_input_hashes(events_df: pd.DataFrame,
+                     event_ids: Set[int],
+                     score_amendments_path: Optional[str] = DEFAULT_SCORE_AMENDMENTS_PATH,
+                     id_fixes_path: Optional[str] = DEFAULT_ID_FIXES_PATH) -> Dict[str, Optional[str]]:
+    """
+    Hashes of the inputs besides the raw match details files that end up in the cleaned rows:
+    the score amendments, the id fixes and the EVENT_INPUT_COLUMNS of the collated events
+    (event_ids), so adding new events does not change the hash.
+    """
+    def file_hash(path):
+        return hash_file(path) if path and os.path.isfile(path) else None
+
+    collated_events_df = events_df[EVENT_INPUT_COLUMNS].assign(
+        eventId=pd.to_numeric(events_df['eventId'], errors='coerce'))
+    collated_events_df = collated_events_df[collated_events_df['eventId'].isin(event_ids)]
+    collated_events_df = collated_events_df.drop_duplicates(subset='eventId').sort_values(by='eventId')
+
+    return {
+        "score_amendments": file_hash(score_amendments_path),
+        "id_fixes": file_hash(id_fixes_path),
+        "events": dataset_fingerprint((collated_events_df.astype(str), EVENT_INPUT_COLUMNS)),
+    }
+
+
+def read_match_details(files: List[str]) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Parses the match details json files (one list of matches per event) into a single DataFrame.
+
+    Returns:
+        Tuple[pd.DataFrame, List[str]]: the matches of the files that could be read, and the
+                                        files that could not (unreadable or not a list of matches).
+    """
+    all_matches = []
+    failed_files = []
+    for file in files:
+        try:
+            with open(file, 'r', encoding='utf-8') as f:
+                matches = json.load(f)
+            if not isinstance(matches, list):
+                raise ValueError(f"expected a list of matches, got {type(matches).__name__}")
+            all_matches.extend(matches)
+        except (json.JSONDecodeError, OSError, UnicodeDecodeError, ValueError) as e:
+            print(f"❌ Error reading {os.path.basename(file)}: {e}. Skipping file.")
+            failed_files.append(file)
+
+    return pd.DataFrame(all_matches), failed_files
+
+
+# --- Row-wise extraction helpers (ported from notebook 09) ---
+
+def extract_competitor_details(competitor_list) -> pd.Series:
+    """
+    Extracts only the top-level competitor details (Name, ID, ORG)
+    for Home (H) and Away (A) competitors, ignoring the nested 'players' dict.
+    """
+    data = {}
+
+    if not isinstance(competitor_list, list) or len(competitor_list) < 2:
+        return pd.Series(data, dtype=object)
+
+    try:
+        for comp in competitor_list:
+            comp_type = comp.get('competitorType')
+
+            if comp_type == 'H':
+                prefix = 'home'
+            elif comp_type == 'A':
+                prefix = 'away'
+            else:
+                continue
+
+            data[f'{prefix}CompetitorId'] = comp.get('competitiorId', pd.NA)
+            data[f'{prefix}CompetitorOrg'] = comp.get('competitiorOrg', pd.NA)
+            data[f'{prefix}Player'] = [player.get('playerName', pd.NA) for player in comp.get('players') or []]
+            data[f'{prefix}NestedGameScores'] = comp.get('scores', pd.NA)
+
+    except Exception as e:
+        print(f"Error processing row: {e} | Data: {competitor_list}")
+
+    return pd.Series(data, dtype=object)
+
+
+def extract_format(config) -> pd.Series:
+    data = {"bestOf": pd.NA, "ttrReview": pd.NA}
+    if isinstance(config, dict):
+        data['bestOf'] = config.get('bestOfXGames')
+        data['ttrReview'] = config.get('tTRReview')
+    return pd.Series(data, dtype=object)
+
+
+def extract_next_server(action) -> pd.Series:
+    # serverNext = NEXT SERVER AFTER THE MATCH POINT WAS DONE
+    data = {"serverNext": pd.NA, "actionType": pd.NA}
+    if isinstance(action, dict):
+        data["serverNext"] = action.get("serverNext")
+        data["actionType"] = action.get("actionType")
+    return pd.Series(data, dtype=object)
+
+
+def extract_times(match_time) -> pd.Series:
+    data = {"duration (unreliable)": pd.NA, "startDateLocal": pd.NA, "startDateUTC": pd.NA}
+    if isinstance(match_time, dict):
+        data['duration (unreliable)'] = match_time.get('duration')
+        data['startDateLocal'] = match_time.get('startDateLocal')
+        data['startDateUTC'] = match_time.get('startDateUTC')
+    return pd.Series(data, dtype=object)
+
+
+def calculate_nested_scores(home_points_str, away_points_str) -> pd.Series:
+    """
+    Calculates the game scores and overall match score from point total strings.
+    Returns: (calc_game_scores_str, calc_overall_scores_str)
+    """
+    if pd.isna(home_points_str) or pd.isna(away_points_str):
+        return pd.Series([pd.NA, pd.NA])
+
+    try:
+        home_points = [int(p.strip()) for p in str(home_points_str).split(',') if p.strip()]
+        away_points = [int(p.strip()) for p in str(away_points_str).split(',') if p.strip()]
+    except ValueError:
+        return pd.Series([pd.NA, pd.NA])
+
+    home_games_won = 0
+    away_games_won = 0
+    game_scores = []
+
+    for h_pts, a_pts in zip(home_points, away_points):
+        # Skip 0-0 games
+        if h_pts == 0 and a_pts == 0:
+            continue
+
+        game_scores.append(f'{h_pts}-{a_pts}')
+
+        if h_pts > a_pts:
+            home_games_won += 1
+        elif a_pts > h_pts:
+            away_games_won += 1
+
+    return pd.Series([','.join(game_scores), f'{home_games_won}-{away_games_won}'])
+
+
+def get_democratic_score(row) -> str:
+    """
+    Compare all scores - if 2 or more agree that value is used,
+    otherwise scores are taken in order of s1, s2, s3.
+    """
+    valid_scores = [s for s in row if s != ""]
+    if not valid_scores:
+        return ""
+    mode_result = pd.Series(valid_scores).mode()
+    if not mode_result.empty:
+        return mode_result.iloc[0]
+    return row['s1']
+
+
+def get_overall_score_winner(row):
+    try:
+        home_score, away_score = map(int, row["reconciledOverallScore"].split("-")[:2])
+    except Exception:
+        return pd.NA
+
+    if home_score > away_score:
+        return "home"
+    elif away_score > home_score:
+        return "away"
+    return "tie"
+
+
+def check_game_score_validity(score_str: str) -> str:
+    """
+    Checks if a single game score (e.g., '11-8' or '13-11') is valid.
+    Returns a status string: 'Valid', 'Incomplete', or 'Invalid'.
+    """
+    try:
+        home, away = map(int, score_str.split('-'))
+    except ValueError:
+        return "Invalid_Format"
+
+    if home == 0 and away == 0:
+        return "Incomplete"
+
+    if max(home, away) >= 11:
+        return "Valid" if abs(home - away) >= 2 else "Invalid_Too_Close"
+    return "Invalid_Too_Low"
+
+
+def calculate_reconciled_game_scores_winner(row) -> pd.Series:
+    score_string = row.get("reconciledGameScore")
+
+    winner_result = "error"
+    game_status_flags = []
+
+    if pd.isna(score_string) or not score_string:
+        winner_result = pd.NA
+    else:
+        home_tally = 0
+        away_tally = 0
+
+        for game_score_pair in score_string.split(","):
+            game_score_pair = game_score_pair.strip()
+            if not game_score_pair:
+                continue
+
+            game_status = check_game_score_validity(game_score_pair)
+            if game_status != "Valid":
+                game_status_flags.append(f"{game_score_pair}:{game_status}")
+
+            try:
+                home_score, away_score = map(int, game_score_pair.split('-'))
+            except ValueError:
+                winner_result = "Error_Parsing"
+                break
+
+            if home_score > away_score:
+                home_tally += 1
+            elif away_score > home_score:
+                away_tally += 1
+
+        if winner_result != "Error_Parsing":
+            if home_tally > away_tally:
+                winner_result = "home"
+            elif away_tally > home_tally:
+                winner_result = "away"
+            else:
+                winner_result = "tie"
+
+    return pd.Series({
+        'calculatedGameScoreWinner': winner_result,
+        'gameScoreFlags': "; ".join(game_status_flags)
+    })
+
+
+def get_best_of(row):
+    try:
+        home_score, away_score = map(int, row["reconciledOverallScore"].split("-")[:2])
+    except Exception:
+        return pd.NA
+
+    match max(home_score, away_score):
+        case 4:
+            return 7
+        case 3:
+            return 5
+        case _:
+            return 0
+
+
+def _normalise_scores(series: pd.Series) -> pd.Series:
+    return series.astype(str).str.strip().replace({'nan': '', 'NaT': '', '<NA>': '', 'None': ''})
+
+
+def _apply_series(df: pd.DataFrame, column: str, func) -> pd.DataFrame:
+    """
+    Applies a row extractor returning a Series to a column and joins the result,
+    dropping the source column (as in notebook 09).
+    """
+    if column not in df.columns:
+        return df
+    extracted_df = df[column].apply(func)
+    df = pd.concat([df.drop(columns=[column]), extracted_df], axis=1)
+    return df
+
+
+def _set_game_score_winners(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.drop(columns=["gameScoreFlags", "calculatedGameScoreWinner", "reconciledOverallScoreWinner"], errors="ignore")
+    df["reconciledOverallScoreWinner"] = df.apply(get_overall_score_winner, axis=1)
+    new_cols_df = df.apply(calculate_reconciled_game_scores_winner, axis=1, result_type='expand')
+    if new_cols_df.empty:
+        new_cols_df = pd.DataFrame(columns=['calculatedGameScoreWinner', 'gameScoreFlags'], index=df.index)
+    return pd.concat([df, new_cols_df], axis=1)
+
+
+def clean_match_details(raw_matches_df: pd.DataFrame,
+                        events_df: pd.DataFrame,
+                        score_amendments_df: Optional[pd.DataFrame] = None,
+                        id_fixes_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Runs the notebook 09 cleaning pipeline on a batch of raw match details.
+    Every step is row-wise (or keyed on eventId / documentCode), so a batch made of
+    a few events cleans to exactly the rows a full rebuild would produce for them.
+
+    Args:
+        raw_matches_df (pd.DataFrame): Raw match details as parsed from the json files.
+        events_df (pd.DataFrame): Master events, containing 'eventId', 'EventName', 'StartDate'.
+        score_amendments_df (pd.DataFrame, optional): Manually amended score errors (score_errors_AMENDED.csv).
+        id_fixes_df (pd.DataFrame, optional): Tokyo 2020 player id fixes (fuzzy_matches_fixed.csv).
+
+    Returns:
+        pd.DataFrame: cleaned matches for the batch.
+    """
+    cleaned_matches_df = raw_matches_df.copy()
+    cleaned_matches_df.dropna(axis=0, how='all', inplace=True)
+    cleaned_matches_df.drop(columns=DROP_COLUMNS_START, inplace=True, errors='ignore')
+
+    if cleaned_matches_df.empty:
+        return cleaned_matches_df
+
+    # --- dnf flags and junk removal from the raw score strings ---
+    for col in SCORE_RENAME_DICT:
+        if col not in cleaned_matches_df.columns:
+            cleaned_matches_df[col] = pd.NA
+        cleaned_matches_df[col] = cleaned_matches_df[col].astype("string")
+
+    dnf = cleaned_matches_df["overallScores"].str.extract(JUNK_PATTERN_CAPTURE, expand=False).str.strip()
+    dnf = dnf.fillna(cleaned_matches_df["resultOverallScores"].str.extract(JUNK_PATTERN_CAPTURE, expand=False).str.strip())
+
+    for col in SCORE_RENAME_DICT:
+        cleaned_matches_df[col] = cleaned_matches_df[col].str.replace(JUNK_PATTERN_CLEAN, '', regex=True)
+
+    cleaned_matches_df["dnf"] = dnf.astype(object).where(dnf.notna(), False)
+    cleaned_matches_df.rename(columns=SCORE_RENAME_DICT, inplace=True)
+
+    # --- drop team parent rows and team summaries ---
+    if "teamParentData" in cleaned_matches_df.columns:
+        team_parent_filter = cleaned_matches_df["teamParentData"].notna()
+        cleaned_matches_df = cleaned_matches_df[~team_parent_filter].copy()
+    team_cols = [col for col in cleaned_matches_df.columns if "team" in col.lower()]
+    cleaned_matches_df.drop(columns=team_cols, inplace=True)
+
+    # --- drop para and age limited matches ---
+    age_limit_mask = cleaned_matches_df['subEventName'].str.contains(r"U\d{2}", case=False, na=False)
+    para_class_mask = cleaned_matches_df['subEventName'].str.contains("class", case=False, na=False)
+    cleaned_matches_df = cleaned_matches_df[~(age_limit_mask | para_class_mask)].copy()
+
+    if cleaned_matches_df.empty:
+        return cleaned_matches_df
+
+    # --- nested dict / list columns ---
+    cleaned_matches_df = _apply_series(cleaned_matches_df, 'competitiors', extract_competitor_details)
+    for col in ["homePlayer", "awayPlayer"]:
+        if col in cleaned_matches_df.columns:
+            cleaned_matches_df[col] = cleaned_matches_df[col].str[0]
+    cleaned_matches_df = _apply_series(cleaned_matches_df, 'matchConfig', extract_format)
+    cleaned_matches_df = _apply_series(cleaned_matches_df, 'action', extract_next_server)
+    cleaned_matches_df = _apply_series(cleaned_matches_df, 'matchDateTime', extract_times)
+
+    # --- event names and start dates ---
+    event_dates_df = events_df[["EventName", "eventId", "StartDate"]].rename(columns={"StartDate": "EventStartDate"})
+    event_dates_df = event_dates_df.drop_duplicates(subset=["eventId"])
+    cleaned_matches_df["eventId"] = cleaned_matches_df["eventId"].astype(int)
+    cleaned_matches_df = cleaned_matches_df.drop(columns=["EventName"], errors="ignore").merge(
+        event_dates_df, on='eventId', how='left', validate='m:1'
+    )
+
+    for col in DATES_HIERARCHY:
+        if col not in cleaned_matches_df.columns:
+            cleaned_matches_df[col] = pd.NaT
+        cleaned_matches_df[col] = pd.to_datetime(cleaned_matches_df[col], errors='coerce', utc=True)
+
+    cleaned_matches_df = cleaned_matches_df.sort_values(by=["EventStartDate", "startDateLocal", "matchStartTimeUTC"], kind="stable")
+
+    # One entry for muscat 2025 has a clearly erroneous date - let the fillna hierarchy handle it.
+    muscat_mask = (cleaned_matches_df["eventId"] == 3084) & \
+                  (cleaned_matches_df["documentCode"] == "TTEWSINGLES-----------GP11000400----------")
+    cleaned_matches_df.loc[muscat_mask, "matchStartTimeUTC"] = pd.NaT
+
+    cleaned_matches_df['matchDate'] = cleaned_matches_df[DATES_HIERARCHY[0]]
+    for col in DATES_HIERARCHY[1:]:
+        cleaned_matches_df['matchDate'] = cleaned_matches_df['matchDate'].fillna(cleaned_matches_df[col])
+    cleaned_matches_df = cleaned_matches_df.drop(columns=DATES_HIERARCHY[:-1], errors='ignore')
+
+    # --- calculate scores from the nested home / away point lists ---
+    for col in ["homeNestedGameScores", "awayNestedGameScores"]:
+        if col not in cleaned_matches_df.columns:
+            cleaned_matches_df[col] = pd.NA
+    new_score_cols = cleaned_matches_df.apply(
+        lambda row: calculate_nested_scores(row['homeNestedGameScores'], row['awayNestedGameScores']),
+        axis=1,
+        result_type='expand'
+    )
+    new_score_cols.columns = ['calcNestedGameScores', 'calcNestedOverallScores']
+    cleaned_matches_df = pd.concat([cleaned_matches_df, new_score_cols], axis=1)
+
+    # normalise scores by removing 0-0 games (unplayed sets) and strings without non-zero digits
+    for col in ["A_rawGameScores", "B_rawGameScores"]:
+        cleaned_matches_df[col] = cleaned_matches_df[col].str.replace(',0-0', '')
+
+    scores_columns = [col for col in cleaned_matches_df.columns if "score" in col.lower()]
+    for col in scores_columns:
+        cleaned_matches_df[col] = cleaned_matches_df[col].astype(object)
+        no_digits_mask = ~cleaned_matches_df[col].astype(str).str.contains(r'[1-9]', regex=True, na=False)
+        cleaned_matches_df.loc[no_digits_mask, col] = pd.NA
+
+    for col in ["calcNestedGameScores", "homeNestedGameScores", "awayNestedGameScores",
+                "A_rawOverallScore", "B_rawOverallScore"]:
+        cleaned_matches_df[col] = cleaned_matches_df[col].astype("string").str.replace(JUNK_PATTERN_CLEAN, '', regex=True)
+
+    # --- triangulate and reconcile overall scores ---
+    is_dnf = cleaned_matches_df['dnf'] != False
+
+    temp_scores_df = pd.DataFrame({
+        's1': _normalise_scores(cleaned_matches_df['calcNestedOverallScores']),
+        's2': _normalise_scores(cleaned_matches_df['B_rawOverallScore']),
+        's3': _normalise_scores(cleaned_matches_df['A_rawOverallScore']),
+    }, index=cleaned_matches_df.index)
+    score_consistent = temp_scores_df.apply(lambda row: len(set(s for s in row if s != "")) == 1, axis=1)
+    cleaned_matches_df['scoreConsistent'] = score_consistent | is_dnf
+    cleaned_matches_df['reconciledOverallScore'] = temp_scores_df.apply(get_democratic_score, axis=1)
+
+    # --- triangulate and reconcile game scores ---
+    temp_scores_df = pd.DataFrame({
+        's1': _normalise_scores(cleaned_matches_df['calcNestedGameScores']),
+        's2': _normalise_scores(cleaned_matches_df['B_rawGameScores']),
+        's3': _normalise_scores(cleaned_matches_df['A_rawGameScores']),
+    }, index=cleaned_matches_df.index)
+    game_score_consistent = temp_scores_df.apply(lambda row: len(set(s for s in row if s != "")) == 1, axis=1)
+    cleaned_matches_df['gameScoreConsistent'] = game_score_consistent | is_dnf
+    cleaned_matches_df['reconciledGameScore'] = temp_scores_df.apply(get_democratic_score, axis=1)
+
+    # --- manual score amendments, then recompute the winners ---
+    if score_amendments_df is not None and not score_amendments_df.empty:
+        amendments = score_amendments_df.drop(columns=["Unnamed: 0"], errors="ignore")
+        amendments = amendments.drop_duplicates(subset=STABLE_KEY).set_index(STABLE_KEY)
+        cleaned_matches_df = cleaned_matches_df.set_index(STABLE_KEY)
+        amend_cols = [col for col in amendments.columns if col in cleaned_matches_df.columns]
+        cleaned_matches_df.update(amendments[amend_cols])
+        cleaned_matches_df = cleaned_matches_df.reset_index()
+
+    cleaned_matches_df = _set_game_score_winners(cleaned_matches_df)
+
+    # --- best of ---
+    not_dnf = cleaned_matches_df["dnf"] == False
+    cleaned_matches_df["calcBestOf"] = cleaned_matches_df.apply(get_best_of, axis=1)
+    cleaned_matches_df["trueBestOf"] = cleaned_matches_df["calcBestOf"]
+
+    world_cup_filter = cleaned_matches_df["eventId"].isin(WORLD_CUP_EVENT_IDS)
+    world_cup_group_filter = cleaned_matches_df["documentCode"].str.contains("GP", na=False)
+    cleaned_matches_df.loc[world_cup_filter & world_cup_group_filter & not_dnf, "trueBestOf"] = 0
+
+    paris_olympics_filter = cleaned_matches_df["eventId"] == PARIS_OLYMPICS_EVENT_ID
+    paris_olympics_singles_filter = cleaned_matches_df["subEventName"].str.contains("Singles", na=False)
+    cleaned_matches_df.loc[paris_olympics_filter & paris_olympics_singles_filter & not_dnf, "trueBestOf"] = 7
+
+    cleaned_matches_df["trueBestOf"] = pd.to_numeric(cleaned_matches_df["trueBestOf"], errors="coerce")
+    cleaned_matches_df["bestOf"] = pd.to_numeric(cleaned_matches_df.get("bestOf"), errors="coerce")
+
+    cleaned_matches_df['reconciledOverallScoreWinner'] = cleaned_matches_df['reconciledOverallScoreWinner'].fillna(
+        cleaned_matches_df['calculatedGameScoreWinner']
+    )
+    cleaned_matches_df['calculatedGameScoreWinner'] = cleaned_matches_df['calculatedGameScoreWinner'].fillna(
+        cleaned_matches_df['reconciledOverallScoreWinner']
+    )
+
+    # --- player id fixes for the Tokyo Olympic Games ---
+    if id_fixes_df is not None and not id_fixes_df.empty:
+        fixed_id_map = pd.Series(
+            id_fixes_df['playerId'].astype(str).values,
+            index=id_fixes_df['tokyo_id'].astype(str)
+        )
+        for col in ["homeCompetitorId", "awayCompetitorId"]:
+            cleaned_matches_df[col] = cleaned_matches_df[col].replace(fixed_id_map)
+
+    # Juan Liu (105472) was entered with Dan Liu's id (121226) at Tokyo 2020
+    tokyo_filter = cleaned_matches_df["EventName"].str.contains("Tokyo", na=False)
+    for col in ["homeCompetitorId", "awayCompetitorId"]:
+        juan_liu_filter = cleaned_matches_df[col].astype(str) == "121226"
+        cleaned_matches_df.loc[tokyo_filter & juan_liu_filter, col] = "105472"
+
+    return cleaned_matches_df
+
+
+def _read_optional_csv(path: Optional[str]) -> Optional[pd.DataFrame]:
+    if path and os.path.isfile(path):
+        return pd.read_csv(path, index_col=0)
+    return None
+
+
+def get_score_errors(cleaned_matches_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Matches (excluding dnf) with an invalid game score or whose game scores and overall score
+    disagree on the winner: the rows to review and add to score_errors_AMENDED.csv.
+    """
+    flagged_matches = cleaned_matches_df["gameScoreFlags"].fillna("").astype(str) != ""
+    not_dnf = cleaned_matches_df["dnf"].astype(str) == "False"
+    winner_mismatch = cleaned_matches_df["calculatedGameScoreWinner"] != cleaned_matches_df["reconciledOverallScoreWinner"]
+    return cleaned_matches_df[(flagged_matches | winner_mismatch) & not_dnf]
+
+
+def collate_matches(events_df: pd.DataFrame,
+                    raw_dir: str = DEFAULT_RAW_MATCH_DETAILS_DIR,
+                    cleaned_dir: str = DEFAULT_CLEANED_MATCHES_DIR,
+                    incremental: bool = True,
+                    score_amendments_path: Optional[str] = DEFAULT_SCORE_AMENDMENTS_PATH,
+                    id_fixes_path: Optional[str] = DEFAULT_ID_FIXES_PATH) -> pd.DataFrame:
+    """
+    Builds cleaned_matches_df from the raw match details files and saves it as
+    yyyymmdd_cleaned_matches.csv in cleaned_dir.
+
+    In incremental mode the previous cleaned output is loaded and only new or changed
+    event files (by sha256) are parsed and cleaned. Their rows are upserted on
+    (eventId, documentCode): every previous row of a changed or removed event is replaced.
+    Falls back to a full rebuild when there is no usable previous output, or when the
+    score amendments, the id fixes or the names / start dates of the collated events
+    changed since it was built (get_input_hashes).
+
+    A changed file that cannot be read keeps the previous rows of its event and is not
+    recorded in the manifest, so it is retried on the next run.
+
+    Args:
+        events_df (pd.DataFrame): Master events, containing 'eventId', 'EventName', 'StartDate'.
+        raw_dir (str): Directory of {eventId}_match_details.json files.
+        cleaned_dir (str): Output directory for cleaned matches and the collate manifest.
+        incremental (bool): Reuse the previous cleaned output where possible. Defaults to True.
+        score_amendments_path (str, optional): Path to the manually amended score errors.
+        id_fixes_path (str, optional): Path to the Tokyo 2020 player id fixes.
+
+    Returns:
+        pd.DataFrame: The full cleaned matches DataFrame.
+    """
+    print("--- 🟢 Commencing Match Collation 🟢---")
+
+    empty_manifest = {"cleaned_file": None, "files": {}, "inputs": {}}
+    manifest = load_manifest(cleaned_dir) if incremental else empty_manifest
+    previous_file = manifest.get("cleaned_file")
+    previous_df = None
+
+    if previous_file:
+        previous_path = os.path.join(cleaned_dir, previous_file)
+        try:
+            previous_df = pd.read_csv(previous_path, low_memory=False)
+            print(f"✅ {len(previous_df)} matches found in previous cleaned output: {previous_path}")
+        except Exception as e:
+            print(f"❌ Error reading previous cleaned output {previous_path}: {e}. Rebuilding from scratch.")
+
+    if previous_df is not None:
+        previous_inputs = get_input_hashes(events_df, _event_ids(manifest["files"]), score_amendments_path, id_fixes_path)
+        if manifest.get("inputs") != previous_inputs:
+            print("🟢 Score amendments, id fixes or collated events changed since the last run. Rebuilding from scratch.")
+            previous_df = None
+
+    if previous_df is None:
+        manifest = empty_manifest
+
+    changed_files, removed_files, file_records = get_changed_match_files(raw_dir, manifest)
+    print(f"🏓 {len(changed_files)} new/changed and {len(removed_files)} removed match details files "
+          f"out of {len(file_records)} on disk. 🏓")
+
+    raw_matches_df, failed_files = read_match_details(changed_files)
+    for file in failed_files:
+        # Keep the previous record (and rows) of the file; its size / mtime no longer match so it is retried
+        filename = os.path.basename(file)
+        if filename in manifest["files"]:
+            file_records[filename] = manifest["files"][filename]
+        else:
+            file_records.pop(filename, None)
+    if failed_files:
+        print(f"❌ {len(failed_files)} match details files could not be read. Their previous rows are kept.")
+    changed_files = [file for file in changed_files if file not in failed_files]
+
+    def updated_manifest(cleaned_file):
+        inputs = get_input_hashes(events_df, _event_ids(file_records), score_amendments_path, id_fixes_path)
+        return {"cleaned_file": cleaned_file, "files": file_records, "inputs": inputs}
+
+    if not changed_files and not removed_files and previous_df is not None:
+        save_manifest(updated_manifest(previous_file), cleaned_dir)
+        print("--- ✅ No raw match details changed. Previous cleaned output is up to date ---")
+        return previous_df
+
+    stale_event_ids = _event_ids(changed_files + removed_files)
+
+    batch_df = clean_match_details(
+        raw_matches_df,
+        events_df,
+        score_amendments_df=_read_optional_csv(score_amendments_path),
+        id_fixes_df=_read_optional_csv(id_fixes_path),
+    )
+
+    if previous_df is not None:
+        stale_mask = previous_df["eventId"].isin(stale_event_ids)
+        if not batch_df.empty:
+            batch_keys = pd.MultiIndex.from_frame(batch_df[STABLE_KEY].astype({"eventId": int, "documentCode": str}))
+            previous_keys = pd.MultiIndex.from_frame(previous_df[STABLE_KEY].astype({"eventId": int, "documentCode": str}))
+            stale_mask = stale_mask | previous_keys.isin(batch_keys)
+        kept_df = previous_df[~stale_mask]
+        print(f"Replacing {stale_mask.sum()} previous rows from {len(stale_event_ids)} events with {len(batch_df)} cleaned rows.")
+        cleaned_matches_df = pd.concat([kept_df, batch_df], ignore_index=True)
+    else:
+        cleaned_matches_df = batch_df.reset_index(drop=True)
+
+    if "EventStartDate" in cleaned_matches_df.columns:
+        sort_keys = pd.to_datetime(cleaned_matches_df["EventStartDate"], errors="coerce", utc=True)
+        match_keys = pd.to_datetime(cleaned_matches_df["matchDate"], errors="coerce", utc=True)
+        order = pd.DataFrame({"e": sort_keys, "m": match_keys}).sort_values(["e", "m"], kind="stable").index
+        cleaned_matches_df = cleaned_matches_df.loc[order].reset_index(drop=True)
+
+    os.makedirs(cleaned_dir, exist_ok=True)
+    file_name = f"{date.today().strftime('%Y%m%d')}_cleaned_matches.csv"
+    cleaned_matches_df.to_csv(os.path.join(cleaned_dir, file_name), index=False)
+
+    save_manifest(updated_manifest(file_name), cleaned_dir)
+
+    print(f"--- ✅ Collation Complete: {len(cleaned_matches_df)} matches saved to {os.path.join(cleaned_dir, file_name)} ---")
+    return cleaned_matches_df
@@ -0,0 +1,48 @@
+import os
+import re
+import glob
+import hashlib
+import pandas as pd
+from typing import Optional, Sequence, Tuple
+
+FINGERPRINT_LENGTH = 16
+
+
+def dataset_fingerprint(*column_sets: Tuple[pd.DataFrame, Sequence[str]], extra: Optional[Sequence] = None) -> str:
+    """
+    Short hash of the given columns of one or more DataFrames (and of any extra values, e.g.
+    parameters), used as the dataset version in cache keys and artifact names.
+
+        version = dataset_fingerprint((matches_df, ['winnerId', 'loserId', 'matchDate']))
+
+    Each column is hashed with its name, so columns missing from a DataFrame are skipped
+    without colliding with a DataFrame that has them.
+
+    Returns:
+        str: FINGERPRINT_LENGTH hex characters.
+    """
+    sha = hashlib.sha256()
+    for df, columns in column_sets:
+        sha.update(str(len(df)).encode())
+        for col in columns:
+            if col in df.columns:
+                sha.update(col.encode())
+                sha.update(pd.util.hash_pandas_object(df[col], index=False).to_numpy().tobytes())
+    if extra is not None:
+        sha.update(repr(list(extra)).encode())
+    return sha.hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def prune_cache(cache_dir: str, prefix: str, version: str) -> None:
+    """
+    Removes the files {prefix}{other version}* from cache_dir, so a cache only keeps the
+    files of the latest dataset version (as prune_checkpoints does for rating checkpoints).
+    """
+    search_pattern = re.compile(rf'^{re.escape(prefix)}([0-9a-f]{{{FINGERPRINT_LENGTH}}})[._]')
+    for cache_path in glob.glob(os.path.join(glob.escape(cache_dir), glob.escape(prefix) + "*")):
+        match = search_pattern.match(os.path.basename(cache_path))
+        if match and match.group(1) != version:
+            try:
+                os.remove(cache_path)
+            except OSError as e:
+                print(f"❌ Could not remove stale cache {cache_path}: {e}")
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Optional
+
+from utils.ratingIndex import INDEX_EPOCH, DATE_BITS, to_index_seconds
+
+DEFAULT_LAST_MATCHES = 20
+DEFAULT_LAST_MONTHS = 12
+
+
+@dataclass
+class FormIndex:
+    """
+    Every player's matches in one sorted array, with per-player running totals.
+
+    keys = (playerId << DATE_BITS) | seconds is sorted, so each player's matches are a
+    contiguous, date-ordered block. cum_wins / cum_delta are running sums that restart
+    at every player, so any window of a player's matches is one subtraction.
+    """
+    keys: np.ndarray
+    wins: np.ndarray
+    rating_delta: np.ndarray
+    cum_wins: np.ndarray
+    cum_delta: np.ndarray
+
+    @property
+    def player_of_row(self) -> np.ndarray:
+        return self.keys >> DATE_BITS
+
+    @property
+    def seconds(self) -> np.ndarray:
+        return self.keys & ((1 << DATE_BITS) - 1)
+
+    def player_blocks(self):
+        """
+        Sorted playerIds and each player's first row (plus the total row count at the end).
+        """
+        player_of_row = self.player_of_row
+        player_ids = np.unique(player_of_row)
+        offsets = np.append(np.searchsorted(player_of_row, player_ids), len(player_of_row))
+        return player_ids, offsets
+
+
+def _player_rows(history_df: pd.DataFrame, info_string: str = ""):
+    """
+    Keys, win flags and rating changes of the winner and loser row of every match.
+    Rating changes are 0 when history_df has no rating columns (e.g. plain matches).
+    """
+    suffix = f" ({info_string})" if info_string else ""
+    history_df = history_df[history_df['winnerId'].notna() & history_df['loserId'].notna()]
+    seconds = to_index_seconds(history_df['matchDate'].to_numpy())
+    has_date = seconds >= 0
+    history_df, seconds = history_df[has_date], seconds[has_date]
+
+    player_ids = np.concatenate([history_df['winnerId'].to_numpy(dtype=np.int64),
+                                 history_df['loserId'].to_numpy(dtype=np.int64)])
+    keys = (player_ids << DATE_BITS) | np.tile(seconds, 2)
+    wins = np.repeat(np.array([1, 0], dtype=np.int64), len(history_df))
+
+    if f'winner_rating_post{suffix}' in history_df.columns:
+        rating_delta = np.concatenate([
+            (history_df[f'winner_rating_post{suffix}'] - history_df[f'winner_rating_pre{suffix}']).to_numpy(dtype=float),
+            (history_df[f'loser_rating_post{suffix}'] - history_df[f'loser_rating_pre{suffix}']).to_numpy(dtype=float),
+        ])
+    else:
+        rating_delta = np.zeros(len(keys))
+
+    order = np.argsort(keys, kind='stable')
+    return keys[order], wins[order], np.nan_to_num(rating_delta[order])
+
+
+def _restarting_cumsum(values: np.ndarray, block_starts: np.ndarray) -> np.ndarray:
+    """
+    Cumulative sum of values that restarts at every block start.
+    """
+    totals = np.cumsum(values)
+    if len(values) == 0:
+        return totals
+    is_start = np.zeros(len(values), dtype=bool)
+    is_start[block_starts[block_starts < len(values)]] = True
+    block_number = np.cumsum(is_start) - 1
+    base = (totals - values)[is_start]
+    return totals - base[block_number]
+
+
+def build_form_index(history_df: pd.DataFrame, info_string: str = "") -> FormIndex:
+    """
+    Builds the form index from a ratings history (output of calculate_ratings_history) or from
+    plain matches (form metrics without rating changes).
+    """
+    keys, wins, rating_delta = _player_rows(history_df, info_string)
+    player_starts = np.flatnonzero(np.diff(keys >> DATE_BITS, prepend=-1))
+    return FormIndex(
+        keys=keys,
+        wins=wins,
+        rating_delta=rating_delta,
+        cum_wins=_restarting_cumsum(wins, player_starts),
+        cum_delta=_restarting_cumsum(rating_delta, player_starts),
+    )
+
+
+def update_form_index(form_index: FormIndex, new_history_df: pd.DataFrame, info_string: str = "") -> FormIndex:
+    """
+    Adds new matches to a form index. The new rows are inserted into the sorted arrays and
+    the running totals are recomputed only for the players in the new matches, from their
+    first new row onwards (their tails, unless a late match arrives out of date order).
+    """
+    new_keys, new_wins, new_delta = _player_rows(new_history_df, info_string)
+    if len(new_keys) == 0:
+        return form_index
+
+    positions = np.searchsorted(form_index.keys, new_keys, side='right')
+    keys = np.insert(form_index.keys, positions, new_keys)
+    wins = np.insert(form_index.wins, positions, new_wins)
+    rating_delta = np.insert(form_index.rating_delta, positions, new_delta)
+    cum_wins = np.insert(form_index.cum_wins, positions, 0)
+    cum_delta = np.insert(form_index.cum_delta, positions, 0.0)
+
+    # Rows from each affected player's first new row to the end of their block
+    inserted_at = positions + np.arange(len(positions))
+    player_of_row = keys >> DATE_BITS
+    affected_ids, first_new = np.unique(new_keys >> DATE_BITS, return_index=True)
+    block_ends = np.searchsorted(player_of_row, affected_ids, side='right')
+    starts = inserted_at[first_new]
+
+    lengths = block_ends - starts
+    rows = np.repeat(starts - np.cumsum(np.append(0, lengths[:-1])), lengths) + np.arange(lengths.sum())
+    segment_starts = np.cumsum(np.append(0, lengths[:-1]))
+
+    # Continue each player's running totals from the row before their first new row
+    has_previous = (starts > 0) & (player_of_row[np.maximum(starts - 1, 0)] == affected_ids)
+    previous_wins = np.where(has_previous, cum_wins[np.maximum(starts - 1, 0)], 0)
+    previous_delta = np.where(has_previous, cum_delta[np.maximum(starts - 1, 0)], 0.0)
+
+    segment_number = np.repeat(np.arange(len(starts)), lengths)
+    cum_wins[rows] = _restarting_cumsum(wins[rows], segment_starts) + previous_wins[segment_number]
+    cum_delta[rows] = _restarting_cumsum(rating_delta[rows], segment_starts) + previous_delta[segment_number]
+
+    return FormIndex(keys, wins, rating_delta, cum_wins, cum_delta)
+
+
+def _window_totals(form_index: FormIndex, window_start: np.ndarray, window_end: np.ndarray, block_start: np.ndarray):
+    """
+    Matches, wins and rating change over rows [window_start, window_end) of each player block.
+    """
+    n_matches = window_end - window_start
+    has_rows = n_matches > 0
+    last = np.maximum(window_end - 1, 0)
+    before = np.maximum(window_start - 1, 0)
+    starts_block = window_start <= block_start
+
+    if len(form_index.keys) == 0:
+        return n_matches, np.zeros(len(n_matches), dtype=np.int64), np.zeros(len(n_matches))
+
+    wins = np.where(has_rows, form_index.cum_wins[last] - np.where(starts_block, 0, form_index.cum_wins[before]), 0)
+    delta = np.where(has_rows, form_index.cum_delta[last] - np.where(starts_block, 0.0, form_index.cum_delta[before]), 0.0)
+    return n_matches, wins, delta
+
+
+def get_form(form_index: FormIndex,
+             last_matches: int = DEFAULT_LAST_MATCHES,
+             last_months: int = DEFAULT_LAST_MONTHS,
+             as_of: Optional[str] = None) -> pd.DataFrame:
+    """
+    "Last N matches" and "last N months" form of every player in one vectorized pass.
+
+    Args:
+        form_index (FormIndex): Output of build_form_index / update_form_index.
+        last_matches (int, optional): Match window. Defaults to 20.
+        last_months (int, optional): Calendar window in months. Defaults to 12.
+        as_of (str, optional): Only matches before this date count. Defaults to after the latest match.
+
+    Returns:
+        pd.DataFrame: playerId with TotalMatches, TotalWins, MatchWinRate and RatingChange
+                      for "(Last {N})" and "(Last {N} Months)".
+    """
+    player_ids, offsets = form_index.player_blocks()
+    block_start, block_end = offsets[:-1], offsets[1:]
+
+    if as_of is not None:
+        as_of_seconds = to_index_seconds([as_of])[0]
+        block_end = np.searchsorted(form_index.keys, (player_ids << DATE_BITS) | as_of_seconds, side='left')
+        reference = INDEX_EPOCH + pd.Timedelta(seconds=int(as_of_seconds))
+    else:
+        latest = int(form_index.seconds.max()) if len(form_index.keys) else 0
+        reference = INDEX_EPOCH + pd.Timedelta(seconds=latest + 1)
+
+    cutoff_seconds = int(((reference - pd.DateOffset(months=last_months)) - INDEX_EPOCH) // pd.Timedelta(seconds=1))
+    window_starts = {
+        f"Last {last_matches}": np.maximum(block_end - last_matches, block_start),
+        f"Last {last_months} Months": np.clip(
+            np.searchsorted(form_index.keys, (player_ids << DATE_BITS) | max(cutoff_seconds, 0), side='left'),
+            block_start, block_end),
+    }
+
+    form_df = pd.DataFrame({'playerId': player_ids})
+    for label, window_start in window_starts.items():
+        n_matches, wins, delta = _window_totals(form_index, window_start, block_end, block_start)
+        form_df[f"TotalMatches ({label})"] = n_matches
+        form_df[f"TotalWins ({label})"] = wins
+        with np.errstate(invalid='ignore', divide='ignore'):
+            form_df[f"MatchWinRate ({label})"] = np.round(np.nan_to_num(wins / n_matches * 100), 2)
+        form_df[f"RatingChange ({label})"] = np.round(delta, 2)
+
+    return form_df
+
+
+def get_rolling_form(form_index: FormIndex, last_matches: int = DEFAULT_LAST_MATCHES) -> pd.DataFrame:
+    """
+    Form over the last N matches up to and including every match of every player
+    (one row per player-match, in player then date order), e.g. for form charts.
+    """
+    player_ids, offsets = form_index.player_blocks()
+    block_of_row = np.repeat(np.arange(len(player_ids)), np.diff(offsets))
+    block_start = offsets[:-1][block_of_row]
+
+    rows = np.arange(len(form_index.keys))
+    window_start = np.maximum(rows + 1 - last_matches, block_start)
+    n_matches, wins, delta = _window_totals(form_index, window_start, rows + 1, block_start)
+
+    label = f"Last {last_matches}"
+    return pd.DataFrame({
+        'playerId': player_ids[block_of_row] if len(rows) else np.empty(0, dtype=np.int64),
+        'matchDate': INDEX_EPOCH + pd.to_timedelta(form_index.seconds, unit='s'),
+        f"TotalMatches ({label})": n_matches,
+        f"MatchWinRate ({label})": np.round(wins / np.maximum(n_matches, 1) * 100, 2),
+        f"RatingChange ({label})": np.round(delta, 2),
+    })
@@ -5,6 +5,7 @@ from unittest.mock import DEFAULT
 import pandas as pd
 from typing import Tuple, Optional 
 import streamlit as st
+from utils.ratingsStorage import read_compact_ratings_history
 
 
 # --- Path Fix: Make all paths absolute from this file's location ---
@@ -242,14 +243,14 @@ def get_latest_ratings_history( info_string:str,
         print (f"❌ Please specify a valid info_string: {info_string} \n❌ Returning empty DataFrame")
         return pd.DataFrame(columns=MINIMAL_COLUMNS) 
 
-    files = glob.glob(f"{master_dir}/*.csv")
+    files = glob.glob(f"{master_dir}/*.csv") + glob.glob(f"{master_dir}/*.npz")
     
     if not files:
-        print(f"❌ No existing *.csv files found in MASTER Ratings History Directory: {master_dir}") 
+        print(f"❌ No existing *.csv / *.npz files found in MASTER Ratings History Directory: {master_dir}") 
         return pd.DataFrame(columns=MINIMAL_COLUMNS)
     
     safe_label = info_string.upper().replace(' ', '_')
-    search_pattern = re.compile(rf'^\d{{8}}_ratings_history_{re.escape(safe_label)}\.csv$')
+    search_pattern = re.compile(rf'^\d{{8}}_ratings_history_{re.escape(safe_label)}\.(csv|npz)$')
 
     matching_files = [file for file in files if search_pattern.match(os.path.basename(file))]
 
@@ -257,11 +258,15 @@ def get_latest_ratings_history( info_string:str,
         print(f"❌ No existing MASTER files in format: {search_pattern.pattern} in {master_dir}")
         return pd.DataFrame(columns=MINIMAL_COLUMNS)
 
-    matching_files.sort()
+    # Sort by date; on the same date the compact .npz sorts after (and wins over) the .csv
+    matching_files.sort(key=lambda file: (os.path.basename(file)[:8], file.endswith('.npz')))
     latest_file = matching_files[-1]
 
     try: 
-        latest_df = pd.read_csv(latest_file, low_memory=False)
+        if latest_file.endswith('.npz'):
+            latest_df = read_compact_ratings_history(latest_file)
+        else:
+            latest_df = pd.read_csv(latest_file, low_memory=False)
         print(f"✅ {len(latest_df)} match history records found in latest MASTER: {latest_file} ")
         return latest_df
         
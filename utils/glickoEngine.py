@@ -0,0 +1,582 @@
+import math
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+# --- Glicko-2 Constants (same defaults as glicko2.Player) ---
+GLICKO2_SCALE = 173.7178
+DEFAULT_RATING = 1500.0
+DEFAULT_RD = 350.0
+DEFAULT_VOL = 0.06
+DEFAULT_TAU = 0.5
+VOL_EPSILON = 0.000001
+
+# 'match' updates both players after every match; the others batch matches into rating periods
+RATING_PERIODS = ('match', 'event', 'week', 'month')
+
+# Margin-aware ratings score a match on the winner's share of the points or of the games,
+# blended with the result: score = (1 - margin_weight) * result + margin_weight * share
+MARGIN_MODES = ('points', 'games')
+DEFAULT_MARGIN_WEIGHT = 0.25
+
+try:
+    # Optional: compiles the kernel to machine code when numba is installed.
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+@dataclass
+class GlickoState:
+    """
+    Rating state for every player, held in contiguous arrays indexed by dense player index.
+    mu / phi are on the internal Glicko-2 scale (see rating / rd for the display scale).
+    player_ids is sorted so playerIds map to dense indices with a binary search.
+    """
+    player_ids: np.ndarray
+    mu: np.ndarray
+    phi: np.ndarray
+    sigma: np.ndarray
+    match_count: np.ndarray
+    tau: float = DEFAULT_TAU
+
+    @classmethod
+    def fresh(cls, player_ids, rating: float = DEFAULT_RATING, rd: float = DEFAULT_RD,
+              vol: float = DEFAULT_VOL, tau: float = DEFAULT_TAU) -> "GlickoState":
+        """
+        Every player starts as an unrated glicko2.Player(rating, rd, vol).
+        """
+        player_ids = np.unique(np.asarray(player_ids, dtype=np.int64))
+        n_players = len(player_ids)
+        return cls(
+            player_ids=player_ids,
+            mu=np.full(n_players, (rating - 1500) / GLICKO2_SCALE),
+            phi=np.full(n_players, rd / GLICKO2_SCALE),
+            sigma=np.full(n_players, float(vol)),
+            match_count=np.zeros(n_players, dtype=np.int64),
+            tau=float(tau),
+        )
+
+    @property
+    def rating(self) -> np.ndarray:
+        return self.mu * GLICKO2_SCALE + 1500
+
+    @property
+    def rd(self) -> np.ndarray:
+        return self.phi * GLICKO2_SCALE
+
+    def copy(self) -> "GlickoState":
+        return GlickoState(self.player_ids.copy(), self.mu.copy(), self.phi.copy(),
+                           self.sigma.copy(), self.match_count.copy(), self.tau)
+
+    def with_players(self, player_ids, rating: float = DEFAULT_RATING, rd: float = DEFAULT_RD,
+                     vol: float = DEFAULT_VOL) -> "GlickoState":
+        """
+        A copy of the state that also contains player_ids; players not yet in the
+        state start unrated. Existing players keep their ratings.
+        """
+        new_ids = np.setdiff1d(np.asarray(player_ids, dtype=np.int64), self.player_ids)
+        if len(new_ids) == 0:
+            return self.copy()
+
+        added = GlickoState.fresh(new_ids, rating, rd, vol, self.tau)
+        player_ids = np.concatenate([self.player_ids, added.player_ids])
+        order = np.argsort(player_ids, kind="stable")
+        return GlickoState(
+            player_ids=player_ids[order],
+            mu=np.concatenate([self.mu, added.mu])[order],
+            phi=np.concatenate([self.phi, added.phi])[order],
+            sigma=np.concatenate([self.sigma, added.sigma])[order],
+            match_count=np.concatenate([self.match_count, added.match_count])[order],
+            tau=self.tau,
+        )
+
+    def index_of(self, player_ids) -> np.ndarray:
+        """
+        Maps playerIds to dense indices (-1 for players not in the state).
+        """
+        player_ids = np.atleast_1d(np.asarray(player_ids, dtype=np.int64))
+        if len(self.player_ids) == 0:
+            return np.full(len(player_ids), -1, dtype=np.int64)
+        idx = np.clip(np.searchsorted(self.player_ids, player_ids), 0, len(self.player_ids) - 1)
+        return np.where(self.player_ids[idx] == player_ids, idx, -1)
+
+
+def _glicko2_update(mu, phi, sigma, opp_mu, opp_phi, score, tau, two):
+    """
+    One Glicko-2 update of a player against a single opponent. A line-by-line port of
+    glicko2.Player.update_player (including its use of mu in place of phi inside the
+    volatility function f), so results match the library bit for bit.
+
+    Squares go through math.pow like the library: pow(x, 2) and x * x differ in the
+    last bit for a small share of inputs. The exponent is passed in (two = 2.0) so the
+    numba build cannot fold pow(x, 2) into x * x.
+
+    Returns:
+        (new_mu, new_phi, new_sigma)
+    """
+    # glicko2.Player receives the opponent on the display scale and converts back.
+    opp_mu = ((opp_mu * GLICKO2_SCALE + 1500) - 1500) / GLICKO2_SCALE
+    opp_phi = (opp_phi * GLICKO2_SCALE) / GLICKO2_SCALE
+
+    g = 1 / math.sqrt(1 + 3 * math.pow(opp_phi, two) / math.pow(math.pi, two))
+    e = 1 / (1 + math.exp(-1 * g * (mu - opp_mu)))
+    v = 1 / (math.pow(g, two) * e * (1 - e))
+    improvement = g * (score - e)
+    delta = v * improvement
+
+    # --- new volatility (Illinois algorithm) ---
+    a = math.log(math.pow(sigma, two))
+    tau_sq = math.pow(tau, two)
+    delta_sq = math.pow(delta, two)
+    phi_sq = math.pow(phi, two)
+    mu_sq = math.pow(mu, two)
+
+    A = a
+    if delta_sq > phi_sq + v:
+        B = math.log(delta_sq - phi_sq - v)
+    else:
+        k = 1
+        while True:
+            x = a - k * math.sqrt(tau_sq)
+            ex = math.exp(x)
+            if (ex * (delta_sq - mu_sq - v - ex)) / (2 * math.pow(mu_sq + v + ex, two)) - (x - a) / tau_sq >= 0:
+                break
+            k = k + 1
+        B = a - k * math.sqrt(tau_sq)
+
+    ex = math.exp(A)
+    fA = (ex * (delta_sq - mu_sq - v - ex)) / (2 * math.pow(mu_sq + v + ex, two)) - (A - a) / tau_sq
+    ex = math.exp(B)
+    fB = (ex * (delta_sq - mu_sq - v - ex)) / (2 * math.pow(mu_sq + v + ex, two)) - (B - a) / tau_sq
+
+    while math.fabs(B - A) > VOL_EPSILON:
+        C = A + ((A - B) * fA) / (fB - fA)
+        ex = math.exp(C)
+        fC = (ex * (delta_sq - mu_sq - v - ex)) / (2 * math.pow(mu_sq + v + ex, two)) - (C - a) / tau_sq
+        if fC * fB <= 0:
+            A = B
+            fA = fB
+        else:
+            fA = fA / 2.0
+        B = C
+        fB = fC
+
+    new_sigma = math.exp(A / 2)
+
+    # --- new rating deviation and rating ---
+    phi_star = math.sqrt(phi_sq + math.pow(new_sigma, two))
+    new_phi = 1 / math.sqrt((1 / math.pow(phi_star, two)) + (1 / v))
+    new_mu = mu + math.pow(new_phi, two) * improvement
+
+    return new_mu, new_phi, new_sigma
+
+
+def _play_match(mu, phi, sigma, count, w, l, s, tau, two, out, o):
+    """
+    Plays one match, updating the state in place.
+    The winner is updated first; the loser is then updated against the winner's
+    post-match rating and RD, exactly as the original glicko2.Player loop did.
+    Writes the 10 output values of the match to out[o:o + 10].
+    """
+    w_mu = mu[w]
+    w_phi = phi[w]
+    l_mu = mu[l]
+    l_phi = phi[l]
+    out[o] = w_mu
+    out[o + 1] = w_phi
+    out[o + 2] = l_mu
+    out[o + 3] = l_phi
+
+    w_mu, w_phi, w_sigma = _glicko2_update(w_mu, w_phi, sigma[w], l_mu, l_phi, s, tau, two)
+    mu[w] = w_mu
+    phi[w] = w_phi
+    sigma[w] = w_sigma
+
+    l_mu, l_phi, l_sigma = _glicko2_update(l_mu, l_phi, sigma[l], w_mu, w_phi, 1.0 - s, tau, two)
+    mu[l] = l_mu
+    phi[l] = l_phi
+    sigma[l] = l_sigma
+
+    count[w] += 1
+    count[l] += 1
+
+    out[o + 4] = w_mu
+    out[o + 5] = w_phi
+    out[o + 6] = l_mu
+    out[o + 7] = l_phi
+    out[o + 8] = count[w]
+    out[o + 9] = count[l]
+
+
+def _run_matches_kernel(mu, phi, sigma, count, winner_idx, loser_idx, score, tau, two, out):
+    """
+    Plays every match in order, updating the state in place.
+
+    out is a flat buffer of 10 values per match: winner mu/phi pre, loser mu/phi pre,
+    winner mu/phi post, loser mu/phi post, winner count, loser count.
+    """
+    for i in range(len(winner_idx)):
+        _play_match(mu, phi, sigma, count, winner_idx[i], loser_idx[i], score[i], tau, two, out, i * 10)
+
+
+def _run_dual_matches_kernel(mu, phi, sigma, count, margin_mu, margin_phi, margin_sigma, margin_count,
+                             winner_idx, loser_idx, score, margin_score, tau, two, out, margin_out):
+    """
+    Plays every match in order into two independent states: the first with the
+    match result, the second with the margin score. Same output layout as _run_matches_kernel.
+    """
+    for i in range(len(winner_idx)):
+        w = winner_idx[i]
+        l = loser_idx[i]
+        _play_match(mu, phi, sigma, count, w, l, score[i], tau, two, out, i * 10)
+        _play_match(margin_mu, margin_phi, margin_sigma, margin_count, w, l, margin_score[i], tau, two, margin_out, i * 10)
+
+
+if njit is not None:
+    _glicko2_update = njit(cache=True)(_glicko2_update)
+    _play_match = njit(cache=True)(_play_match)
+    _run_matches_jit = njit(cache=True)(_run_matches_kernel)
+    _run_dual_matches_jit = njit(cache=True)(_run_dual_matches_kernel)
+else:
+    _run_matches_jit = None
+    _run_dual_matches_jit = None
+
+
+def run_glicko2(state: GlickoState, winner_idx: np.ndarray, loser_idx: np.ndarray,
+                score: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Rates a chronologically sorted batch of matches, updating state in place.
+
+    Args:
+        state (GlickoState): Rating state, updated in place.
+        winner_idx (np.ndarray): Dense state index of each match winner.
+        loser_idx (np.ndarray): Dense state index of each match loser.
+        score (np.ndarray): The winner's score per match (1.0 win, 0.5 tie).
+
+    Returns:
+        Dict[str, np.ndarray]: pre / post rating and RD (display scale) and match counts
+                               for the winner and loser of every match.
+    """
+    n_matches = len(winner_idx)
+    out = np.empty(n_matches * 10, dtype=np.float64)
+
+    winner_idx = np.ascontiguousarray(winner_idx, dtype=np.int64)
+    loser_idx = np.ascontiguousarray(loser_idx, dtype=np.int64)
+    score = np.ascontiguousarray(score, dtype=np.float64)
+
+    if _run_matches_jit is not None:
+        _run_matches_jit(state.mu, state.phi, state.sigma, state.match_count,
+                         winner_idx, loser_idx, score, state.tau, 2.0, out)
+    else:
+        # Python floats in lists are far cheaper to index one at a time than numpy scalars.
+        mu, phi, sigma = state.mu.tolist(), state.phi.tolist(), state.sigma.tolist()
+        count = state.match_count.tolist()
+        out_list = [0.0] * (n_matches * 10)
+        _run_matches_kernel(mu, phi, sigma, count, winner_idx.tolist(), loser_idx.tolist(),
+                            score.tolist(), state.tau, 2.0, out_list)
+        state.mu[:], state.phi[:], state.sigma[:] = mu, phi, sigma
+        state.match_count[:] = count
+        out[:] = out_list
+
+    return _ratings_output(out.reshape(n_matches, 10))
+
+
+def run_glicko2_with_margins(state: GlickoState, margin_state: GlickoState,
+                             winner_idx: np.ndarray, loser_idx: np.ndarray,
+                             score: np.ndarray, margin_score: np.ndarray) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Rates a chronologically sorted batch of matches into two states in one scan:
+    state with the match results (identical to run_glicko2) and margin_state with the
+    margin scores (see get_margin_scores). Both states must share the same player_ids.
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]: run_glicko2 output of each state.
+    """
+    n_matches = len(winner_idx)
+    out = np.empty(n_matches * 10, dtype=np.float64)
+    margin_out = np.empty(n_matches * 10, dtype=np.float64)
+
+    winner_idx = np.ascontiguousarray(winner_idx, dtype=np.int64)
+    loser_idx = np.ascontiguousarray(loser_idx, dtype=np.int64)
+    score = np.ascontiguousarray(score, dtype=np.float64)
+    margin_score = np.ascontiguousarray(margin_score, dtype=np.float64)
+
+    if _run_dual_matches_jit is not None:
+        _run_dual_matches_jit(state.mu, state.phi, state.sigma, state.match_count,
+                              margin_state.mu, margin_state.phi, margin_state.sigma, margin_state.match_count,
+                              winner_idx, loser_idx, score, margin_score, state.tau, 2.0, out, margin_out)
+    else:
+        states = [state, margin_state]
+        lists = [(st.mu.tolist(), st.phi.tolist(), st.sigma.tolist(), st.match_count.tolist()) for st in states]
+        out_list, margin_out_list = [0.0] * (n_matches * 10), [0.0] * (n_matches * 10)
+        _run_dual_matches_kernel(*lists[0], *lists[1], winner_idx.tolist(), loser_idx.tolist(),
+                                 score.tolist(), margin_score.tolist(), state.tau, 2.0, out_list, margin_out_list)
+        for st, (mu, phi, sigma, count) in zip(states, lists):
+            st.mu[:], st.phi[:], st.sigma[:] = mu, phi, sigma
+            st.match_count[:] = count
+        out[:], margin_out[:] = out_list, margin_out_list
+
+    return _ratings_output(out.reshape(n_matches, 10)), _ratings_output(margin_out.reshape(n_matches, 10))
+
+
+def _ratings_output(out: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Converts the (n_matches, 10) internal-scale kernel output to display-scale columns.
+    """
+    return {
+        'winner_rating_pre': out[:, 0] * GLICKO2_SCALE + 1500,
+        'winner_rd_pre': out[:, 1] * GLICKO2_SCALE,
+        'loser_rating_pre': out[:, 2] * GLICKO2_SCALE + 1500,
+        'loser_rd_pre': out[:, 3] * GLICKO2_SCALE,
+        'winner_rating_post': out[:, 4] * GLICKO2_SCALE + 1500,
+        'winner_rd_post': out[:, 5] * GLICKO2_SCALE,
+        'loser_rating_post': out[:, 6] * GLICKO2_SCALE + 1500,
+        'loser_rd_post': out[:, 7] * GLICKO2_SCALE,
+        'winner_matches_played': out[:, 8].astype(np.int64),
+        'loser_matches_played': out[:, 9].astype(np.int64),
+    }
+
+
+def _new_volatility(mu, phi, sigma, v, delta, tau):
+    """
+    Vectorized step 5 of glicko2.Player._newVol (Illinois algorithm) for many players at once,
+    keeping the library's use of mu in place of phi inside f.
+    """
+    a = np.log(sigma ** 2)
+    tau_sq = tau ** 2
+    delta_sq = delta ** 2
+    mu_sq = mu ** 2
+
+    def f(x):
+        ex = np.exp(x)
+        return (ex * (delta_sq - mu_sq - v - ex)) / (2 * (mu_sq + v + ex) ** 2) - (x - a) / tau_sq
+
+    A = a.copy()
+    B = np.empty_like(a)
+    large = delta_sq > phi ** 2 + v
+    B[large] = np.log(delta_sq[large] - phi[large] ** 2 - v[large])
+
+    k = np.ones_like(a)
+    searching = ~large
+    while searching.any():
+        still_negative = f(a - k * math.sqrt(tau_sq)) < 0
+        searching &= still_negative
+        k[searching] += 1
+    B[~large] = (a - k * math.sqrt(tau_sq))[~large]
+
+    fA = f(A)
+    fB = f(B)
+    active = np.abs(B - A) > VOL_EPSILON
+    while active.any():
+        C = A + ((A - B) * fA) / (fB - fA)
+        fC = f(C)
+        swap = active & (fC * fB <= 0)
+        halve = active & ~(fC * fB <= 0)
+        A = np.where(swap, B, A)
+        fA = np.where(swap, fB, np.where(halve, fA / 2.0, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+        active = np.abs(B - A) > VOL_EPSILON
+
+    return np.exp(A / 2)
+
+
+def _cumcount(ids: np.ndarray) -> np.ndarray:
+    """
+    0-based running count of each value of ids in order of appearance.
+    """
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(sorted_ids)) + 1]
+    group_sizes = np.diff(np.r_[group_start, len(ids)])
+    counts = np.empty(len(ids), dtype=np.int64)
+    counts[order] = np.arange(len(ids)) - np.repeat(group_start, group_sizes)
+    return counts
+
+
+def run_glicko2_periods(state: GlickoState, winner_idx: np.ndarray, loser_idx: np.ndarray,
+                        score: np.ndarray, period_codes: np.ndarray,
+                        inflate_inactive: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Rates matches in Glicko-2 rating periods, updating state in place.
+    Every player who played in a period is updated once, against the pre-period
+    ratings of all their opponents in that period (as glicko2.Player.update_player
+    does with lists). Matches of a period must be contiguous.
+
+    Args:
+        state (GlickoState): Rating state, updated in place.
+        winner_idx, loser_idx, score: as for run_glicko2.
+        period_codes (np.ndarray): Rating period of every match (contiguous runs).
+        inflate_inactive (bool, optional): Apply did_not_compete (RD grows by the
+            volatility, capped at the unrated RD) to rated players without a match
+            in the period. Defaults to True.
+
+    Returns:
+        Dict[str, np.ndarray]: as run_glicko2. Pre values are the period start,
+                               post values the period end.
+    """
+    n_matches = len(winner_idx)
+    out = np.empty((n_matches, 10), dtype=np.float64)
+    max_phi = DEFAULT_RD / GLICKO2_SCALE
+
+    winner_idx = np.asarray(winner_idx, dtype=np.int64)
+    loser_idx = np.asarray(loser_idx, dtype=np.int64)
+    score = np.asarray(score, dtype=np.float64)
+    period_codes = np.asarray(period_codes)
+
+    starts = np.r_[0, np.flatnonzero(period_codes[1:] != period_codes[:-1]) + 1] if n_matches else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], n_matches]
+
+    mu, phi, sigma, count = state.mu, state.phi, state.sigma, state.match_count
+
+    for start, end in zip(starts, ends):
+        w = winner_idx[start:end]
+        l = loser_idx[start:end]
+        s = score[start:end]
+        m = end - start
+
+        out[start:end, 0] = mu[w]
+        out[start:end, 1] = phi[w]
+        out[start:end, 2] = mu[l]
+        out[start:end, 3] = phi[l]
+
+        # Every result from both sides: (player, opponent, score)
+        me = np.concatenate([w, l])
+        opp = np.concatenate([l, w])
+        result = np.concatenate([s, 1.0 - s])
+
+        g = 1 / np.sqrt(1 + 3 * phi[opp] ** 2 / math.pi ** 2)
+        e = 1 / (1 + np.exp(-1 * g * (mu[me] - mu[opp])))
+
+        players, inverse = np.unique(me, return_inverse=True)
+        v = 1 / np.bincount(inverse, weights=g ** 2 * e * (1 - e))
+        improvement = np.bincount(inverse, weights=g * (result - e))
+        delta = v * improvement
+
+        new_sigma = _new_volatility(mu[players], phi[players], sigma[players], v, delta, state.tau)
+        phi_star = np.sqrt(phi[players] ** 2 + new_sigma ** 2)
+        new_phi = 1 / np.sqrt((1 / phi_star ** 2) + (1 / v))
+        new_mu = mu[players] + new_phi ** 2 * improvement
+
+        if inflate_inactive:
+            inactive = count > 0
+            inactive[players] = False
+            phi[inactive] = np.minimum(np.sqrt(phi[inactive] ** 2 + sigma[inactive] ** 2), max_phi)
+
+        mu[players] = new_mu
+        phi[players] = new_phi
+        sigma[players] = new_sigma
+
+        # Running match counts inside the period, interleaved winner / loser per match
+        appearances = np.empty(2 * m, dtype=np.int64)
+        appearances[0::2] = w
+        appearances[1::2] = l
+        running = count[appearances] + _cumcount(appearances) + 1
+        count[players] += np.bincount(inverse)
+
+        out[start:end, 4] = mu[w]
+        out[start:end, 5] = phi[w]
+        out[start:end, 6] = mu[l]
+        out[start:end, 7] = phi[l]
+        out[start:end, 8] = running[0::2]
+        out[start:end, 9] = running[1::2]
+
+    return _ratings_output(out)
+
+
+def select_matches_to_rate(players_df: pd.DataFrame, matches_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sorts matches by date (then eventId, documentCode) and keeps the ones calculate_ratings_history rates:
+    not dnf, both player ids present and both players in players_df.
+    The returned index is the match position after the dnf / missing id filters,
+    matching the index of the original per-row loop output.
+    """
+    # Ties on matchDate are broken by the (eventId, documentCode) key so the rating order
+    # does not depend on the row order of the matches file (needed for checkpoints).
+    sorted_matches_df = matches_df.sort_values(['matchDate', 'eventId', 'documentCode'], kind='stable')
+
+    dnf_mask = (sorted_matches_df['dnf'] == False) | (sorted_matches_df['dnf'] == 'False')
+    rate_mask = (dnf_mask & sorted_matches_df['winnerId'].notna() & sorted_matches_df['loserId'].notna()).to_numpy()
+
+    # Position of each match among those that pass the dnf / missing id filters
+    positions = np.cumsum(rate_mask) - 1
+
+    known_ids = players_df['playerId'].dropna().astype(np.int64).to_numpy()
+    winner_ids = sorted_matches_df['winnerId'].to_numpy()[rate_mask].astype(np.int64)
+    loser_ids = sorted_matches_df['loserId'].to_numpy()[rate_mask].astype(np.int64)
+    rate_mask[rate_mask] = np.isin(winner_ids, known_ids) & np.isin(loser_ids, known_ids)
+
+    matches_to_rate_df = sorted_matches_df[rate_mask]
+    matches_to_rate_df.index = positions[rate_mask]
+    return matches_to_rate_df
+
+
+def get_match_arrays(state: GlickoState, matches_to_rate_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Dense winner / loser indices and winner scores for the matches to rate.
+    """
+    winner_idx = state.index_of(matches_to_rate_df['winnerId'].to_numpy(dtype=np.int64))
+    loser_idx = state.index_of(matches_to_rate_df['loserId'].to_numpy(dtype=np.int64))
+    score = np.where(matches_to_rate_df['Winner'].to_numpy() == 'tie', 0.5, 1.0) \
+        if 'Winner' in matches_to_rate_df.columns else np.ones(len(matches_to_rate_df))
+    return winner_idx, loser_idx, score
+
+
+def get_margin_scores(matches_to_rate_df: pd.DataFrame, margin_mode: str = 'points',
+                      margin_weight: float = DEFAULT_MARGIN_WEIGHT) -> np.ndarray:
+    """
+    Winner's margin-aware score per match: the result (1, or 0.5 for a tie) blended with the
+    winner's share of the points ('winnerTotalPoints' / 'loserTotalPoints') or of the games
+    ('winnerSets' / 'loserSets'). Matches without a usable margin score the result only.
+    """
+    if margin_mode not in MARGIN_MODES:
+        raise ValueError(f"Unknown margin_mode: {margin_mode} (use one of {MARGIN_MODES})")
+
+    winner_col, loser_col = ('winnerTotalPoints', 'loserTotalPoints') if margin_mode == 'points' else ('winnerSets', 'loserSets')
+    result = np.where(matches_to_rate_df['Winner'].to_numpy() == 'tie', 0.5, 1.0) \
+        if 'Winner' in matches_to_rate_df.columns else np.ones(len(matches_to_rate_df))
+    if winner_col not in matches_to_rate_df.columns or loser_col not in matches_to_rate_df.columns:
+        return result
+
+    won = pd.to_numeric(matches_to_rate_df[winner_col], errors='coerce').to_numpy(dtype=float)
+    lost = pd.to_numeric(matches_to_rate_df[loser_col], errors='coerce').to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = won / (won + lost)
+    share = np.where(np.isfinite(share), share, result)
+    return (1 - margin_weight) * result + margin_weight * share
+
+
+def get_rating_periods(matches_to_rate_df: pd.DataFrame, rating_period: str) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Groups the (date sorted) matches to rate into rating periods.
+
+    Args:
+        matches_to_rate_df (pd.DataFrame): Output of select_matches_to_rate.
+        rating_period (str): 'event', 'week' (ISO week) or 'month'.
+
+    Returns:
+        Tuple[pd.DataFrame, np.ndarray]: the matches reordered so every period is contiguous
+                                         (periods in order of their first match), and the
+                                         period code of every match.
+    """
+    if rating_period == 'event':
+        period_keys = matches_to_rate_df['eventId']
+    elif rating_period in ('week', 'month'):
+        match_dates = pd.to_datetime(matches_to_rate_df['matchDate'], errors='coerce', utc=True)
+        period_keys = match_dates.dt.strftime('%G-%V' if rating_period == 'week' else '%Y-%m').fillna('')
+    else:
+        raise ValueError(f"Unknown rating_period: {rating_period} (use one of {RATING_PERIODS})")
+
+    # factorize numbers the periods in order of first appearance
+    period_codes = pd.factorize(period_keys)[0]
+    order = np.argsort(period_codes, kind="stable")
+    return matches_to_rate_df.iloc[order], period_codes[order]
+
+
+def expected_outcome(winner_rating_pre: np.ndarray, loser_rating_pre: np.ndarray) -> np.ndarray:
+    """
+    Elo-style expected score of the winner, as stored in the 'expected_outcome' column.
+    """
+    return 1 / (1 + np.power(10.0, (loser_rating_pre - winner_rating_pre) / 400))
@@ -0,0 +1,294 @@
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from utils.networks import build_player_index
+from utils.fingerprints import dataset_fingerprint, prune_cache
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_HEAD_TO_HEAD_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'HeadToHead')
+
+# Rows of HeadToHead.pair_totals; "low" / "high" is the player with the lower / higher dense index
+PAIR_TOTALS = ['winsLow', 'winsHigh', 'setsLow', 'setsHigh', 'pointsLow', 'pointsHigh']
+HEAD_TO_HEAD_KINDS = ('matches', 'wins', 'sets', 'points')
+
+# Columns a store is built from, fingerprinted as its dataset version
+HEAD_TO_HEAD_FINGERPRINT_COLUMNS = ['winnerId', 'loserId', 'matchDate', 'winnerSets', 'loserSets',
+                                    'winnerTotalPoints', 'loserTotalPoints']
+
+# In-memory cache of built stores, keyed by dataset version
+_HEAD_TO_HEAD_CACHE: Dict[str, "HeadToHead"] = {}
+
+
+@dataclass
+class HeadToHead:
+    """
+    Head-to-head records of every pair of players who have met.
+
+    player_ids[i] is the playerId of dense index i. pair_keys (low * n_players + high, sorted)
+    lists every pair once; pair_totals holds their wins, sets and points (PAIR_TOTALS rows) and
+    match_rows[pair_offsets[k]:pair_offsets[k + 1]] are the positions of pair k's matches in
+    the matches table the store was built from (in table order).
+    """
+    player_ids: np.ndarray
+    pair_keys: np.ndarray
+    pair_totals: np.ndarray
+    pair_offsets: np.ndarray
+    match_rows: np.ndarray
+    version: str
+    _lookups: Optional[Dict[str, object]] = field(default=None, repr=False)
+
+    @property
+    def n_players(self) -> int:
+        return len(self.player_ids)
+
+    @property
+    def lookups(self) -> Dict[str, object]:
+        """
+        Dicts from playerId to dense index and from pair key to pair position, plus the pair
+        players, built on first use so lookups need no array scans.
+        """
+        if self._lookups is None:
+            pair_low = self.pair_keys // max(self.n_players, 1)
+            pair_high = self.pair_keys % max(self.n_players, 1)
+            pairs_by_high = np.argsort(pair_high, kind='stable')
+            self._lookups = {
+                'player': dict(zip(self.player_ids.tolist(), range(self.n_players))),
+                'pair': dict(zip(self.pair_keys.tolist(), range(len(self.pair_keys)))),
+                'pair_low': pair_low,
+                'pair_high': pair_high,
+                # Pairs are sorted by the low player; pairs_by_high orders them by the high player
+                'pairs_by_high': pairs_by_high,
+                'sorted_high': pair_high[pairs_by_high],
+            }
+        return self._lookups
+
+    @property
+    def pair_low(self) -> np.ndarray:
+        return self.lookups['pair_low']
+
+    @property
+    def pair_high(self) -> np.ndarray:
+        return self.lookups['pair_high']
+
+    def _pair_position(self, player_a: int, player_b: int):
+        """
+        Position of the pair in pair_keys and whether player_a is the low player (None if they never met).
+        """
+        lookups = self.lookups
+        idx_a, idx_b = lookups['player'].get(player_a), lookups['player'].get(player_b)
+        if idx_a is None or idx_b is None:
+            return None, True
+        low, high = min(idx_a, idx_b), max(idx_a, idx_b)
+        return lookups['pair'].get(low * self.n_players + high), idx_a == low
+
+    def record(self, player_a: int, player_b: int) -> Dict[str, int]:
+        """
+        Head-to-head record of player_a against player_b (all zeros if they never met).
+        """
+        position, a_is_low = self._pair_position(player_a, player_b)
+        totals = [0] * len(PAIR_TOTALS) if position is None else self.pair_totals[:, position].tolist()
+        a, b = (0, 1) if a_is_low else (1, 0)
+        return {
+            'matches': totals[0] + totals[1],
+            'winsA': totals[a], 'winsB': totals[b],
+            'setsA': totals[2 + a], 'setsB': totals[2 + b],
+            'pointsA': totals[4 + a], 'pointsB': totals[4 + b],
+        }
+
+    def match_rows_of(self, player_a: int, player_b: int) -> np.ndarray:
+        """
+        Positions of the matches between the two players in the source matches table.
+        """
+        position, _ = self._pair_position(player_a, player_b)
+        if position is None:
+            return np.empty(0, dtype=np.int64)
+        return self.match_rows[self.pair_offsets[position]:self.pair_offsets[position + 1]]
+
+    def pairs_of(self, player_id: int) -> np.ndarray:
+        """
+        Positions in pair_keys of every pair the player is part of.
+        """
+        lookups = self.lookups
+        idx = lookups['player'].get(player_id)
+        if idx is None:
+            return np.empty(0, dtype=np.int64)
+
+        low_start, low_end = np.searchsorted(lookups['pair_low'], [idx, idx + 1])
+        high_start, high_end = np.searchsorted(lookups['sorted_high'], [idx, idx + 1])
+        as_high = lookups['pairs_by_high'][high_start:high_end]
+        return np.concatenate([np.arange(low_start, low_end), as_high[lookups['pair_low'][as_high] != idx]])
+
+    def matrix(self, kind: str = 'wins') -> sp.csr_matrix:
+        """
+        Directed player x player matrix: [i, j] is the wins, sets or points player i took
+        off player j ('matches' is the symmetric match count).
+        """
+        if kind not in HEAD_TO_HEAD_KINDS:
+            raise ValueError(f"Unknown head-to-head matrix: {kind} (use one of {HEAD_TO_HEAD_KINDS})")
+
+        low, high = self.pair_low, self.pair_high
+        if kind == 'matches':
+            low_values = high_values = self.pair_totals[0] + self.pair_totals[1]
+        else:
+            row = PAIR_TOTALS.index(f"{kind}Low")
+            low_values, high_values = self.pair_totals[row], self.pair_totals[row + 1]
+
+        rows = np.concatenate([low, high])
+        cols = np.concatenate([high, low])
+        data = np.concatenate([low_values, high_values])
+        shape = (self.n_players, self.n_players)
+        return sp.coo_matrix((data, (rows, cols)), shape=shape).tocsr()
+
+
+def build_head_to_head(matches_df: pd.DataFrame, version: str = "") -> HeadToHead:
+    """
+    Builds the head-to-head store from matches_df in one sort of the matches by pair.
+    Matches with a missing player id are ignored; match_rows are positions in matches_df.
+    """
+    valid = (matches_df['winnerId'].notna() & matches_df['loserId'].notna()).to_numpy()
+    positions = np.flatnonzero(valid)
+    valid_df = matches_df.iloc[positions]
+    player_ids, winner_idx, loser_idx = build_player_index(valid_df['winnerId'].to_numpy(), valid_df['loserId'].to_numpy())
+    n_players = len(player_ids)
+
+    def count(col):
+        if col not in valid_df.columns:
+            return np.zeros(len(valid_df), dtype=np.int64)
+        return pd.to_numeric(valid_df[col], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+
+    low = np.minimum(winner_idx, loser_idx)
+    winner_is_low = winner_idx == low
+    keys = low.astype(np.int64) * n_players + np.maximum(winner_idx, loser_idx)
+    order = np.argsort(keys, kind='stable')
+    keys, winner_is_low = keys[order], winner_is_low[order]
+
+    # Per match, what the low and the high player took: wins, sets, points
+    winner_sets, loser_sets = count('winnerSets')[order], count('loserSets')[order]
+    winner_points, loser_points = count('winnerTotalPoints')[order], count('loserTotalPoints')[order]
+    per_match = np.vstack([
+        winner_is_low, ~winner_is_low,
+        np.where(winner_is_low, winner_sets, loser_sets), np.where(winner_is_low, loser_sets, winner_sets),
+        np.where(winner_is_low, winner_points, loser_points), np.where(winner_is_low, loser_points, winner_points),
+    ]).astype(np.int64)
+
+    pair_keys, pair_starts = np.unique(keys, return_index=True)
+    pair_totals = np.add.reduceat(per_match, pair_starts, axis=1) if len(keys) else per_match
+
+    return HeadToHead(
+        player_ids=player_ids,
+        pair_keys=pair_keys,
+        pair_totals=pair_totals,
+        pair_offsets=np.append(pair_starts, len(keys)).astype(np.int64),
+        match_rows=positions[order],
+        version=version,
+    )
+
+
+def get_head_to_head(matches_df: pd.DataFrame, cache_dir: Optional[str] = DEFAULT_HEAD_TO_HEAD_DIR) -> HeadToHead:
+    """
+    Returns the head-to-head store of matches_df, building it only once per dataset version
+    (kept in memory and as one .npz per version in cache_dir).
+
+    Args:
+        matches_df (pd.DataFrame): Matches containing 'winnerId', 'loserId', 'matchDate' and
+                                   optionally 'winnerSets', 'loserSets', 'winnerTotalPoints', 'loserTotalPoints'.
+        cache_dir (str, optional): Directory for cached stores. None disables the disk cache.
+
+    Returns:
+        HeadToHead
+    """
+    version = dataset_fingerprint((matches_df, HEAD_TO_HEAD_FINGERPRINT_COLUMNS))
+    if version in _HEAD_TO_HEAD_CACHE:
+        return _HEAD_TO_HEAD_CACHE[version]
+
+    cache_path = os.path.join(cache_dir, f"head_to_head_{version}.npz") if cache_dir else None
+    if cache_path and os.path.isfile(cache_path):
+        with np.load(cache_path) as cached:
+            head_to_head = HeadToHead(cached['player_ids'], cached['pair_keys'], cached['pair_totals'],
+                                      cached['pair_offsets'], cached['match_rows'], version)
+        print(f"✅ Loaded cached head-to-head store: {cache_path}")
+    else:
+        head_to_head = build_head_to_head(matches_df, version)
+        print(f"✅ Built head-to-head store: {head_to_head.n_players} players, {len(head_to_head.pair_keys)} pairings")
+
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez_compressed(
+                cache_path,
+                player_ids=head_to_head.player_ids,
+                pair_keys=head_to_head.pair_keys,
+                pair_totals=head_to_head.pair_totals,
+                pair_offsets=head_to_head.pair_offsets,
+                match_rows=head_to_head.match_rows,
+            )
+            prune_cache(cache_dir, "head_to_head_", version)
+
+    _HEAD_TO_HEAD_CACHE[version] = head_to_head
+    return head_to_head
+
+
+def get_head_to_head_matches(head_to_head: HeadToHead, matches_df: pd.DataFrame,
+                             player_a: int, player_b: int) -> pd.DataFrame:
+    """
+    The matches between two players, taken from the matches table the store was built from.
+    """
+    return matches_df.iloc[head_to_head.match_rows_of(player_a, player_b)]
+
+
+def get_top_opponents(head_to_head: HeadToHead, player_id: int, top_n: Optional[int] = 10,
+                      players_df: Optional[pd.DataFrame] = None, by: str = 'TotalMatches') -> pd.DataFrame:
+    """
+    Full head-to-head table of a player against their top_n opponents.
+
+    Args:
+        head_to_head (HeadToHead): Output of get_head_to_head.
+        player_id (int): The player.
+        top_n (int, optional): Opponents to keep. None keeps all. Defaults to 10.
+        players_df (pd.DataFrame, optional): Players; 'PlayerName' is added as 'opponentName'.
+        by (str, optional): Column to rank the opponents by. Defaults to 'TotalMatches'.
+
+    Returns:
+        pd.DataFrame: opponentId, TotalMatches, TotalWins, TotalLosses, TotalSetsWon, TotalSetsLost,
+                      TotalPointsWon, TotalPointsLost, MatchWinRate, sorted by `by` (descending).
+    """
+    pairs = head_to_head.pairs_of(player_id)
+    totals = head_to_head.pair_totals[:, pairs]
+    low = head_to_head.pair_low[pairs]
+    is_low = head_to_head.player_ids[low] == player_id
+    opponent_idx = np.where(is_low, head_to_head.pair_high[pairs], low)
+
+    own, other = np.where(is_low, 0, 1), np.where(is_low, 1, 0)
+    columns = np.arange(len(pairs))
+    wins, losses = totals[own, columns], totals[other, columns]
+
+    table_df = pd.DataFrame({
+        'opponentId': head_to_head.player_ids[opponent_idx],
+        'TotalMatches': wins + losses,
+        'TotalWins': wins,
+        'TotalLosses': losses,
+        'TotalSetsWon': totals[2 + own, columns],
+        'TotalSetsLost': totals[2 + other, columns],
+        'TotalPointsWon': totals[4 + own, columns],
+        'TotalPointsLost': totals[4 + other, columns],
+    })
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table_df['MatchWinRate'] = np.round(np.nan_to_num(wins / (wins + losses) * 100), 2)
+
+    table_df = table_df.sort_values(by=[by, 'opponentId'], ascending=[False, True], kind='stable')
+    if top_n is not None:
+        table_df = table_df.head(top_n)
+
+    if players_df is not None:
+        names_df = players_df[['playerId', 'PlayerName']].drop_duplicates(subset='playerId')
+        names_df = names_df.rename(columns={'playerId': 'opponentId', 'PlayerName': 'opponentName'})
+        table_df = table_df.merge(names_df, on='opponentId', how='left')
+        table_df.insert(1, 'opponentName', table_df.pop('opponentName'))
+
+    return table_df.reset_index(drop=True)
@@ -0,0 +1,139 @@
+import io
+import os
+import re
+import glob
+import contextlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Optional
+
+from utils.fingerprints import dataset_fingerprint
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_LEADERBOARDS_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Leaderboards')
+
+# Leaderboard metric column -> title
+LEADERBOARD_METRICS = {
+    'totalMatches': 'Most Matches Played',
+    'WinRate': 'Best Win Rate (%)',
+    'ratingFinal': 'Highest Glicko-2 Rating',
+}
+LEADERBOARD_GENDERS = ['M', 'F']
+DEFAULT_TOP_N = 20
+# Players need this many matches to appear on the win rate leaderboard
+DEFAULT_MIN_MATCHES = 10
+
+# Columns the leaderboards are built from, fingerprinted as the artifact version
+LEADERBOARD_PLAYER_COLUMNS = ['playerId', 'Gender', 'HeadShot', 'flagUrl']
+LEADERBOARD_MATCH_COLUMNS = ['winnerId', 'loserId', 'matchDate', 'Winner',
+                             'winnerName', 'loserName', 'winnerCountry', 'loserCountry']
+
+LEADERBOARD_COLUMNS = ['Gender', 'metric', 'rank', 'playerId', 'playerName', 'playerCountry',
+                       'totalMatches', 'WinRate', 'ratingFinal', 'HeadShot', 'flagUrl', 'version']
+
+
+def build_leaderboards(players_df: pd.DataFrame,
+                       matches_df: pd.DataFrame,
+                       top_n: int = DEFAULT_TOP_N,
+                       min_matches: int = DEFAULT_MIN_MATCHES) -> pd.DataFrame:
+    """
+    Top-N players per gender by matches played, win rate and final Glicko-2 rating,
+    with the player metadata the app displays (HeadShot, flagUrl) already joined.
+
+    Ratings are calculated per gender over the matches between two players of that gender
+    (as the app previously did on every rerun).
+
+    Args:
+        players_df (pd.DataFrame): Master players with 'playerId', 'Gender', 'HeadShot', 'flagUrl'.
+        matches_df (pd.DataFrame): Master matches.
+        top_n (int, optional): Players kept per leaderboard. Defaults to 20.
+        min_matches (int, optional): Minimum matches for the win rate leaderboard. Defaults to 10.
+
+    Returns:
+        pd.DataFrame: LEADERBOARD_COLUMNS, one row per (Gender, metric, rank).
+    """
+    # Imported here so the app can read leaderboards without loading the rating engine
+    from utils.networks import filter_matches
+    from utils.ratings import calculate_ratings_history, get_final_player_stats
+
+    version = dataset_fingerprint((players_df, LEADERBOARD_PLAYER_COLUMNS), (matches_df, LEADERBOARD_MATCH_COLUMNS))
+    metadata_df = players_df[['playerId', 'HeadShot', 'flagUrl']].drop_duplicates(subset='playerId')
+
+    leaderboards = []
+    for gender in LEADERBOARD_GENDERS:
+        gender_players_df = players_df[players_df['Gender'] == gender]
+        gender_matches_df = filter_matches(matches_df, players_df, gender=gender)
+        print(f"🟢 {gender}: rating {len(gender_matches_df)} matches of {len(gender_players_df)} players")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            history_df = calculate_ratings_history(gender_players_df, gender_matches_df)
+            stats_df = get_final_player_stats(history_df)
+        stats_df = stats_df.rename(columns={'winRate': 'WinRate'})
+        stats_df['Gender'] = gender
+
+        for metric in LEADERBOARD_METRICS:
+            ranked_df = stats_df[stats_df['totalMatches'] >= min_matches] if metric == 'WinRate' else stats_df
+            ranked_df = ranked_df.sort_values(by=[metric, 'totalMatches'], ascending=False, kind='stable').head(top_n)
+            ranked_df = ranked_df.assign(metric=metric, rank=np.arange(1, len(ranked_df) + 1))
+            leaderboards.append(ranked_df)
+
+    leaderboards_df = pd.concat(leaderboards, ignore_index=True).merge(metadata_df, on='playerId', how='left')
+    leaderboards_df['version'] = version
+    print(f"✅ Leaderboards built (version {version}): {len(leaderboards_df)} rows")
+    return leaderboards_df[LEADERBOARD_COLUMNS]
+
+
+def save_leaderboards(leaderboards_df: pd.DataFrame, leaderboards_dir: str = DEFAULT_LEADERBOARDS_DIR) -> str:
+    """
+    Saves the leaderboards as {date}_leaderboards_{version}.csv.
+    """
+    os.makedirs(leaderboards_dir, exist_ok=True)
+    date_string = datetime.now().strftime("%Y%m%d")
+    version = leaderboards_df['version'].iloc[0] if len(leaderboards_df) else 'empty'
+    leaderboards_filepath = os.path.join(leaderboards_dir, f"{date_string}_leaderboards_{version}.csv")
+    leaderboards_df.to_csv(leaderboards_filepath, index=False)
+    print(f"✅✅Saved leaderboards to {leaderboards_filepath}")
+    return leaderboards_filepath
+
+
+def get_latest_leaderboards_file(leaderboards_dir: str = DEFAULT_LEADERBOARDS_DIR) -> Optional[str]:
+    """
+    Path of the latest saved leaderboards (None if there are none).
+    """
+    search_pattern = re.compile(r'^\d{8}_leaderboards_[0-9a-z]+\.csv$')
+    files = [file for file in glob.glob(os.path.join(leaderboards_dir, "*.csv"))
+             if search_pattern.match(os.path.basename(file))]
+    if not files:
+        print(f"❌ No existing leaderboards found in {leaderboards_dir}")
+        return None
+    # Latest date first, then the most recently written version of that date
+    return max(files, key=lambda file: (os.path.basename(file)[:8], os.path.getmtime(file)))
+
+
+def read_leaderboards(leaderboards_filepath: Optional[str]) -> pd.DataFrame:
+    """
+    Reads saved leaderboards (an empty DataFrame with LEADERBOARD_COLUMNS on failure).
+    """
+    if leaderboards_filepath is None:
+        return pd.DataFrame(columns=LEADERBOARD_COLUMNS)
+    try:
+        leaderboards_df = pd.read_csv(leaderboards_filepath, dtype={'version': str})
+        print(f"✅ Leaderboards found in latest MASTER: {leaderboards_filepath}")
+        return leaderboards_df
+    except Exception as e:
+        print(f"❌ Error reading latest leaderboards, {leaderboards_filepath}: {e}")
+        return pd.DataFrame(columns=LEADERBOARD_COLUMNS)
+
+
+def get_leaderboard(leaderboards_df: pd.DataFrame, gender: str, metric: str, top_n: int = 5) -> pd.DataFrame:
+    """
+    The top_n rows of one leaderboard, in rank order.
+    """
+    if metric not in LEADERBOARD_METRICS:
+        raise ValueError(f"Unknown leaderboard metric: {metric} (use one of {list(LEADERBOARD_METRICS)})")
+    mask = (leaderboards_df['Gender'] == gender) & (leaderboards_df['metric'] == metric)
+    return leaderboards_df[mask].sort_values(by='rank').head(top_n).reset_index(drop=True)
@@ -0,0 +1,284 @@
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, shortest_path
+from dataclasses import dataclass
+from typing import Optional, Dict, Tuple, Union, List
+
+from utils.fingerprints import dataset_fingerprint, prune_cache
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_NETWORKS_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Networks')
+
+# Columns a network is built from, fingerprinted in its cache key
+NETWORK_FINGERPRINT_COLUMNS = ['winnerId', 'loserId', 'matchDate']
+
+# In-memory cache of built networks, keyed by (gender, start, end, dataset fingerprint)
+_NETWORK_CACHE: Dict[Tuple, "PlayerNetwork"] = {}
+
+
+@dataclass
+class PlayerNetwork:
+    """
+    Player x player match network.
+
+    player_ids[i] is the playerId of dense index i.
+    adjacency is a symmetric CSR matrix of match counts between players.
+    labels[i] is the connected component of player i (0 = largest component).
+    """
+    player_ids: np.ndarray
+    adjacency: sp.csr_matrix
+    labels: np.ndarray
+
+    @property
+    def n_players(self) -> int:
+        return len(self.player_ids)
+
+    @property
+    def n_components(self) -> int:
+        return int(self.labels.max()) + 1 if len(self.labels) else 0
+
+    def index_of(self, player_ids) -> np.ndarray:
+        """
+        Maps playerIds to dense indices (-1 for players not in the network).
+        """
+        player_ids = np.atleast_1d(np.asarray(player_ids, dtype=np.int64))
+        if self.n_players == 0:
+            return np.full(len(player_ids), -1, dtype=np.int64)
+        idx = np.clip(np.searchsorted(self.player_ids, player_ids), 0, self.n_players - 1)
+        return np.where(self.player_ids[idx] == player_ids, idx, -1)
+
+
+def build_player_index(winner_ids, loser_ids) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Maps winner and loser playerIds onto dense indices 0..n-1.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: sorted unique playerIds, winner indices, loser indices.
+    """
+    winner_ids = np.asarray(winner_ids, dtype=np.int64)
+    loser_ids = np.asarray(loser_ids, dtype=np.int64)
+
+    player_ids, inverse = np.unique(np.concatenate([winner_ids, loser_ids]), return_inverse=True)
+    n_matches = len(winner_ids)
+    return player_ids, inverse[:n_matches], inverse[n_matches:]
+
+
+def build_adjacency_matrix(winner_idx: np.ndarray, loser_idx: np.ndarray, n_players: int) -> sp.csr_matrix:
+    """
+    Builds the symmetric player x player match count matrix from dense indices.
+    Duplicate (winner, loser) pairs are summed by the COO -> CSR conversion.
+    """
+    rows = np.concatenate([winner_idx, loser_idx])
+    cols = np.concatenate([loser_idx, winner_idx])
+    data = np.ones(len(rows), dtype=np.int32)
+    return sp.coo_matrix((data, (rows, cols)), shape=(n_players, n_players)).tocsr()
+
+
+def _label_components(adjacency: sp.csr_matrix) -> np.ndarray:
+    """
+    Connected component labels, renumbered so 0 is the largest component.
+    """
+    if adjacency.shape[0] == 0:
+        return np.empty(0, dtype=np.int64)
+
+    _, labels = connected_components(adjacency, directed=False)
+    sizes = np.bincount(labels)
+    order = np.argsort(-sizes, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[labels]
+
+
+def build_player_network(matches_df: pd.DataFrame) -> PlayerNetwork:
+    """
+    Builds the player network from the 'winnerId' / 'loserId' columns of matches_df.
+    Matches with a missing player id are ignored.
+    """
+    valid = matches_df['winnerId'].notna() & matches_df['loserId'].notna()
+    player_ids, winner_idx, loser_idx = build_player_index(
+        matches_df.loc[valid, 'winnerId'].to_numpy(),
+        matches_df.loc[valid, 'loserId'].to_numpy()
+    )
+    adjacency = build_adjacency_matrix(winner_idx, loser_idx, len(player_ids))
+    return PlayerNetwork(player_ids, adjacency, _label_components(adjacency))
+
+
+def filter_matches(matches_df: pd.DataFrame,
+                   players_df: Optional[pd.DataFrame] = None,
+                   gender: Optional[str] = None,
+                   start_date: Optional[str] = None,
+                   end_date: Optional[str] = None) -> pd.DataFrame:
+    """
+    Selects the matches between two players of the given gender ('M' / 'F'),
+    played between start_date and end_date (inclusive, 'YYYY-MM-DD').
+    """
+    mask = np.ones(len(matches_df), dtype=bool)
+
+    if gender is not None:
+        if players_df is None:
+            raise ValueError("players_df is required to filter by gender")
+        gender_ids = players_df.loc[players_df['Gender'] == gender, 'playerId'].to_numpy()
+        mask &= matches_df['winnerId'].isin(gender_ids).to_numpy() & matches_df['loserId'].isin(gender_ids).to_numpy()
+
+    if start_date is not None or end_date is not None:
+        match_dates = pd.to_datetime(matches_df['matchDate'], errors='coerce', utc=True)
+        if start_date is not None:
+            mask &= (match_dates >= pd.Timestamp(start_date, tz='UTC')).to_numpy()
+        if end_date is not None:
+            # inclusive of the whole end day
+            mask &= (match_dates < pd.Timestamp(end_date, tz='UTC') + pd.Timedelta(days=1)).to_numpy()
+
+    return matches_df[mask]
+
+
+def get_player_network(matches_df: pd.DataFrame,
+                       players_df: Optional[pd.DataFrame] = None,
+                       gender: Optional[str] = None,
+                       start_date: Optional[str] = None,
+                       end_date: Optional[str] = None,
+                       cache_dir: Optional[str] = DEFAULT_NETWORKS_DIR) -> PlayerNetwork:
+    """
+    Returns the player network for a gender and date range, building it only if it
+    is not already cached in memory or on disk (cache_dir, one .npz per slice).
+    The cache key includes a fingerprint of the selected matches, so a new
+    master matches file never serves a stale network.
+
+    Args:
+        matches_df (pd.DataFrame): Matches containing 'winnerId', 'loserId', 'matchDate'.
+        players_df (pd.DataFrame, optional): Players containing 'playerId', 'Gender'. Required if gender is set.
+        gender (str, optional): 'M' or 'F'. Defaults to all matches.
+        start_date (str, optional): First match date to include ('YYYY-MM-DD').
+        end_date (str, optional): Last match date to include ('YYYY-MM-DD').
+        cache_dir (str, optional): Directory for cached networks. None disables the disk cache.
+
+    Returns:
+        PlayerNetwork
+    """
+    sliced_df = filter_matches(matches_df, players_df, gender, start_date, end_date)
+    fingerprint = dataset_fingerprint((sliced_df, NETWORK_FINGERPRINT_COLUMNS))
+    cache_key = (gender or "ALL", start_date or "start", end_date or "end", fingerprint)
+
+    if cache_key in _NETWORK_CACHE:
+        return _NETWORK_CACHE[cache_key]
+
+    cache_path = None
+    if cache_dir:
+        cache_prefix = "network_" + "_".join(str(k).replace("-", "") for k in cache_key[:3]) + "_"
+        cache_path = os.path.join(cache_dir, f"{cache_prefix}{fingerprint}.npz")
+
+    if cache_path and os.path.isfile(cache_path):
+        with np.load(cache_path) as cached:
+            adjacency = sp.csr_matrix(
+                (cached['data'], cached['indices'], cached['indptr']),
+                shape=(len(cached['player_ids']), len(cached['player_ids']))
+            )
+            network = PlayerNetwork(cached['player_ids'], adjacency, cached['labels'])
+        print(f"✅ Loaded cached player network: {cache_path}")
+    else:
+        network = build_player_network(sliced_df)
+        print(f"✅ Built player network ({gender or 'All'}): {network.n_players} players, "
+              f"{network.adjacency.nnz // 2} matchups, {network.n_components} components")
+
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez_compressed(
+                cache_path,
+                player_ids=network.player_ids,
+                labels=network.labels,
+                data=network.adjacency.data,
+                indices=network.adjacency.indices,
+                indptr=network.adjacency.indptr,
+            )
+            prune_cache(cache_dir, cache_prefix, fingerprint)
+
+    _NETWORK_CACHE[cache_key] = network
+    return network
+
+
+def get_player_degrees(network: PlayerNetwork, players_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Per player: number of distinct opponents, total matches and component.
+    """
+    adjacency = network.adjacency
+    distinct_opponents = np.diff(adjacency.indptr)
+    total_matches = np.asarray(adjacency.sum(axis=1)).ravel()
+
+    degrees_df = pd.DataFrame({
+        'playerId': network.player_ids,
+        'distinctOpponents': distinct_opponents,
+        'totalMatches': total_matches,
+        'component': network.labels,
+    })
+
+    if players_df is not None:
+        degrees_df = degrees_df.merge(players_df[['playerId', 'PlayerName']], on='playerId', how='left')
+
+    return degrees_df.sort_values(by='distinctOpponents', ascending=False).reset_index(drop=True)
+
+
+def get_component_players(network: PlayerNetwork, players_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    All players with their component label (0 = largest) and component size,
+    replacing the one-csv-per-component output of the network notebook.
+    """
+    sizes = np.bincount(network.labels) if network.n_players else np.empty(0, dtype=np.int64)
+    components_df = pd.DataFrame({
+        'playerId': network.player_ids,
+        'component': network.labels,
+        'componentSize': sizes[network.labels] if network.n_players else np.empty(0, dtype=np.int64),
+    })
+    components_df = components_df.merge(players_df, on='playerId', how='left')
+    return components_df.sort_values(by=['component', 'playerId']).reset_index(drop=True)
+
+
+def get_opponent_overlap(network: PlayerNetwork, player_ids: Union[List[int], np.ndarray]) -> pd.DataFrame:
+    """
+    Number of common opponents between every pair of the given players, computed as
+    B[S] @ B[S].T on the binary adjacency (opponent sets) restricted to the players S.
+    Also returns the Jaccard overlap of their opponent sets.
+    """
+    idx = network.index_of(player_ids)
+    idx = idx[idx >= 0]
+
+    binary = network.adjacency[idx].astype(bool).astype(np.int32)
+    common = (binary @ binary.T).toarray()
+    opponent_counts = np.diag(common).copy()
+    union = opponent_counts[:, None] + opponent_counts[None, :] - common
+
+    a_pos, b_pos = np.triu_indices(len(idx), k=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        jaccard = np.where(union > 0, common / union, 0.0)
+
+    return pd.DataFrame({
+        'playerIdA': network.player_ids[idx[a_pos]],
+        'playerIdB': network.player_ids[idx[b_pos]],
+        'commonOpponents': common[a_pos, b_pos],
+        'opponentJaccard': jaccard[a_pos, b_pos].round(4),
+    }).sort_values(by='commonOpponents', ascending=False).reset_index(drop=True)
+
+
+def get_degrees_of_separation(network: PlayerNetwork, source_ids: Union[int, List[int], np.ndarray]) -> pd.DataFrame:
+    """
+    Shortest path length ("degrees of separation") from each source player to every other player,
+    using an unweighted breadth-first search over the sparse adjacency.
+    Unreachable players (other components) get -1.
+
+    Returns:
+        pd.DataFrame: one row per player, one 'separation (<sourceId>)' column per source.
+    """
+    source_idx = network.index_of(source_ids)
+    source_idx = source_idx[source_idx >= 0]
+
+    distances = shortest_path(network.adjacency, method='D', directed=False, unweighted=True, indices=source_idx)
+    distances = np.atleast_2d(distances)
+    distances = np.where(np.isinf(distances), -1, distances).astype(np.int64)
+
+    separation_df = pd.DataFrame({'playerId': network.player_ids})
+    for row, source in zip(distances, network.player_ids[source_idx]):
+        separation_df[f'separation ({source})'] = row
+    return separation_df
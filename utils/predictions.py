@@ -0,0 +1,184 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from utils.glickoEngine import DEFAULT_RATING, GlickoState, expected_outcome
+from utils.ratingCheckpoints import DEFAULT_RATINGS_CHECKPOINTS_DIR, list_checkpoints, load_checkpoint
+
+# Memoized results of the current state version, cleared when the version changes
+_PREDICTION_CACHE: Dict[Tuple, object] = {}
+_CACHE_VERSION: Optional[str] = None
+MAX_CACHED_RESULTS = 256
+
+# Loaded states by (checkpoint path, modification time)
+_LOADED_STATES: Dict[Tuple[str, float], "PredictionState"] = {}
+
+
+@dataclass
+class PredictionState:
+    """
+    Display-scale ratings of every player, as used by expected_outcome.
+    player_ids is sorted; version identifies the ratings (it changes whenever they do).
+    """
+    player_ids: np.ndarray
+    rating: np.ndarray
+    rd: np.ndarray
+    version: str
+
+    @classmethod
+    def from_glicko_state(cls, state: GlickoState) -> "PredictionState":
+        digest = hashlib.sha1()
+        for array in (state.player_ids, state.mu, state.phi):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return cls(state.player_ids.copy(), state.rating, state.rd, digest.hexdigest())
+
+    @classmethod
+    def from_ratings_history(cls, history_df: pd.DataFrame, info_string: str = "") -> "PredictionState":
+        """
+        Each player's post-match rating and RD after their last match in a ratings history.
+        """
+        suffix = f" ({info_string})" if info_string else ""
+        stacked_df = pd.concat([
+            history_df[['winnerId', f'winner_rating_post{suffix}', f'winner_rd_post{suffix}']]
+                .set_axis(['playerId', 'rating', 'rd'], axis=1)
+                .assign(row=np.arange(len(history_df)), side=1),
+            history_df[['loserId', f'loser_rating_post{suffix}', f'loser_rd_post{suffix}']]
+                .set_axis(['playerId', 'rating', 'rd'], axis=1)
+                .assign(row=np.arange(len(history_df)), side=2),
+        ])
+        # The loser is updated after the winner, so within a row the loser side is later
+        latest_df = stacked_df.sort_values(by=['row', 'side']).groupby('playerId').last()
+
+        player_ids = latest_df.index.to_numpy(dtype=np.int64)
+        rating = latest_df['rating'].to_numpy(dtype=float)
+        rd = latest_df['rd'].to_numpy(dtype=float)
+        digest = hashlib.sha1(player_ids.tobytes() + rating.tobytes() + rd.tobytes())
+        return cls(player_ids, rating, rd, digest.hexdigest())
+
+    def ratings_of(self, player_ids, unrated: float = DEFAULT_RATING) -> np.ndarray:
+        """
+        Ratings of player_ids; players not in the state get the starting rating.
+        """
+        player_ids = np.atleast_1d(np.asarray(player_ids, dtype=np.int64))
+        if len(self.player_ids) == 0:
+            return np.full(len(player_ids), float(unrated))
+        idx = np.clip(np.searchsorted(self.player_ids, player_ids), 0, len(self.player_ids) - 1)
+        return np.where(self.player_ids[idx] == player_ids, self.rating[idx], float(unrated))
+
+
+def load_prediction_state(info_string: str = "",
+                          checkpoint_dir: str = DEFAULT_RATINGS_CHECKPOINTS_DIR) -> Optional[PredictionState]:
+    """
+    The live rating state: the latest checkpoint saved by update_ratings_history.
+    The file is read once; it is read again only when a newer checkpoint is saved.
+
+    Returns:
+        PredictionState, or None if there is no readable checkpoint.
+    """
+    checkpoint_paths = list_checkpoints(info_string, checkpoint_dir)
+    if not checkpoint_paths:
+        print(f"❌ No rating checkpoints found for {info_string or 'Default'} in {checkpoint_dir}")
+        return None
+
+    checkpoint_path = checkpoint_paths[-1]
+    cache_key = (checkpoint_path, os.path.getmtime(checkpoint_path))
+    if cache_key not in _LOADED_STATES:
+        try:
+            checkpoint = load_checkpoint(checkpoint_path)
+        except Exception as e:
+            print(f"❌ Error reading rating checkpoint {checkpoint_path}: {e}")
+            return None
+        _LOADED_STATES.clear()
+        _LOADED_STATES[cache_key] = PredictionState.from_glicko_state(checkpoint.state)
+        print(f"✅ Loaded ratings of {len(checkpoint.state.player_ids)} players "
+              f"after {checkpoint.n_rated} matches (last rated: {checkpoint.last_match_date})")
+
+    return _LOADED_STATES[cache_key]
+
+
+def _memoized(state: PredictionState, key: Tuple, compute):
+    """
+    Returns the cached result for key under the state's version, computing it on a miss.
+    """
+    global _CACHE_VERSION
+    if state.version != _CACHE_VERSION:
+        _PREDICTION_CACHE.clear()
+        _CACHE_VERSION = state.version
+
+    if key not in _PREDICTION_CACHE:
+        if len(_PREDICTION_CACHE) >= MAX_CACHED_RESULTS:
+            # dicts keep insertion order, so this drops the oldest result
+            _PREDICTION_CACHE.pop(next(iter(_PREDICTION_CACHE)))
+        _PREDICTION_CACHE[key] = compute()
+    return _PREDICTION_CACHE[key]
+
+
+def _ids_key(player_ids: np.ndarray) -> bytes:
+    return hashlib.sha1(np.ascontiguousarray(player_ids, dtype=np.int64).tobytes()).digest()
+
+
+def win_probabilities(state: PredictionState, player_a_ids, player_b_ids) -> np.ndarray:
+    """
+    Probability that player A beats player B for every (A, B) pair, in one vectorized call.
+    Either side may be a single playerId. Unrated players count as starting-rating players.
+
+    The formula is the same as the 'expected_outcome' column of the ratings history.
+    """
+    player_a_ids, player_b_ids = np.broadcast_arrays(np.atleast_1d(np.asarray(player_a_ids, dtype=np.int64)),
+                                                     np.atleast_1d(np.asarray(player_b_ids, dtype=np.int64)))
+
+    def compute():
+        probability = expected_outcome(state.ratings_of(player_a_ids), state.ratings_of(player_b_ids))
+        probability.flags.writeable = False
+        return probability
+
+    return _memoized(state, ('pairs', _ids_key(player_a_ids), _ids_key(player_b_ids)), compute)
+
+
+def predict_matchups(state: PredictionState, matchups_df: pd.DataFrame,
+                     player_a_col: str = 'playerAId', player_b_col: str = 'playerBId') -> pd.DataFrame:
+    """
+    Adds 'ratingA', 'ratingB' and 'probabilityA' (A beats B) to a frame of matchups.
+    """
+    player_a_ids = matchups_df[player_a_col].to_numpy(dtype=np.int64)
+    player_b_ids = matchups_df[player_b_col].to_numpy(dtype=np.int64)
+
+    matchups_df = matchups_df.copy()
+    matchups_df['ratingA'] = state.ratings_of(player_a_ids)
+    matchups_df['ratingB'] = state.ratings_of(player_b_ids)
+    matchups_df['probabilityA'] = win_probabilities(state, player_a_ids, player_b_ids)
+    return matchups_df
+
+
+def win_probability_matrix(state: PredictionState, player_ids) -> pd.DataFrame:
+    """
+    N×N matrix of win probabilities for a set of players (e.g. a draw's seeds):
+    entry [A, B] is the probability that A beats B. The diagonal is 0.5.
+
+    Returns:
+        pd.DataFrame: indexed and columned by playerId.
+    """
+    player_ids = np.atleast_1d(np.asarray(player_ids, dtype=np.int64))
+
+    def compute():
+        ratings = state.ratings_of(player_ids)
+        matrix = expected_outcome(ratings[:, None], ratings[None, :])
+        matrix.flags.writeable = False
+        return matrix
+
+    matrix = _memoized(state, ('matrix', _ids_key(player_ids)), compute)
+    return pd.DataFrame(matrix, index=pd.Index(player_ids, name='playerId'),
+                        columns=pd.Index(player_ids, name='opponentId'), copy=True)
+
+
+def clear_prediction_cache() -> None:
+    """
+    Drops memoized predictions and loaded states (e.g. after replacing checkpoint files in place).
+    """
+    global _CACHE_VERSION
+    _PREDICTION_CACHE.clear()
+    _LOADED_STATES.clear()
+    _CACHE_VERSION = None
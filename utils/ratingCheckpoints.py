@@ -0,0 +1,172 @@
+import os
+import re
+import glob
+import hashlib
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import List, Optional
+
+from utils.glickoEngine import GlickoState
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_RATINGS_CHECKPOINTS_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Ratings_Checkpoints')
+
+# A checkpoint is kept every DEFAULT_CHECKPOINT_EVERY rated matches (plus one at the end of every run)
+DEFAULT_CHECKPOINT_EVERY = 5000
+
+
+@dataclass
+class RatingCheckpoint:
+    """
+    Engine state after the first n_rated matches of the chronologically sorted matches to rate.
+    prefix_hash identifies exactly which matches those were, so a checkpoint is only
+    reused while the start of the match list is unchanged.
+    """
+    state: GlickoState
+    n_rated: int
+    prefix_hash: str
+    last_match_date: str
+    last_event_id: int
+    last_document_code: str
+    path: Optional[str] = None
+
+
+def _safe_label(info_string: str) -> str:
+    return (info_string or "Default").upper().replace(" ", "_")
+
+
+def match_row_hashes(matches_to_rate_df: pd.DataFrame) -> np.ndarray:
+    """
+    One uint64 hash per match over the columns that decide a rating update
+    (the (eventId, documentCode) key, both players and whether it was a tie).
+    Works for both matches and ratings history DataFrames.
+    """
+    winner = matches_to_rate_df['Winner'] if 'Winner' in matches_to_rate_df.columns \
+        else pd.Series(None, index=matches_to_rate_df.index, dtype=object)
+    key_df = pd.DataFrame({
+        'eventId': pd.to_numeric(matches_to_rate_df['eventId'], errors='coerce').fillna(-1).astype(np.int64).to_numpy(),
+        'documentCode': matches_to_rate_df['documentCode'].astype(str).to_numpy(),
+        'winnerId': matches_to_rate_df['winnerId'].astype(np.int64).to_numpy(),
+        'loserId': matches_to_rate_df['loserId'].astype(np.int64).to_numpy(),
+        'tie': (winner == 'tie').to_numpy(),
+    })
+    return pd.util.hash_pandas_object(key_df, index=False).to_numpy()
+
+
+def prefix_hash(row_hashes: np.ndarray, n_rated: int) -> str:
+    """
+    Hash of the first n_rated match hashes.
+    """
+    return hashlib.sha256(np.ascontiguousarray(row_hashes[:n_rated]).tobytes()).hexdigest()
+
+
+def save_checkpoint(state: GlickoState, matches_to_rate_df: pd.DataFrame, row_hashes: np.ndarray,
+                    n_rated: int, info_string: str = "",
+                    checkpoint_dir: str = DEFAULT_RATINGS_CHECKPOINTS_DIR) -> str:
+    """
+    Saves the state after the first n_rated matches of matches_to_rate_df as
+    {LABEL}_{n_rated}.npz in checkpoint_dir.
+
+    Returns:
+        str: The checkpoint file path.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    checkpoint_path = os.path.join(checkpoint_dir, f"{_safe_label(info_string)}_{n_rated:08d}.npz")
+
+    if n_rated > 0:
+        last_match = matches_to_rate_df.iloc[n_rated - 1]
+        last_match_date, last_event_id, last_document_code = \
+            str(last_match['matchDate']), int(last_match['eventId']), str(last_match['documentCode'])
+    else:
+        last_match_date, last_event_id, last_document_code = "", -1, ""
+
+    np.savez(
+        checkpoint_path,
+        player_ids=state.player_ids,
+        mu=state.mu,
+        phi=state.phi,
+        sigma=state.sigma,
+        match_count=state.match_count,
+        tau=state.tau,
+        n_rated=n_rated,
+        prefix_hash=prefix_hash(row_hashes, n_rated),
+        last_match_date=last_match_date,
+        last_event_id=last_event_id,
+        last_document_code=last_document_code,
+    )
+    return checkpoint_path
+
+
+def load_checkpoint(checkpoint_path: str) -> RatingCheckpoint:
+    with np.load(checkpoint_path) as saved:
+        state = GlickoState(
+            player_ids=saved['player_ids'],
+            mu=saved['mu'],
+            phi=saved['phi'],
+            sigma=saved['sigma'],
+            match_count=saved['match_count'],
+            tau=float(saved['tau']),
+        )
+        return RatingCheckpoint(
+            state=state,
+            n_rated=int(saved['n_rated']),
+            prefix_hash=str(saved['prefix_hash']),
+            last_match_date=str(saved['last_match_date']),
+            last_event_id=int(saved['last_event_id']),
+            last_document_code=str(saved['last_document_code']),
+            path=checkpoint_path,
+        )
+
+
+def list_checkpoints(info_string: str = "",
+                     checkpoint_dir: str = DEFAULT_RATINGS_CHECKPOINTS_DIR) -> List[str]:
+    """
+    Checkpoint files for info_string, ordered by number of rated matches (oldest first).
+    """
+    search_pattern = re.compile(rf'^{re.escape(_safe_label(info_string))}_\d{{8}}\.npz$')
+    files = [file for file in glob.glob(os.path.join(checkpoint_dir, "*.npz"))
+             if search_pattern.match(os.path.basename(file))]
+    return sorted(files)
+
+
+def find_resume_checkpoint(row_hashes: np.ndarray, max_rated: int, info_string: str = "",
+                           checkpoint_dir: str = DEFAULT_RATINGS_CHECKPOINTS_DIR) -> Optional[RatingCheckpoint]:
+    """
+    The latest checkpoint whose rated matches are still exactly the first matches
+    of the current match list. A late-arriving (or amended) match earlier than a
+    checkpoint changes its prefix hash, so the search falls back to an earlier one.
+
+    Args:
+        row_hashes (np.ndarray): match_row_hashes of the current matches to rate.
+        max_rated (int): Upper bound on n_rated (e.g. length of the stored history).
+    """
+    for checkpoint_path in reversed(list_checkpoints(info_string, checkpoint_dir)):
+        try:
+            checkpoint = load_checkpoint(checkpoint_path)
+        except Exception as e:
+            print(f"❌ Skipping unreadable checkpoint {checkpoint_path}: {e}")
+            continue
+
+        if checkpoint.n_rated > min(max_rated, len(row_hashes)):
+            continue
+        if prefix_hash(row_hashes, checkpoint.n_rated) == checkpoint.prefix_hash:
+            return checkpoint
+
+    return None
+
+
+def prune_checkpoints(keep_upto: int, info_string: str = "",
+                      checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+                      checkpoint_dir: str = DEFAULT_RATINGS_CHECKPOINTS_DIR) -> None:
+    """
+    Removes checkpoints past keep_upto (they belong to a replaced match list)
+    and end-of-run checkpoints that are not on a checkpoint_every boundary.
+    """
+    for checkpoint_path in list_checkpoints(info_string, checkpoint_dir):
+        n_rated = int(os.path.basename(checkpoint_path).rsplit("_", 1)[1].split(".")[0])
+        if n_rated > keep_upto or (n_rated % checkpoint_every != 0 and n_rated != keep_upto):
+            os.remove(checkpoint_path)
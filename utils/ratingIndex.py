@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Optional
+
+# Dates are stored as whole seconds since this epoch, so (player, date) fits one int64 key
+INDEX_EPOCH = pd.Timestamp('2000-01-01', tz='UTC')
+DATE_BITS = 33
+
+
+def to_index_seconds(dates) -> np.ndarray:
+    """
+    Converts dates ('YYYY-MM-DD...' strings or timestamps) to int64 seconds since INDEX_EPOCH.
+    Naive dates are read as UTC.
+    """
+    timestamps = pd.to_datetime(pd.Series(np.atleast_1d(np.asarray(dates, dtype=object))), errors='coerce', utc=True)
+    return ((timestamps - INDEX_EPOCH) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64, na_value=-1)
+
+
+@dataclass
+class RatingIndex:
+    """
+    Per-player post-match ratings in CSR layout.
+
+    Entries of player_ids[i] are rows offsets[i]:offsets[i + 1], sorted by date.
+    keys = (player index << DATE_BITS) | seconds is sorted globally, so one
+    searchsorted answers any number of (player, date) lookups.
+    """
+    player_ids: np.ndarray
+    offsets: np.ndarray
+    seconds: np.ndarray
+    rating: np.ndarray
+    rd: np.ndarray
+    matches_played: np.ndarray
+    keys: np.ndarray
+
+    @property
+    def n_players(self) -> int:
+        return len(self.player_ids)
+
+    def index_of(self, player_ids) -> np.ndarray:
+        """
+        Maps playerIds to dense indices (-1 for players not in the index).
+        """
+        player_ids = np.atleast_1d(np.asarray(player_ids, dtype=np.int64))
+        if self.n_players == 0:
+            return np.full(len(player_ids), -1, dtype=np.int64)
+        idx = np.clip(np.searchsorted(self.player_ids, player_ids), 0, self.n_players - 1)
+        return np.where(self.player_ids[idx] == player_ids, idx, -1)
+
+    def lookup_positions(self, player_ids, dates, strict: bool = False) -> np.ndarray:
+        """
+        Row of the latest entry of each player on or before each date (before it if strict),
+        or -1 if the player had no rated match by then.
+        """
+        player_idx = self.index_of(player_ids)
+        seconds = to_index_seconds(dates)
+        player_idx, seconds = np.broadcast_arrays(player_idx, seconds)
+
+        query_keys = (np.maximum(player_idx, 0) << DATE_BITS) | np.maximum(seconds, 0)
+        positions = np.searchsorted(self.keys, query_keys, side='left' if strict else 'right') - 1
+
+        first_row = self.offsets[np.maximum(player_idx, 0)]
+        valid = (player_idx >= 0) & (seconds >= 0) & (positions >= first_row)
+        return np.where(valid, positions, -1)
+
+
+def build_rating_index(history_df: pd.DataFrame, info_string: str = "") -> RatingIndex:
+    """
+    Builds the as-of index from a ratings history (output of calculate_ratings_history).
+    Every match adds one entry per player: the post-match rating, RD and match count at matchDate.
+    """
+    suffix = f" ({info_string})" if info_string else ""
+
+    player_ids = np.concatenate([history_df['winnerId'].to_numpy(dtype=np.int64),
+                                 history_df['loserId'].to_numpy(dtype=np.int64)])
+    seconds = np.tile(to_index_seconds(history_df['matchDate'].to_numpy()), 2)
+    rating = np.concatenate([history_df[f'winner_rating_post{suffix}'].to_numpy(dtype=float),
+                             history_df[f'loser_rating_post{suffix}'].to_numpy(dtype=float)])
+    rd = np.concatenate([history_df[f'winner_rd_post{suffix}'].to_numpy(dtype=float),
+                         history_df[f'loser_rd_post{suffix}'].to_numpy(dtype=float)])
+    matches_played = np.concatenate([history_df[f'winner_matches_played{suffix}'].to_numpy(dtype=np.int64),
+                                     history_df[f'loser_matches_played{suffix}'].to_numpy(dtype=np.int64)])
+
+    valid = seconds >= 0
+    player_ids, seconds, rating, rd, matches_played = \
+        player_ids[valid], seconds[valid], rating[valid], rd[valid], matches_played[valid]
+
+    unique_ids, player_idx = np.unique(player_ids, return_inverse=True)
+
+    # Within a player and date, matches_played keeps the rating order of same-time matches
+    order = np.lexsort((matches_played, seconds, player_idx))
+    player_idx = player_idx[order]
+    seconds = seconds[order]
+
+    offsets = np.zeros(len(unique_ids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(player_idx, minlength=len(unique_ids)))
+
+    return RatingIndex(
+        player_ids=unique_ids,
+        offsets=offsets,
+        seconds=seconds,
+        rating=rating[order],
+        rd=rd[order],
+        matches_played=matches_played[order],
+        keys=(player_idx.astype(np.int64) << DATE_BITS) | seconds,
+    )
+
+
+def get_ratings_as_of(index: RatingIndex, player_ids, dates, strict: bool = False) -> pd.DataFrame:
+    """
+    Vectorized as-of lookup for many (player, date) pairs (either may be a single value).
+
+    Args:
+        index (RatingIndex): Output of build_rating_index.
+        player_ids: playerIds to look up.
+        dates: Dates to look up ('YYYY-MM-DD' or full matchDate strings, or timestamps).
+               A plain 'YYYY-MM-DD' date is the start of that day (UTC).
+        strict (bool, optional): Only use matches strictly before the date, i.e. the
+                                 pre-match rating for a match played at that date. Defaults to False.
+
+    Returns:
+        pd.DataFrame: playerId, date, rating, rd, matchesPlayed (NaN / 0 for players unrated at the date).
+    """
+    player_ids, dates = np.broadcast_arrays(np.atleast_1d(np.asarray(player_ids, dtype=np.int64)),
+                                            np.atleast_1d(np.asarray(dates, dtype=object)))
+    positions = index.lookup_positions(player_ids, dates, strict=strict)
+    found = positions >= 0
+    safe_positions = np.maximum(positions, 0)
+
+    return pd.DataFrame({
+        'playerId': player_ids,
+        'date': dates,
+        'rating': np.where(found, index.rating[safe_positions] if len(index.rating) else np.nan, np.nan),
+        'rd': np.where(found, index.rd[safe_positions] if len(index.rd) else np.nan, np.nan),
+        'matchesPlayed': np.where(found, index.matches_played[safe_positions] if len(index.matches_played) else 0, 0),
+    })
+
+
+def get_rating_as_of(index: RatingIndex, player_id: int, date, strict: bool = False) -> Optional[float]:
+    """
+    Rating of one player on a date (None if unrated by then).
+    """
+    position = index.lookup_positions([player_id], [date], strict=strict)[0]
+    return float(index.rating[position]) if position >= 0 else None
+
+
+def get_leaderboard_as_of(index: RatingIndex, date, min_matches: int = 0,
+                          players_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Time-travel leaderboard: every player's latest rating on the date, best first.
+
+    Args:
+        index (RatingIndex): Output of build_rating_index.
+        date: Leaderboard date.
+        min_matches (int, optional): Minimum matches played by the date. Defaults to 0.
+        players_df (pd.DataFrame, optional): If given, 'PlayerName' and 'Gender' are merged in.
+    """
+    leaderboard_df = get_ratings_as_of(index, index.player_ids, date)
+    leaderboard_df = leaderboard_df[leaderboard_df['rating'].notna() & (leaderboard_df['matchesPlayed'] >= min_matches)]
+
+    if players_df is not None:
+        player_cols = [col for col in ['playerId', 'PlayerName', 'Gender'] if col in players_df.columns]
+        leaderboard_df = leaderboard_df.merge(players_df[player_cols], on='playerId', how='left')
+
+    return leaderboard_df.sort_values(by='rating', ascending=False).reset_index(drop=True)
+
+
+def get_player_rating_series(index: RatingIndex, player_id: int) -> pd.DataFrame:
+    """
+    A player's rating after every match, for charts.
+    """
+    player_idx = index.index_of([player_id])[0]
+    if player_idx < 0:
+        return pd.DataFrame(columns=['date', 'rating', 'rd', 'matchesPlayed'])
+
+    rows = slice(index.offsets[player_idx], index.offsets[player_idx + 1])
+    return pd.DataFrame({
+        'date': INDEX_EPOCH + pd.to_timedelta(index.seconds[rows], unit='s'),
+        'rating': index.rating[rows],
+        'rd': index.rd[rows],
+        'matchesPlayed': index.matches_played[rows],
+    })
+
+
+def add_pre_match_ratings(matches_df: pd.DataFrame, index: RatingIndex) -> pd.DataFrame:
+    """
+    Adds each player's rating strictly before the match date as features
+    ('winnerRatingAsOf', 'loserRatingAsOf').
+    """
+    matches_df = matches_df.copy()
+    for role in ['winner', 'loser']:
+        positions = index.lookup_positions(matches_df[f'{role}Id'].to_numpy(dtype=np.int64),
+                                           matches_df['matchDate'].to_numpy(), strict=True)
+        matches_df[f'{role}RatingAsOf'] = np.where(positions >= 0, index.rating[np.maximum(positions, 0)], np.nan) \
+            if len(index.rating) else np.nan
+    return matches_df
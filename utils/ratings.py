@@ -1,15 +1,29 @@
 import pandas as pd
-import glicko2
-from tqdm import tqdm
 import numpy as np
-import math
 import os
-
-def calculate_ratings_history(players_df, matches_df, info_string: str = ""):
+from datetime import datetime
+from utils.glickoEngine import (
+    GlickoState, select_matches_to_rate, get_match_arrays, run_glicko2, expected_outcome,
+    run_glicko2_periods, get_rating_periods, run_glicko2_with_margins, get_margin_scores,
+    DEFAULT_MARGIN_WEIGHT
+)
+from utils.ratingCheckpoints import (
+    DEFAULT_RATINGS_CHECKPOINTS_DIR, DEFAULT_CHECKPOINT_EVERY, match_row_hashes, prefix_hash,
+    save_checkpoint, find_resume_checkpoint, prune_checkpoints
+)
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_RATINGS_HISTORY_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Ratings_History')
+
+def calculate_ratings_history(players_df, matches_df, info_string: str = "", rating_period: str = "match"):
     
     """
     Calculates Glicko-2 ratings by iterating chronologically through all matches.
-    Uses NumPy pre-allocation for significantly faster processing.
+    Ratings are held in the array-backed engine in utils/glickoEngine.py, which
+    reproduces glicko2.Player.update_player exactly.
     
     Args:
         players_df (pd.DataFrame): DataFrame containing at least 'playerId'.
@@ -18,6 +32,11 @@ def calculate_ratings_history(players_df, matches_df, info_string: str = ""):
                                      'loserName', 'winnerCountry', 'loserCountry', 'EventName'.
         info_string (str, optional): A string to append to all non-metadata (data) columns. 
                                      Defaults to "".
+        rating_period (str, optional): 'match' updates both players after every match.
+                                       'event', 'week' or 'month' update every player once per
+                                       rating period with all their results in it; pre / post
+                                       columns are then the period start / end ratings.
+                                       Defaults to "match".
 
     Returns:
         pd.DataFrame: A new DataFrame with match ratings (pre and post and delta) for every match.
@@ -25,172 +44,266 @@ def calculate_ratings_history(players_df, matches_df, info_string: str = ""):
 
     print(f"--- 🟢 Commencing Glicko-2 Rating Calculation ({info_string or 'Default'}) 🟢---")
     
-    # 1. Initialize the player "cache"
-    print("Initializing player rating cache...")
-    player_cache = {
-        int(row.playerId): {
-            'glicko_obj': glicko2.Player(),
-            'match_count': 0
-        }
-        for row in players_df.itertuples()
-    }
-    print(f"✅ Cache initialized for {len(player_cache)} players.")
-
-    sorted_matches_df = matches_df.sort_values('matchDate')
-    
-    dnf_filter_bool = sorted_matches_df['dnf'] == False
-    dnf_filter_str = sorted_matches_df['dnf'] == 'False'
-    dnf_mask = dnf_filter_bool | dnf_filter_str
-    
-    matches_to_rate_df = sorted_matches_df[dnf_mask].copy() 
-    
-    matches_to_rate_df = matches_to_rate_df.dropna(subset=['winnerId', 'loserId'])
+    # 1. Initialize the player rating arrays
+    print("Initializing player rating state...")
+    state = GlickoState.fresh(players_df['playerId'].dropna())
+    print(f"✅ State initialized for {len(state.player_ids)} players.")
 
+    matches_to_rate_df = select_matches_to_rate(players_df, matches_df)
     num_matches_to_rate = len(matches_to_rate_df)
     num_original_matches = len(matches_df)
 
     print(f"🏓 {num_matches_to_rate} matches to rate out of {num_original_matches} total matches. 🏓")
 
-    # --- 2. Initialize ratings_history (Original column names) ---
-    ratings_history = {
-        # --- METADATA COLUMNS (NOW STANDALONE) ---
-        'eventId': np.empty(num_matches_to_rate, dtype=int),
-        'EventName': np.empty(num_matches_to_rate, dtype=object),
-        'documentCode': np.empty(num_matches_to_rate, dtype=object),
-        'matchDate': np.empty(num_matches_to_rate, dtype=object),
-        'winnerId': np.empty(num_matches_to_rate, dtype=int),
-        'winnerName': np.empty(num_matches_to_rate, dtype=object),
-        'winnerCountry': np.empty(num_matches_to_rate, dtype=object),
-        'loserId': np.empty(num_matches_to_rate, dtype=int),
-        'loserName': np.empty(num_matches_to_rate, dtype=object),
-        'loserCountry': np.empty(num_matches_to_rate, dtype=object),
-        'Winner': np.empty(num_matches_to_rate, dtype=object),
+    # 2. Run every match through the engine
+    if rating_period == "match":
+        winner_idx, loser_idx, score = get_match_arrays(state, matches_to_rate_df)
+        ratings = run_glicko2(state, winner_idx, loser_idx, score)
+    else:
+        matches_to_rate_df, period_codes = get_rating_periods(matches_to_rate_df, rating_period)
+        print(f"📅 {period_codes.max() + 1 if len(period_codes) else 0} rating periods ({rating_period}).")
+        winner_idx, loser_idx, score = get_match_arrays(state, matches_to_rate_df)
+        ratings = run_glicko2_periods(state, winner_idx, loser_idx, score, period_codes)
+
+    print(f"--- ✅ Glicko-2 Calculation Complete ---")
+
+    results_df = build_ratings_history_frame(matches_to_rate_df, ratings)
+
+    # --- 3. DYNAMICALLY RENAME COLUMNS ---
+    if info_string:
+        results_df = add_info_suffix(results_df, info_string)
+
+    return results_df
+
+def calculate_margin_ratings_history(players_df: pd.DataFrame,
+                                     matches_df: pd.DataFrame,
+                                     info_string: str = "",
+                                     margin_mode: str = "points",
+                                     margin_weight: float = DEFAULT_MARGIN_WEIGHT,
+                                     margin_info_string: str = None):
+    """
+    Calculates the standard Glicko-2 ratings history and a margin-aware one in the same
+    sorted scan over the matches. The margin-aware ratings update on the match score of
+    get_margin_scores (result blended with the points or games won share).
+
+    Args:
+        players_df (pd.DataFrame): DataFrame containing at least 'playerId'.
+        matches_df (pd.DataFrame): Matches, as for calculate_ratings_history, plus
+                                   'winnerTotalPoints' / 'loserTotalPoints' or 'winnerSets' / 'loserSets'.
+        info_string (str, optional): Column suffix of the standard history. Defaults to "".
+        margin_mode (str, optional): 'points' or 'games'. Defaults to "points".
+        margin_weight (float, optional): Weight of the margin share in the score. Defaults to DEFAULT_MARGIN_WEIGHT.
+        margin_info_string (str, optional): Column suffix of the margin history.
+                                            Defaults to "{info_string} {Points|Games} Margin".
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: the standard history (identical to calculate_ratings_history)
+                                           and the margin-aware history, with the same rows.
+    """
+    if margin_info_string is None:
+        margin_info_string = f"{info_string} {margin_mode.title()} Margin".strip()
+
+    print(f"--- 🟢 Commencing Glicko-2 + {margin_mode} margin Rating Calculation ({info_string or 'Default'}) 🟢---")
+    state = GlickoState.fresh(players_df['playerId'].dropna())
+    margin_state = state.copy()
+
+    matches_to_rate_df = select_matches_to_rate(players_df, matches_df)
+    print(f"🏓 {len(matches_to_rate_df)} matches to rate out of {len(matches_df)} total matches. 🏓")
+
+    winner_idx, loser_idx, score = get_match_arrays(state, matches_to_rate_df)
+    margin_score = get_margin_scores(matches_to_rate_df, margin_mode, margin_weight)
+    ratings, margin_ratings = run_glicko2_with_margins(state, margin_state, winner_idx, loser_idx, score, margin_score)
+    print("--- ✅ Glicko-2 Calculation Complete ---")
+
+    results_df = build_ratings_history_frame(matches_to_rate_df, ratings)
+    margin_results_df = build_ratings_history_frame(matches_to_rate_df, margin_ratings)
+    if info_string:
+        results_df = add_info_suffix(results_df, info_string)
+    if margin_info_string:
+        margin_results_df = add_info_suffix(margin_results_df, margin_info_string)
+
+    return results_df, margin_results_df
+
+def update_ratings_history(players_df: pd.DataFrame,
+                           matches_df: pd.DataFrame,
+                           info_string: str = "",
+                           history_df: pd.DataFrame = None,
+                           checkpoint_dir: str = DEFAULT_RATINGS_CHECKPOINTS_DIR,
+                           checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY) -> pd.DataFrame:
+    """
+    Incremental version of calculate_ratings_history.
+
+    Resumes from the latest saved checkpoint whose rated matches are still the first
+    matches of matches_df (in rating order), rates only the matches after it and appends
+    them to the stored history. The stored rows up to the checkpoint must be those same
+    matches, otherwise the history is rebuilt. A late-arriving or amended match earlier than the latest
+    checkpoint makes the run replay from the nearest earlier checkpoint. Without a
+    usable checkpoint (or without history_df) every match is rated.
+    New checkpoints are saved every checkpoint_every matches and at the end of the run.
+
+    Args:
+        players_df (pd.DataFrame): DataFrame containing at least 'playerId'.
+        matches_df (pd.DataFrame): All matches, as for calculate_ratings_history.
+        info_string (str, optional): Column suffix, also the checkpoint label. Defaults to "".
+        history_df (pd.DataFrame, optional): The stored ratings history for info_string
+                                             (e.g. get_latest_ratings_history(info_string)).
+        checkpoint_dir (str, optional): Directory for checkpoint files.
+        checkpoint_every (int, optional): Matches between kept checkpoints.
+
+    Returns:
+        pd.DataFrame: The full ratings history, identical to calculate_ratings_history.
+    """
+    print(f"--- 🟢 Commencing Incremental Glicko-2 Rating Update ({info_string or 'Default'}) 🟢---")
+
+    matches_to_rate_df = select_matches_to_rate(players_df, matches_df)
+    row_hashes = match_row_hashes(matches_to_rate_df)
+    num_matches_to_rate = len(matches_to_rate_df)
+
+    stored_rows = len(history_df) if history_df is not None else 0
+    checkpoint = find_resume_checkpoint(row_hashes, stored_rows, info_string, checkpoint_dir)
+
+    # The stored rows before the checkpoint are reused as they are, so they must be the
+    # same matches (in the same order) as the checkpoint's prefix of the current matches
+    if checkpoint is not None and checkpoint.n_rated > 0 and \
+            prefix_hash(match_row_hashes(history_df.iloc[:checkpoint.n_rated]), checkpoint.n_rated) != \
+            prefix_hash(row_hashes, checkpoint.n_rated):
+        print("🔄 Stored ratings history does not match the checkpoint's matches. Rebuilding.")
+        checkpoint = None
+
+    if checkpoint is None:
+        print("🔄 No usable checkpoint found. Rating all matches.")
+        start = 0
+        state = GlickoState.fresh(players_df['playerId'].dropna())
+    else:
+        start = checkpoint.n_rated
+        state = checkpoint.state.with_players(players_df['playerId'].dropna())
+        print(f"✅ Resuming from checkpoint after {start} matches "
+              f"(last rated: {checkpoint.last_match_date}, eventId {checkpoint.last_event_id}, "
+              f"{checkpoint.last_document_code})")
+        if start < stored_rows:
+            print(f"🔄 {stored_rows - start} stored matches are replayed (new or amended earlier matches).")
+
+    if checkpoint is not None and start == num_matches_to_rate == stored_rows:
+        print("✅ Ratings history is already up to date.")
+        return history_df
+
+    print(f"🏓 {num_matches_to_rate - start} matches to rate out of {num_matches_to_rate} rateable matches. 🏓")
+
+    # Rate up to each checkpoint boundary in turn, saving the state at every boundary
+    boundaries = list(range((start // checkpoint_every + 1) * checkpoint_every, num_matches_to_rate, checkpoint_every))
+    boundaries.append(num_matches_to_rate)
+
+    new_frames = []
+    segment_start = start
+    for boundary in boundaries:
+        segment_df = matches_to_rate_df.iloc[segment_start:boundary]
+        winner_idx, loser_idx, score = get_match_arrays(state, segment_df)
+        ratings = run_glicko2(state, winner_idx, loser_idx, score)
+        new_frames.append(build_ratings_history_frame(segment_df, ratings))
+        save_checkpoint(state, matches_to_rate_df, row_hashes, boundary, info_string, checkpoint_dir)
+        segment_start = boundary
+
+    prune_checkpoints(num_matches_to_rate, info_string, checkpoint_every, checkpoint_dir)
+    print("--- ✅ Glicko-2 Update Complete ---")
+
+    new_df = pd.concat(new_frames)
+    if info_string:
+        new_df = add_info_suffix(new_df, info_string)
+
+    if start == 0:
+        return new_df.reset_index(drop=True)
+
+    return pd.concat([history_df.iloc[:start][new_df.columns], new_df], ignore_index=True)
+
+def save_ratings_history(history_df: pd.DataFrame, info_string: str,
+                         history_dir: str = DEFAULT_RATINGS_HISTORY_DIR) -> str:
+    """
+    Saves a ratings history as {date}_ratings_history_{LABEL}.csv, the format read by
+    getLatestFiles.get_latest_ratings_history.
+    """
+    if (info_string == "") or (not isinstance(info_string, str)) or (info_string.isspace()):
+        print (f"❌ Please specify a valid info_string: {info_string} \n❌ File not saved")
+        return None
+
+    os.makedirs(history_dir, exist_ok=True)
+    safe_label = info_string.upper().replace(" ", "_")
+    date_string = datetime.now().strftime("%Y%m%d")
+    history_filepath = os.path.join(history_dir, f"{date_string}_ratings_history_{safe_label}.csv")
+    history_df.to_csv(history_filepath, index=False)
+    print(f"✅✅Saved ratings history to {history_filepath}")
+    return history_filepath
+
+def build_ratings_history_frame(matches_to_rate_df: pd.DataFrame, ratings: dict) -> pd.DataFrame:
+    """
+    Assembles the ratings history DataFrame (original column names and order)
+    from the rated matches and the engine output of run_glicko2.
+    """
+    winner_outcome = matches_to_rate_df['Winner'].to_numpy(dtype=object) \
+        if 'Winner' in matches_to_rate_df.columns else np.full(len(matches_to_rate_df), None, dtype=object)
+
+    results_df = pd.DataFrame({
+        # --- METADATA COLUMNS ---
+        'eventId': matches_to_rate_df['eventId'].to_numpy().astype(int),
+        'EventName': matches_to_rate_df['EventName'].to_numpy(dtype=object),
+        'documentCode': matches_to_rate_df['documentCode'].to_numpy(dtype=object),
+        'matchDate': matches_to_rate_df['matchDate'].to_numpy(dtype=object),
+        'winnerId': matches_to_rate_df['winnerId'].to_numpy().astype(int),
+        'winnerName': matches_to_rate_df['winnerName'].to_numpy(dtype=object),
+        'winnerCountry': matches_to_rate_df['winnerCountry'].to_numpy(dtype=object),
+        'loserId': matches_to_rate_df['loserId'].to_numpy().astype(int),
+        'loserName': matches_to_rate_df['loserName'].to_numpy(dtype=object),
+        'loserCountry': matches_to_rate_df['loserCountry'].to_numpy(dtype=object),
+        'Winner': winner_outcome,
         
         # --- PRE-MATCH RATINGS ---
-        'winner_rating_pre': np.empty(num_matches_to_rate, dtype=float),
-        'winner_rd_pre': np.empty(num_matches_to_rate, dtype=float),       
-        'loser_rating_pre': np.empty(num_matches_to_rate, dtype=float),
-        'loser_rd_pre': np.empty(num_matches_to_rate, dtype=float),
-        
+        'winner_rating_pre': ratings['winner_rating_pre'],
+        'winner_rd_pre': ratings['winner_rd_pre'],
+        'loser_rating_pre': ratings['loser_rating_pre'],
+        'loser_rd_pre': ratings['loser_rd_pre'],
         
         # --- POST-MATCH RATINGS ---
-        'winner_rating_post': np.empty(num_matches_to_rate, dtype=float),
-        'loser_rating_post': np.empty(num_matches_to_rate, dtype=float),
-        'winner_rd_post': np.empty(num_matches_to_rate, dtype=float),
-        'loser_rd_post': np.empty(num_matches_to_rate, dtype=float),
+        'winner_rating_post': ratings['winner_rating_post'],
+        'loser_rating_post': ratings['loser_rating_post'],
+        'winner_rd_post': ratings['winner_rd_post'],
+        'loser_rd_post': ratings['loser_rd_post'],
         
         # --- DELTA & ANALYSIS COLUMNS ---
-        'winner_rating_delta': np.empty(num_matches_to_rate, dtype=float),
-        'loser_rating_delta': np.empty(num_matches_to_rate, dtype=float),
-        'rating_difference_pre': np.empty(num_matches_to_rate, dtype=float), 
-        'expected_outcome': np.empty(num_matches_to_rate, dtype=float),
+        'winner_rating_delta': ratings['winner_rating_post'] - ratings['winner_rating_pre'],
+        'loser_rating_delta': ratings['loser_rating_post'] - ratings['loser_rating_pre'],
+        'rating_difference_pre': ratings['winner_rating_pre'] - ratings['loser_rating_pre'],
+        'expected_outcome': expected_outcome(ratings['winner_rating_pre'], ratings['loser_rating_pre']),
         
         # --- MATCH COUNT COLUMNS ---
-        'winner_matches_played': np.empty(num_matches_to_rate, dtype=int),
-        'loser_matches_played': np.empty(num_matches_to_rate, dtype=int),
-    }
-
-    # --- 3. Main Loop (Unaltered, populates with original names) ---
-    for i, row in enumerate(tqdm(matches_to_rate_df.itertuples(index=False), total=num_matches_to_rate)):
-        try:
-            winner_id = int(row.winnerId)
-            loser_id = int(row.loserId)
-
-            winner_cache_entry = player_cache[winner_id]
-            loser_cache_entry = player_cache[loser_id]
-            
-            winner_obj = winner_cache_entry['glicko_obj']
-            loser_obj = loser_cache_entry['glicko_obj']
-
-            winner_rating_pre = winner_obj.rating
-            loser_rating_pre = loser_obj.rating
-            
-            rating_difference = loser_rating_pre - winner_rating_pre
-            expected_win_chance = 1 / (1 + math.pow(10, rating_difference / 400))
-            
-            match_outcome = getattr(row, "Winner", None) 
-
-            # --- Store All Columns ---
-            ratings_history['eventId'][i] = row.eventId
-            ratings_history['EventName'][i] = row.EventName 
-            ratings_history['documentCode'][i] = row.documentCode
-            ratings_history['matchDate'][i] = row.matchDate
-            ratings_history['winnerId'][i] = winner_id 
-            ratings_history['winnerName'][i] = row.winnerName
-            ratings_history['winnerCountry'][i] = row.winnerCountry
-            ratings_history['loserId'][i] = loser_id 
-            ratings_history['loserName'][i] = row.loserName
-            ratings_history['loserCountry'][i] = row.loserCountry
-            ratings_history['Winner'][i] = match_outcome
-            
-            ratings_history['winner_rating_pre'][i] = winner_rating_pre
-            ratings_history['winner_rd_pre'][i] = winner_obj.rd          
-            ratings_history['loser_rating_pre'][i] = loser_rating_pre
-            ratings_history['loser_rd_pre'][i] = loser_obj.rd
-          
-
-            ratings_history['rating_difference_pre'][i] = winner_rating_pre - loser_rating_pre
-            ratings_history['expected_outcome'][i] = expected_win_chance
-
-            if match_outcome == 'tie':
-                winner_obj.update_player([loser_obj.rating], [loser_obj.rd], [0.5]) # 0.5 = Tie
-                loser_obj.update_player([winner_obj.rating], [winner_obj.rd], [0.5]) # 0.5 = Tie
-            else:
-                winner_obj.update_player([loser_obj.rating], [loser_obj.rd], [1.0]) # 1.0 = Win
-                loser_obj.update_player([winner_obj.rating], [winner_obj.rd], [0.0]) # 0.0 = Loss
-
-            winner_cache_entry['match_count'] += 1
-            loser_cache_entry['match_count'] += 1
-
-            ratings_history['winner_rating_post'][i] = winner_obj.rating
-            ratings_history['loser_rating_post'][i] = loser_obj.rating
-            ratings_history['winner_rd_post'][i] = winner_obj.rd
-            ratings_history['loser_rd_post'][i] = loser_obj.rd
-            ratings_history['winner_matches_played'][i] = winner_cache_entry['match_count']
-            ratings_history['loser_matches_played'][i] = loser_cache_entry['match_count']
-
-            ratings_history['winner_rating_delta'][i] = winner_obj.rating - winner_rating_pre
-            ratings_history['loser_rating_delta'][i] = loser_obj.rating - loser_rating_pre
-
-        
-        except KeyError as e:
-            ratings_history['documentCode'][i] = row.documentCode
-            ratings_history['winner_rating_pre'][i] = np.nan
-        except Exception as e:
-            ratings_history['documentCode'][i] = row.documentCode
-            ratings_history['winner_rating_pre'][i] = np.nan
-
-    print(f"--- ✅ Glicko-2 Calculation Complete ---")
-    
-    results_df = pd.DataFrame(ratings_history)
-    results_df = results_df.dropna(subset=['winner_rating_pre'])
+        'winner_matches_played': ratings['winner_matches_played'].astype(int),
+        'loser_matches_played': ratings['loser_matches_played'].astype(int),
+    }, index=matches_to_rate_df.index)
 
     float_cols = [col for col in results_df.columns if results_df[col].dtype == np.float64]
     results_df[float_cols] = results_df[float_cols].round(2)
-    
-    id_cols = ['winnerId', 'loserId', 'winner_matches_played', 'loser_matches_played']
-    results_df[id_cols] = results_df[id_cols].astype(int)
 
-    # --- 4. NEW: DYNAMICALLY RENAME COLUMNS ---
-    if info_string:
-        suffix = f" ({info_string})"
-        
-        # Define metadata columns that should NOT be renamed
-        metadata_cols = {
-            'eventId', 'EventName', 'documentCode', 'matchDate', 
-            'winnerId', 'winnerName', 'winnerCountry', 
-            'loserId', 'loserName', 'loserCountry', 'Winner'
-        }
-        
-        # Find all data columns (those not in metadata_cols)
-        data_cols = [col for col in results_df.columns if col not in metadata_cols]
-        
-        # Create the rename dictionary
-        rename_dict = {col: f"{col}{suffix}" for col in data_cols}
-        
-        results_df = results_df.rename(columns=rename_dict)
-        print(f"✅ Renamed data columns with suffix: {suffix}")
+    return results_df
 
+def add_info_suffix(results_df: pd.DataFrame, info_string: str) -> pd.DataFrame:
+    """
+    Appends " (info_string)" to every data (non-metadata) column of a ratings history DataFrame.
+    """
+    suffix = f" ({info_string})"
+    
+    # Define metadata columns that should NOT be renamed
+    metadata_cols = {
+        'eventId', 'EventName', 'documentCode', 'matchDate', 
+        'winnerId', 'winnerName', 'winnerCountry', 
+        'loserId', 'loserName', 'loserCountry', 'Winner'
+    }
+    
+    # Find all data columns (those not in metadata_cols)
+    data_cols = [col for col in results_df.columns if col not in metadata_cols]
+    
+    # Create the rename dictionary
+    rename_dict = {col: f"{col}{suffix}" for col in data_cols}
+    
+    results_df = results_df.rename(columns=rename_dict)
+    print(f"✅ Renamed data columns with suffix: {suffix}")
     return results_df
 
 def get_final_player_stats(ratings_df: pd.DataFrame, info_string: str = "") -> pd.DataFrame:
@@ -0,0 +1,230 @@
+import os
+import re
+import glob
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_RATINGS_HISTORY_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Ratings_History')
+
+# Column layout of calculate_ratings_history (before the info_string suffix)
+METADATA_COLUMNS = [
+    'eventId', 'EventName', 'documentCode', 'matchDate',
+    'winnerId', 'winnerName', 'winnerCountry',
+    'loserId', 'loserName', 'loserCountry', 'Winner'
+]
+FLOAT_COLUMNS = [
+    'winner_rating_pre', 'winner_rd_pre', 'loser_rating_pre', 'loser_rd_pre',
+    'winner_rating_post', 'loser_rating_post', 'winner_rd_post', 'loser_rd_post',
+    'winner_rating_delta', 'loser_rating_delta', 'rating_difference_pre', 'expected_outcome'
+]
+COUNT_COLUMNS = ['winner_matches_played', 'loser_matches_played']
+HISTORY_COLUMNS = METADATA_COLUMNS + FLOAT_COLUMNS + COUNT_COLUMNS
+
+# 'Winner' outcome codes (-1 = missing)
+WINNER_CATEGORIES = np.array(['home', 'away', 'tie'])
+
+# History values are rounded to 2dp; float32 holds them exactly enough to round back
+FLOAT_DECIMALS = 2
+
+
+def _encode_strings(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Dictionary-encodes strings: int32 codes (-1 for missing) plus the distinct strings
+    as one utf-8 blob with offsets (no pickled objects in the file).
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    encoded = [str(value).encode('utf-8') for value in uniques]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return codes.astype(np.int32), blob, offsets
+
+
+def _decode_strings(codes: np.ndarray, blob: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    data = blob.tobytes()
+    uniques = np.array([data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])] + [None],
+                       dtype=object)
+    # code -1 picks the trailing None
+    return uniques[codes]
+
+
+def compress_ratings_history(history_df: pd.DataFrame, info_string: str = "") -> Dict[str, np.ndarray]:
+    """
+    Normalizes a ratings history into integer keys, float32 values and small
+    players / events dimension tables.
+
+    Row arrays: event_key, player keys for winner and loser, document / date / outcome codes,
+    float32 ratings and int32 match counts. The players table holds each distinct
+    (playerId, name, country) seen in the history, the events table each (eventId, EventName).
+    """
+    suffix = f" ({info_string})" if info_string else ""
+    arrays: Dict[str, np.ndarray] = {'info_string': np.array(info_string)}
+
+    # --- Players dimension: distinct (playerId, name, country) over both roles ---
+    n_rows = len(history_df)
+    name_codes, arrays['name_blob'], arrays['name_offsets'] = _encode_strings(
+        np.concatenate([history_df['winnerName'].to_numpy(dtype=object), history_df['loserName'].to_numpy(dtype=object)]))
+    country_codes, arrays['country_blob'], arrays['country_offsets'] = _encode_strings(
+        np.concatenate([history_df['winnerCountry'].to_numpy(dtype=object), history_df['loserCountry'].to_numpy(dtype=object)]))
+    player_ids = np.concatenate([history_df['winnerId'].to_numpy(dtype=np.int64), history_df['loserId'].to_numpy(dtype=np.int64)])
+
+    player_keys, player_dim = pd.MultiIndex.from_arrays([player_ids, name_codes, country_codes]).factorize()
+    arrays['players_playerId'] = player_dim.get_level_values(0).to_numpy(dtype=np.int64)
+    arrays['players_name'] = player_dim.get_level_values(1).to_numpy(dtype=np.int32)
+    arrays['players_country'] = player_dim.get_level_values(2).to_numpy(dtype=np.int32)
+    arrays['winner_key'] = player_keys[:n_rows].astype(np.int32)
+    arrays['loser_key'] = player_keys[n_rows:].astype(np.int32)
+
+    # --- Events dimension: distinct (eventId, EventName) ---
+    event_name_codes, arrays['event_name_blob'], arrays['event_name_offsets'] = _encode_strings(
+        history_df['EventName'].to_numpy(dtype=object))
+    event_keys, event_dim = pd.MultiIndex.from_arrays(
+        [history_df['eventId'].to_numpy(dtype=np.int64), event_name_codes]).factorize()
+    arrays['events_eventId'] = event_dim.get_level_values(0).to_numpy(dtype=np.int64)
+    arrays['events_name'] = event_dim.get_level_values(1).to_numpy(dtype=np.int32)
+    arrays['event_key'] = event_keys.astype(np.int32)
+
+    # --- Per-match codes ---
+    arrays['document_code'], arrays['document_blob'], arrays['document_offsets'] = _encode_strings(
+        history_df['documentCode'].to_numpy(dtype=object))
+    arrays['match_date'], arrays['date_blob'], arrays['date_offsets'] = _encode_strings(
+        history_df['matchDate'].to_numpy(dtype=object))
+
+    winner_outcome = history_df['Winner'].to_numpy(dtype=object)
+    outcome_codes = np.full(n_rows, -1, dtype=np.int8)
+    for code, category in enumerate(WINNER_CATEGORIES):
+        outcome_codes[winner_outcome == category] = code
+    arrays['winner_outcome'] = outcome_codes
+
+    # --- Values ---
+    for col in FLOAT_COLUMNS:
+        arrays[col] = history_df[f'{col}{suffix}'].to_numpy(dtype=np.float32)
+    for col in COUNT_COLUMNS:
+        arrays[col] = history_df[f'{col}{suffix}'].to_numpy(dtype=np.int32)
+
+    return arrays
+
+
+def read_compact_frame(arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    The history with integer keys, float32 values, categorical names and a UTC datetime
+    matchDate, without expanding strings per row. Column names carry no info_string suffix.
+    """
+    def categorical(codes, blob, offsets):
+        categories = _decode_strings(np.arange(len(offsets) - 1), blob, offsets)
+        return pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object))
+
+    winner_key, loser_key, event_key = arrays['winner_key'], arrays['loser_key'], arrays['event_key']
+    players_name, players_country = arrays['players_name'], arrays['players_country']
+
+    compact_df = pd.DataFrame({
+        'eventId': arrays['events_eventId'][event_key],
+        'EventName': categorical(arrays['events_name'][event_key], arrays['event_name_blob'], arrays['event_name_offsets']),
+        'documentCode': categorical(arrays['document_code'], arrays['document_blob'], arrays['document_offsets']),
+        'matchDate': pd.to_datetime(
+            pd.Series(categorical(arrays['match_date'], arrays['date_blob'], arrays['date_offsets'])),
+            errors='coerce', utc=True),
+        'winnerId': arrays['players_playerId'][winner_key],
+        'winnerName': categorical(players_name[winner_key], arrays['name_blob'], arrays['name_offsets']),
+        'winnerCountry': categorical(players_country[winner_key], arrays['country_blob'], arrays['country_offsets']),
+        'loserId': arrays['players_playerId'][loser_key],
+        'loserName': categorical(players_name[loser_key], arrays['name_blob'], arrays['name_offsets']),
+        'loserCountry': categorical(players_country[loser_key], arrays['country_blob'], arrays['country_offsets']),
+        'Winner': pd.Categorical.from_codes(arrays['winner_outcome'], categories=WINNER_CATEGORIES),
+    })
+    for col in FLOAT_COLUMNS + COUNT_COLUMNS:
+        compact_df[col] = arrays[col]
+    return compact_df
+
+
+def expand_ratings_history(arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Rebuilds the calculate_ratings_history frame layout (object metadata columns,
+    float64 values rounded to 2dp, info_string suffixes) from compress_ratings_history output.
+    """
+    info_string = str(arrays['info_string'])
+    suffix = f" ({info_string})" if info_string else ""
+
+    winner_key, loser_key, event_key = arrays['winner_key'], arrays['loser_key'], arrays['event_key']
+    players_name, players_country = arrays['players_name'], arrays['players_country']
+
+    history = {
+        'eventId': arrays['events_eventId'][event_key].astype(int),
+        'EventName': _decode_strings(arrays['events_name'][event_key], arrays['event_name_blob'], arrays['event_name_offsets']),
+        'documentCode': _decode_strings(arrays['document_code'], arrays['document_blob'], arrays['document_offsets']),
+        'matchDate': _decode_strings(arrays['match_date'], arrays['date_blob'], arrays['date_offsets']),
+        'winnerId': arrays['players_playerId'][winner_key].astype(int),
+        'winnerName': _decode_strings(players_name[winner_key], arrays['name_blob'], arrays['name_offsets']),
+        'winnerCountry': _decode_strings(players_country[winner_key], arrays['country_blob'], arrays['country_offsets']),
+        'loserId': arrays['players_playerId'][loser_key].astype(int),
+        'loserName': _decode_strings(players_name[loser_key], arrays['name_blob'], arrays['name_offsets']),
+        'loserCountry': _decode_strings(players_country[loser_key], arrays['country_blob'], arrays['country_offsets']),
+        'Winner': np.append(WINNER_CATEGORIES.astype(object), None)[arrays['winner_outcome']],
+    }
+    for col in FLOAT_COLUMNS:
+        history[f'{col}{suffix}'] = arrays[col].astype(np.float64).round(FLOAT_DECIMALS)
+    for col in COUNT_COLUMNS:
+        history[f'{col}{suffix}'] = arrays[col].astype(int)
+
+    return pd.DataFrame(history)
+
+
+def save_compact_ratings_history(history_df: pd.DataFrame, info_string: str,
+                                 history_dir: str = DEFAULT_RATINGS_HISTORY_DIR) -> Optional[str]:
+    """
+    Saves a ratings history as {date}_ratings_history_{LABEL}.npz (compressed, no pickled objects).
+    """
+    if (info_string == "") or (not isinstance(info_string, str)) or (info_string.isspace()):
+        print (f"❌ Please specify a valid info_string: {info_string} \n❌ File not saved")
+        return None
+
+    os.makedirs(history_dir, exist_ok=True)
+    safe_label = info_string.upper().replace(" ", "_")
+    date_string = datetime.now().strftime("%Y%m%d")
+    history_filepath = os.path.join(history_dir, f"{date_string}_ratings_history_{safe_label}.npz")
+    np.savez_compressed(history_filepath, **compress_ratings_history(history_df, info_string))
+    print(f"✅✅Saved compact ratings history to {history_filepath}")
+    return history_filepath
+
+
+def read_compact_ratings_history(history_filepath: str, expand: bool = True) -> pd.DataFrame:
+    """
+    Reads a .npz ratings history.
+
+    Args:
+        history_filepath (str): Path written by save_compact_ratings_history.
+        expand (bool, optional): True returns the calculate_ratings_history layout;
+                                 False the compact frame (see read_compact_frame). Defaults to True.
+    """
+    with np.load(history_filepath, allow_pickle=False) as saved:
+        arrays = {key: saved[key] for key in saved.files}
+    return expand_ratings_history(arrays) if expand else read_compact_frame(arrays)
+
+
+def get_latest_compact_ratings_history(info_string: str, history_dir: str = DEFAULT_RATINGS_HISTORY_DIR,
+                                       expand: bool = True) -> pd.DataFrame:
+    """
+    Latest {date}_ratings_history_{LABEL}.npz for info_string (empty DataFrame if none).
+    """
+    safe_label = info_string.upper().replace(' ', '_')
+    search_pattern = re.compile(rf'^\d{{8}}_ratings_history_{re.escape(safe_label)}\.npz$')
+    matching_files = sorted(file for file in glob.glob(os.path.join(history_dir, "*.npz"))
+                            if search_pattern.match(os.path.basename(file)))
+
+    if not matching_files:
+        print(f"❌ No existing MASTER files in format: {search_pattern.pattern} in {history_dir}")
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    try:
+        latest_df = read_compact_ratings_history(matching_files[-1], expand=expand)
+        print(f"✅ {len(latest_df)} match history records found in latest MASTER: {matching_files[-1]} ")
+        return latest_df
+    except Exception as e:
+        print (f"❌ Error reading lastest MASTER, {matching_files[-1]}: {e}")
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
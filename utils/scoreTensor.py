@@ -0,0 +1,263 @@
+import os
+import re
+import glob
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Optional, Tuple
+
+from utils.adjustedWinrates import encode_match_keys
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_MATCHES_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Matches')
+
+# Unplayed games (and unparseable gameScores) in the tensor
+NO_GAME = -1
+INT8_MAX = np.iinfo(np.int8).max
+
+WINNER, LOSER = 0, 1
+
+_GAME_PATTERN = r'\s*\d+\s*-\s*\d+\s*'
+_VALID_SCORE_PATTERN = rf'(?:{_GAME_PATTERN}|\s*)(?:,(?:{_GAME_PATTERN}|\s*))*'
+
+
+def parse_game_scores(game_scores: pd.Series, max_games: Optional[int] = None) -> np.ndarray:
+    """
+    Parses winner-first gameScore strings ("11-7,9-11,...") into one int8 tensor.
+
+    Args:
+        game_scores (pd.Series): The 'gameScore' column.
+        max_games (int, optional): Games axis length. Defaults to the most games in any match.
+
+    Returns:
+        np.ndarray: int8 array of shape (matches, max_games, 2); [m, g] is (winner points,
+                    loser points) of game g. Unplayed games, and every game of a missing or
+                    unparseable gameScore, are NO_GAME.
+    """
+    game_scores = game_scores.astype('string').reset_index(drop=True)
+    games = game_scores.str.extractall(r'(\d+)\s*-\s*(\d+)')
+    points = games.to_numpy(dtype=np.int64)
+    match_pos = games.index.get_level_values(0).to_numpy()
+    game_pos = games.index.get_level_values(1).to_numpy()
+
+    # Every comma-separated part must be a game score, and every score must fit in int8
+    is_valid = game_scores.str.fullmatch(_VALID_SCORE_PATTERN).fillna(False).to_numpy(dtype=bool)
+    too_large = np.zeros(len(game_scores), dtype=bool)
+    too_large[match_pos[(points > INT8_MAX).any(axis=1)]] = True
+    is_valid &= ~too_large
+
+    if max_games is None:
+        max_games = int(game_pos.max()) + 1 if len(game_pos) else 0
+
+    tensor = np.full((len(game_scores), max_games, 2), NO_GAME, dtype=np.int8)
+    keep = is_valid[match_pos] & (game_pos < max_games)
+    tensor[match_pos[keep], game_pos[keep]] = points[keep]
+    return tensor
+
+
+def played_games(tensor: np.ndarray) -> np.ndarray:
+    """
+    (matches, games) mask of the games that were played.
+    """
+    return tensor[:, :, WINNER] >= 0
+
+
+def game_points(tensor: np.ndarray) -> np.ndarray:
+    """
+    (matches, games, 2) points as int64, with unplayed games as 0.
+    """
+    return np.where(tensor >= 0, tensor, 0).astype(np.int64)
+
+
+def total_points(tensor: np.ndarray) -> np.ndarray:
+    """
+    (matches, 2) total points of the winner and loser.
+    """
+    return game_points(tensor).sum(axis=1)
+
+
+def game_margins(tensor: np.ndarray) -> np.ndarray:
+    """
+    (matches, games) winner points minus loser points of each game (0 for unplayed games).
+    """
+    points = game_points(tensor)
+    return points[:, :, WINNER] - points[:, :, LOSER]
+
+
+def games_won(tensor: np.ndarray) -> np.ndarray:
+    """
+    (matches, games, 2) True where the winner / loser of the match won the game.
+    """
+    margins = game_margins(tensor)
+    return np.stack([margins > 0, margins < 0], axis=2)
+
+
+def deuce_games(tensor: np.ndarray) -> np.ndarray:
+    """
+    (matches, games) games that reached 10-10.
+    """
+    return (tensor[:, :, WINNER] >= 10) & (tensor[:, :, LOSER] >= 10)
+
+
+def average_winning_margin(tensor: np.ndarray) -> np.ndarray:
+    """
+    (matches, 2) average margin of the games each player won (0 if they won none).
+    """
+    won = games_won(tensor)
+    margins = np.abs(game_margins(tensor))[:, :, None]
+    n_won = won.sum(axis=1)
+    return np.where(n_won > 0, (margins * won).sum(axis=1) / np.maximum(n_won, 1), 0.0)
+
+
+def max_game_deficit(tensor: np.ndarray) -> np.ndarray:
+    """
+    Largest games deficit the match winner came back from (e.g. 2 for a win from 0-2).
+    """
+    won = games_won(tensor)
+    deficit = np.cumsum(won[:, :, LOSER], axis=1) - np.cumsum(won[:, :, WINNER], axis=1)
+    return deficit.max(axis=1, initial=0)
+
+
+def engineer_game_score_stats(tensor: np.ndarray, index: Optional[pd.Index] = None) -> pd.DataFrame:
+    """
+    The game score stats of notebook 10 (one row per match, same columns and values as the
+    per-row engineer_game_score_stats), computed as array reductions over the score tensor.
+    Matches without parseable game scores get <NA> in every column.
+
+    Args:
+        tensor (np.ndarray): Output of parse_game_scores.
+        index (pd.Index, optional): Index of the output (e.g. the matches index).
+    """
+    played = played_games(tensor)
+    n_games = played.sum(axis=1)
+    has_games = n_games > 0
+
+    points = game_points(tensor)
+    winner_points, loser_points = points[:, :, WINNER], points[:, :, LOSER]
+    totals = points.sum(axis=1)
+    match_points = totals.sum(axis=1)
+    won = games_won(tensor)
+    winner_won, loser_won = won[:, :, WINNER], won[:, :, LOSER]
+    deuce = deuce_games(tensor)
+    deficit = np.cumsum(loser_won, axis=1) - np.cumsum(winner_won, axis=1)
+    average_margin = average_winning_margin(tensor)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        winner_ratio = np.round(totals[:, WINNER] / match_points, 3)
+        loser_ratio = np.round(totals[:, LOSER] / match_points, 3)
+        per_set = np.round(match_points / n_games, 2)
+        winner_per_set = np.round(totals[:, WINNER] / n_games, 2)
+        loser_per_set = np.round(totals[:, LOSER] / n_games, 2)
+
+    columns = {
+        "winnerTotalPoints": totals[:, WINNER],
+        "loserTotalPoints": totals[:, LOSER],
+        "totalPoints": match_points,
+        "winnerPointsRatio": np.where(match_points > 0, winner_ratio, np.nan),
+        "loserPointsRatio": np.where(match_points > 0, loser_ratio, np.nan),
+        "winnerMaxScore": winner_points.max(axis=1, initial=0),
+        "loserMaxScore": loser_points.max(axis=1, initial=0),
+        "maxScore": points.max(axis=(1, 2), initial=0),
+        "numberDeuceGames": deuce.sum(axis=1),
+        "winnerDeuceWon": (winner_won & (winner_points >= 12)).sum(axis=1),
+        "loserDeuceWon": (loser_won & (loser_points >= 12)).sum(axis=1),
+        "winnerPointsDifference": totals[:, WINNER] - totals[:, LOSER],
+        "pointsPerSet": per_set,
+        "winnerDroppedFirstSet": (winner_points[:, 0] < loser_points[:, 0]) if tensor.shape[1] else has_games,
+        "winner0Wins": (winner_won & (loser_points == 0)).sum(axis=1),
+        "winner1Wins": (winner_won & (loser_points == 1)).sum(axis=1),
+        "winner4Wins": (winner_won & (loser_points <= 4)).sum(axis=1),
+        "loser0Wins": (loser_won & (winner_points == 0)).sum(axis=1),
+        "loser1Wins": (loser_won & (winner_points == 1)).sum(axis=1),
+        "loser4Wins": (loser_won & (winner_points <= 4)).sum(axis=1),
+        "winnerAvgWinningMargin": np.round(average_margin[:, WINNER], 2),
+        "loserAvgWinningMargin": np.round(average_margin[:, LOSER], 2),
+        "comebackBy2": (deficit == 2).any(axis=1),
+        "comebackBy3": (deficit == 3).any(axis=1),
+        "winnerAvgPointsPerSet": winner_per_set,
+        "loserAvgPointsPerSet": loser_per_set,
+    }
+
+    stats = pd.DataFrame(index=index if index is not None else pd.RangeIndex(len(tensor)))
+    for col, values in columns.items():
+        dtype = 'boolean' if values.dtype == bool else ('Int64' if np.issubdtype(values.dtype, np.integer) else 'Float64')
+        stats[col] = pd.array(values, dtype=dtype)
+        stats.loc[~has_games, col] = pd.NA
+    return stats
+
+
+def save_score_tensor(tensor: np.ndarray, event_ids: pd.Series, document_codes: pd.Series,
+                      master_matches_dir: str = DEFAULT_MATCHES_DIR) -> str:
+    """
+    Saves the tensor next to the master matches as {date}_master_score_tensor.npz,
+    with the eventId and documentCode of every row so it can be re-aligned with any matches table.
+    """
+    os.makedirs(master_matches_dir, exist_ok=True)
+    date_string = datetime.now().strftime("%Y%m%d")
+    tensor_filepath = os.path.join(master_matches_dir, f"{date_string}_master_score_tensor.npz")
+    np.savez_compressed(tensor_filepath, scores=tensor,
+                        eventId=_event_ids(event_ids),
+                        documentCode=document_codes.astype(str).to_numpy(dtype=str))
+    print(f"✅✅Saved score tensor ({tensor.shape[0]} matches x {tensor.shape[1]} games) to {tensor_filepath}")
+    return tensor_filepath
+
+
+def get_latest_score_tensor(master_matches_dir: str = DEFAULT_MATCHES_DIR) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Reads the latest saved score tensor.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: the tensor and the eventId and documentCode
+                                                   of each row (empty arrays if no tensor is found).
+    """
+    empty = np.empty((0, 0, 2), dtype=np.int8), np.empty(0, dtype=np.int64), np.empty(0, dtype=str)
+    search_pattern = re.compile(r'^\d{8}_master_score_tensor\.npz$')
+    files = sorted(file for file in glob.glob(os.path.join(master_matches_dir, "*.npz"))
+                   if search_pattern.match(os.path.basename(file)))
+    if not files:
+        print(f"❌ No existing score tensor found in {master_matches_dir}")
+        return empty
+
+    latest_file = files[-1]
+    try:
+        with np.load(latest_file) as saved:
+            tensor, event_ids, document_codes = saved['scores'], saved['eventId'], saved['documentCode']
+        print(f"✅ Score tensor of {len(tensor)} matches found in latest MASTER: {latest_file}")
+        return tensor, event_ids, document_codes
+    except Exception as e:
+        print(f"❌ Error reading latest score tensor, {latest_file}: {e}")
+        return empty
+
+
+def _event_ids(event_ids) -> np.ndarray:
+    """
+    eventIds as int64, with missing or non-numeric ids as -1.
+    """
+    return pd.to_numeric(pd.Series(event_ids), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+
+
+def align_score_tensor(tensor: np.ndarray, event_ids: np.ndarray, document_codes: np.ndarray,
+                       matches_df: pd.DataFrame) -> np.ndarray:
+    """
+    Rows of a saved tensor in the row order of matches_df, matched on (eventId, documentCode)
+    (documentCodes repeat across events); matches missing from the tensor get NO_GAME rows.
+    """
+    n_saved = len(document_codes)
+    keys = encode_match_keys(np.concatenate([_event_ids(event_ids), _event_ids(matches_df['eventId'])]),
+                      np.concatenate([np.asarray(document_codes, dtype=object),
+                                      matches_df['documentCode'].astype(str).to_numpy(dtype=object)]))
+    saved_keys, wanted_keys = keys[:n_saved], keys[n_saved:]
+
+    aligned = np.full((len(matches_df),) + tensor.shape[1:], NO_GAME, dtype=np.int8)
+    if n_saved == 0:
+        return aligned
+    # Stable sort, so a key saved twice resolves to its first row
+    order = np.argsort(saved_keys, kind='stable')
+    sorted_keys = saved_keys[order]
+    positions = np.clip(np.searchsorted(sorted_keys, wanted_keys), 0, n_saved - 1)
+    found = (wanted_keys >= 0) & (sorted_keys[positions] == wanted_keys)
+    aligned[found] = tensor[order[positions[found]]]
+    return aligned
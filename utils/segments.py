@@ -0,0 +1,215 @@
+import os
+import io
+import contextlib
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from utils.glickoEngine import (
+    GlickoState, select_matches_to_rate, get_match_arrays, run_glicko2,
+    run_glicko2_periods, get_rating_periods
+)
+from utils.ratings import build_ratings_history_frame, add_info_suffix, get_final_player_stats
+
+# A segment filter is either {column: value or list of values} on the matches
+# ('Gender' filters both players through players_df), or a callable
+# (matches_df, players_df) -> boolean mask.
+SegmentFilter = Union[Dict[str, object], Callable[[pd.DataFrame, pd.DataFrame], np.ndarray]]
+
+# Metadata columns handed to every worker once, when the pool starts
+SEGMENT_METADATA_COLUMNS = [
+    'eventId', 'EventName', 'documentCode', 'matchDate',
+    'winnerId', 'winnerName', 'winnerCountry',
+    'loserId', 'loserName', 'loserCountry', 'Winner'
+]
+
+# Worker process globals, set by _init_worker
+_WORKER_ARRAYS: Dict[str, np.ndarray] = {}
+_WORKER_BLOCKS = []
+_WORKER_METADATA: Optional[pd.DataFrame] = None
+_WORKER_PLAYER_IDS: Optional[np.ndarray] = None
+
+
+def gender_filters() -> Dict[str, SegmentFilter]:
+    """
+    The men's and women's slices used by the leaderboards.
+    """
+    return {'M': {'Gender': 'M'}, 'F': {'Gender': 'F'}}
+
+
+def column_filters(matches_df: pd.DataFrame, column: str) -> Dict[str, SegmentFilter]:
+    """
+    One slice per distinct value of a match column, e.g. column_filters(matches_df, 'TableSponsor').
+    """
+    return {str(value): {column: value} for value in matches_df[column].dropna().unique()}
+
+
+def build_segment_mask(matches_df: pd.DataFrame, players_df: pd.DataFrame, segment_filter: SegmentFilter) -> np.ndarray:
+    """
+    Boolean mask of the matches in a segment.
+    """
+    if callable(segment_filter):
+        return np.asarray(segment_filter(matches_df, players_df), dtype=bool)
+
+    mask = np.ones(len(matches_df), dtype=bool)
+    for column, value in segment_filter.items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        if column == 'Gender':
+            gender_ids = players_df.loc[players_df['Gender'].isin(values), 'playerId'].to_numpy()
+            mask &= matches_df['winnerId'].isin(gender_ids).to_numpy() & matches_df['loserId'].isin(gender_ids).to_numpy()
+        else:
+            mask &= matches_df[column].isin(values).to_numpy()
+    return mask
+
+
+def share_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[list, Dict[str, Tuple[str, tuple, str]]]:
+    """
+    Copies arrays into new shared memory blocks.
+
+    Returns:
+        The blocks (close and unlink them once the workers are done) and the
+        {key: (block name, shape, dtype)} specs to pass to attach_shared_arrays.
+    """
+    blocks, specs = [], {}
+    try:
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            specs[key] = (block.name, array.shape, array.dtype.str)
+    except Exception:
+        release_shared_arrays(blocks)
+        raise
+    return blocks, specs
+
+
+def attach_shared_arrays(specs: Dict[str, Tuple[str, tuple, str]]) -> Tuple[list, Dict[str, np.ndarray]]:
+    """
+    Array views on the shared memory blocks described by specs (keep the blocks referenced).
+    """
+    blocks, arrays = [], {}
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def release_shared_arrays(blocks: list) -> None:
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def _init_worker(array_specs: Dict[str, Tuple[str, tuple, str]], metadata_df: pd.DataFrame, player_ids: np.ndarray) -> None:
+    """
+    Attaches a worker to the shared match arrays. The metadata frame is sent once per worker.
+    """
+    global _WORKER_METADATA, _WORKER_PLAYER_IDS
+    blocks, arrays = attach_shared_arrays(array_specs)
+    _WORKER_BLOCKS.extend(blocks)
+    _WORKER_ARRAYS.update(arrays)
+    _WORKER_METADATA = metadata_df
+    _WORKER_PLAYER_IDS = player_ids
+
+
+def _rate_segment(segment_name: str, segment_number: int, info_string: str, rating_period: str) -> Tuple[str, pd.DataFrame, pd.DataFrame]:
+    """
+    Ratings history and final stats of one segment, run inside a worker.
+    """
+    rows = np.flatnonzero(_WORKER_ARRAYS['masks'][segment_number])
+    state = GlickoState.fresh(_WORKER_PLAYER_IDS)
+    segment_df = _WORKER_METADATA.iloc[rows]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        if rating_period == "match":
+            ratings = run_glicko2(state, _WORKER_ARRAYS['winner_idx'][rows],
+                                  _WORKER_ARRAYS['loser_idx'][rows], _WORKER_ARRAYS['score'][rows])
+        else:
+            segment_df, period_codes = get_rating_periods(segment_df, rating_period)
+            winner_idx, loser_idx, score = get_match_arrays(state, segment_df)
+            ratings = run_glicko2_periods(state, winner_idx, loser_idx, score, period_codes)
+
+        history_df = build_ratings_history_frame(segment_df, ratings).reset_index(drop=True)
+        if info_string:
+            history_df = add_info_suffix(history_df, info_string)
+        final_stats_df = get_final_player_stats(history_df, info_string) if len(history_df) else pd.DataFrame()
+
+    return segment_name, history_df, final_stats_df
+
+
+def calculate_segment_ratings(players_df: pd.DataFrame,
+                              matches_df: pd.DataFrame,
+                              segment_filters: Dict[str, SegmentFilter],
+                              info_string: str = "",
+                              rating_period: str = "match",
+                              max_workers: Optional[int] = None) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """
+    Ratings history and final player stats for several independent match slices,
+    one slice per worker process.
+
+    The matches are filtered and sorted once; the winner / loser indices, scores and
+    per-segment masks are placed in shared memory, so a task only carries its segment
+    number. Each segment gives the same result as calculate_ratings_history on the
+    segment's matches.
+
+    Args:
+        players_df (pd.DataFrame): Players containing 'playerId' (and 'Gender' for gender filters).
+        matches_df (pd.DataFrame): All matches, as for calculate_ratings_history.
+        segment_filters (Dict[str, SegmentFilter]): Named filters, e.g. gender_filters() or
+                                                    column_filters(matches_df, 'TableSponsor').
+        info_string (str, optional): Column suffix for every segment. Defaults to "".
+        rating_period (str, optional): As for calculate_ratings_history. Defaults to "match".
+        max_workers (int, optional): Worker processes. Defaults to one per segment (up to the CPU count).
+
+    Returns:
+        Dict[str, Dict[str, pd.DataFrame]]: {segment name: {'history': ..., 'final_stats': ...}}
+    """
+    print(f"--- 🟢 Rating {len(segment_filters)} segments: {list(segment_filters)} ---")
+
+    matches_to_rate_df = select_matches_to_rate(players_df, matches_df)
+    state = GlickoState.fresh(players_df['playerId'].dropna())
+    winner_idx, loser_idx, score = get_match_arrays(state, matches_to_rate_df)
+
+    masks = np.vstack([
+        build_segment_mask(matches_to_rate_df, players_df, segment_filter)
+        for segment_filter in segment_filters.values()
+    ]) if segment_filters else np.empty((0, len(matches_to_rate_df)), dtype=bool)
+
+    for segment_name, segment_mask in zip(segment_filters, masks):
+        print(f"🏓 {segment_name}: {segment_mask.sum()} matches")
+
+    metadata_df = matches_to_rate_df[[col for col in SEGMENT_METADATA_COLUMNS if col in matches_to_rate_df.columns]]
+    metadata_df = metadata_df.reset_index(drop=True)
+    arrays = {'winner_idx': winner_idx, 'loser_idx': loser_idx, 'score': score, 'masks': masks}
+
+    if max_workers is None:
+        max_workers = min(len(segment_filters), os.cpu_count() or 1)
+
+    results = {}
+    tasks = [(segment_name, i, info_string, rating_period) for i, segment_name in enumerate(segment_filters)]
+
+    if max_workers <= 1:
+        # Same code path, no pool
+        _init_worker({}, metadata_df, state.player_ids)
+        _WORKER_ARRAYS.update(arrays)
+        outputs = [_rate_segment(*task) for task in tasks]
+        _WORKER_ARRAYS.clear()
+    else:
+        blocks, specs = share_arrays(arrays)
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(specs, metadata_df, state.player_ids)) as executor:
+                futures = [executor.submit(_rate_segment, *task) for task in tasks]
+                outputs = [future.result() for future in futures]
+        finally:
+            release_shared_arrays(blocks)
+
+    for segment_name, history_df, final_stats_df in outputs:
+        results[segment_name] = {'history': history_df, 'final_stats': final_stats_df}
+        print(f"✅ {segment_name}: {len(history_df)} rated matches, {len(final_stats_df)} players")
+
+    return results
@@ -3,6 +3,7 @@ from datetime import datetime, timezone, timedelta
 import numpy as np
 import streamlit as st
 import os
+from utils.headToHead import get_head_to_head_matches, get_top_opponents
 #### Path Definitions (needed for now maybe to do with using notebooks - check this!!!)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
@@ -160,10 +161,12 @@ def render_players_table(players_df):
                 height=500
             )
 
-def render_matches_table(matches_df):
+def render_matches_table(matches_df, load_raw_matches=None):
 
         """
         Renders an interactive table for the Matches DataFrame with filters.
+        load_raw_matches (optional) returns the matches with every column, for the raw data
+        view only; matches_df can then hold just the displayed columns.
         """ 
         
         show_raw_data = st.checkbox("Show raw data  ")
@@ -193,8 +196,9 @@ def render_matches_table(matches_df):
 
         
         if show_raw_data:
+            raw_df = load_raw_matches().loc[filtered_df.index] if load_raw_matches is not None else filtered_df
             st.dataframe(
-                filtered_df, 
+                raw_df, 
                 use_container_width=True, 
                 height=500
             )
@@ -230,3 +234,74 @@ def render_matches_table(matches_df):
 
         )# 
 
+
+def render_head_to_head(head_to_head, matches_df, players_df):
+
+        """
+        Renders the head-to-head record of two players, their matches and
+        player A's top opponents, from the head-to-head store (get_head_to_head).
+        """
+
+        names = players_df.dropna(subset=["PlayerName"]).drop_duplicates(subset="playerId")
+        names = names[names["playerId"].isin(head_to_head.player_ids)].sort_values(by="PlayerName")
+        player_options = dict(zip(names["PlayerName"] + " (" + names["playerId"].astype(str) + ")", names["playerId"]))
+
+        col_a, col_b = st.columns(2)
+        with col_a:
+            player_a_label = st.selectbox("Player A", list(player_options), index=None, placeholder="Search player")
+        with col_b:
+            player_b_label = st.selectbox("Player B", list(player_options), index=None, placeholder="Search player")
+
+        if player_a_label is None:
+            return
+
+        player_a = int(player_options[player_a_label])
+
+        if player_b_label is not None:
+            player_b = int(player_options[player_b_label])
+            record = head_to_head.record(player_a, player_b)
+
+            metric_cols = st.columns(3)
+            metric_cols[0].metric("Matches", record["matches"])
+            metric_cols[1].metric("Wins (A - B)", f"{record['winsA']} - {record['winsB']}")
+            metric_cols[2].metric("Games (A - B)", f"{record['setsA']} - {record['setsB']}")
+
+            h2h_matches_df = get_head_to_head_matches(head_to_head, matches_df, player_a, player_b)
+            display_cols = ["EventName", "Round", "matchDate", "winnerName", "loserName", "overallScore", "gameScore"]
+            available_cols = [c for c in display_cols if c in h2h_matches_df.columns]
+
+            st.dataframe(
+                h2h_matches_df[available_cols].sort_values(by="matchDate", ascending=False)
+                if "matchDate" in available_cols else h2h_matches_df[available_cols],
+                width="stretch",
+                hide_index=True,
+                column_config={
+                    "EventName": st.column_config.TextColumn("Event Name"),
+                    "Round": st.column_config.TextColumn("Round", width="small"),
+                    "matchDate": st.column_config.DateColumn("Match Date", format="YYYY-MM-DD"),
+                    "winnerName": st.column_config.TextColumn("Winner Name", width="medium"),
+                    "loserName": st.column_config.TextColumn("Loser Name", width="medium"),
+                    "overallScore": st.column_config.TextColumn("Overall Score", width="small"),
+                    "gameScore": st.column_config.TextColumn("Game Score", width="small"),
+                },
+            )
+
+        top_n = st.slider("Top opponents", min_value=5, max_value=50, value=10, step=5)
+        st.caption(f"{player_a_label}: most played opponents")
+        st.dataframe(
+            get_top_opponents(head_to_head, player_a, top_n, players_df),
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "opponentId": st.column_config.NumberColumn("ID", format="%d"),
+                "opponentName": st.column_config.TextColumn("Opponent", width="medium"),
+                "TotalMatches": st.column_config.NumberColumn("Matches"),
+                "TotalWins": st.column_config.NumberColumn("Wins"),
+                "TotalLosses": st.column_config.NumberColumn("Losses"),
+                "TotalSetsWon": st.column_config.NumberColumn("Games Won"),
+                "TotalSetsLost": st.column_config.NumberColumn("Games Lost"),
+                "TotalPointsWon": st.column_config.NumberColumn("Points Won"),
+                "TotalPointsLost": st.column_config.NumberColumn("Points Lost"),
+                "MatchWinRate": st.column_config.NumberColumn("Win %", format="%.1f"),
+            },
+        )
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from utils.ratingIndex import DATE_BITS, to_index_seconds
+
+# Result codes of a player-match row
+LOSS, WIN, TIE = 0, 1, 2
+
+
+@dataclass
+class StreakIndex:
+    """
+    Every player's results in one sorted array.
+
+    keys = (playerId << DATE_BITS) | seconds is sorted (stable, so matches on the same date
+    keep their input order), making each player's matches a contiguous, date-ordered block.
+    results holds the LOSS / WIN / TIE code of each row.
+    """
+    keys: np.ndarray
+    results: np.ndarray
+
+    @property
+    def player_of_row(self) -> np.ndarray:
+        return self.keys >> DATE_BITS
+
+
+def _player_results(matches_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sorted keys and result codes of the winner and loser row of every match with a date.
+    """
+    matches_df = matches_df[matches_df['winnerId'].notna() & matches_df['loserId'].notna()]
+    seconds = to_index_seconds(matches_df['matchDate'].to_numpy())
+    has_date = seconds >= 0
+    matches_df, seconds = matches_df[has_date], seconds[has_date]
+    n_matches = len(matches_df)
+
+    player_ids = np.concatenate([matches_df['winnerId'].to_numpy(dtype=np.int64),
+                                 matches_df['loserId'].to_numpy(dtype=np.int64)])
+    keys = (player_ids << DATE_BITS) | np.tile(seconds, 2)
+    results = np.repeat(np.array([WIN, LOSS], dtype=np.int8), n_matches)
+    if 'Winner' in matches_df.columns:
+        results[np.tile(matches_df['Winner'].to_numpy() == 'tie', 2)] = TIE
+
+    order = np.argsort(keys, kind='stable')
+    return keys[order], results[order]
+
+
+def build_streak_index(matches_df: pd.DataFrame) -> StreakIndex:
+    """
+    Builds the streak index from matches (or a ratings history) with
+    'winnerId', 'loserId', 'matchDate' and optionally 'Winner' for ties.
+    """
+    keys, results = _player_results(matches_df)
+    return StreakIndex(keys=keys, results=results)
+
+
+def update_streak_index(streak_index: StreakIndex, new_matches_df: pd.DataFrame) -> StreakIndex:
+    """
+    Adds new matches to a streak index by inserting their rows into the sorted arrays
+    (after any existing rows with the same key).
+    """
+    new_keys, new_results = _player_results(new_matches_df)
+    if len(new_keys) == 0:
+        return streak_index
+
+    positions = np.searchsorted(streak_index.keys, new_keys, side='right')
+    return StreakIndex(keys=np.insert(streak_index.keys, positions, new_keys),
+                       results=np.insert(streak_index.results, positions, new_results))
+
+
+def compute_streaks(streak_index: StreakIndex, player_ids: Optional[np.ndarray] = None,
+                    info_string: str = "") -> pd.DataFrame:
+    """
+    Streak statistics of every player in one pass over the run-length encoded results.
+
+    A run is a maximal block of equal results of one player; a tie ends any streak.
+    The record after a loss / win counts each player's next match.
+
+    Args:
+        streak_index (StreakIndex): Output of build_streak_index / update_streak_index.
+        player_ids (np.ndarray, optional): Only compute these players (their blocks are
+                                           sliced out first). Defaults to all players.
+        info_string (str, optional): Suffix for the data columns. Defaults to "".
+
+    Returns:
+        pd.DataFrame: playerId, LongestWinStreak, LongestLossStreak, CurrentStreak (wins > 0,
+                      losses < 0, 0 after a tie), MatchesAfterLoss, WinsAfterLoss,
+                      WinRateAfterLoss and WinRateAfterWin, sorted by playerId.
+    """
+    keys, results = streak_index.keys, streak_index.results
+    if player_ids is not None:
+        player_ids = np.unique(np.asarray(player_ids, dtype=np.int64))
+        starts = np.searchsorted(keys, player_ids << DATE_BITS, side='left')
+        ends = np.searchsorted(keys, (player_ids + 1) << DATE_BITS, side='left')
+        lengths = ends - starts
+        rows = np.repeat(starts - np.cumsum(np.append(0, lengths[:-1])), lengths) + np.arange(lengths.sum())
+        keys, results = keys[rows], results[rows]
+
+    player_of_row = keys >> DATE_BITS
+    n_rows = len(keys)
+
+    # --- 1. Dense player index and run-length encoding ---
+    new_player = np.ones(n_rows, dtype=bool)
+    new_player[1:] = player_of_row[1:] != player_of_row[:-1]
+    new_run = new_player.copy()
+    new_run[1:] |= results[1:] != results[:-1]
+
+    block_of_row = np.cumsum(new_player) - 1
+    ids = player_of_row[new_player]
+    n_players = len(ids)
+
+    run_starts = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.append(run_starts, n_rows))
+    run_results = results[run_starts]
+    run_blocks = block_of_row[run_starts]
+
+    def longest(result):
+        streak = np.zeros(n_players, dtype=np.int64)
+        is_result = run_results == result
+        np.maximum.at(streak, run_blocks[is_result], run_lengths[is_result])
+        return streak
+
+    # --- 2. Current streak from each player's last run ---
+    is_last_run = np.ones(len(run_starts), dtype=bool)
+    is_last_run[:-1] = run_blocks[1:] != run_blocks[:-1]
+    last_lengths, last_results = run_lengths[is_last_run], run_results[is_last_run]
+    current = np.where(last_results == WIN, last_lengths, np.where(last_results == LOSS, -last_lengths, 0))
+
+    # --- 3. Next match of the same player after a loss / win ---
+    previous = np.full(n_rows, -1, dtype=np.int8)
+    previous[1:] = results[:-1]
+    previous[new_player] = -1
+    is_win = (results == WIN).astype(np.int64)
+
+    def after(result):
+        follows = previous == result
+        played = np.bincount(block_of_row[follows], minlength=n_players)
+        won = np.bincount(block_of_row[follows], weights=is_win[follows], minlength=n_players).astype(np.int64)
+        return played, won
+
+    matches_after_loss, wins_after_loss = after(LOSS)
+    matches_after_win, wins_after_win = after(WIN)
+
+    def rate(won, played):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.round(np.nan_to_num(won / played * 100), 2)
+
+    suffix = f" ({info_string})" if info_string else ""
+    streaks_df = pd.DataFrame({'playerId': ids})
+    data_cols = {
+        'LongestWinStreak': longest(WIN),
+        'LongestLossStreak': longest(LOSS),
+        'CurrentStreak': current,
+        'MatchesAfterLoss': matches_after_loss,
+        'WinsAfterLoss': wins_after_loss,
+        'WinRateAfterLoss': rate(wins_after_loss, matches_after_loss),
+        'WinRateAfterWin': rate(wins_after_win, matches_after_win),
+    }
+    for col, values in data_cols.items():
+        streaks_df[f"{col}{suffix}"] = values
+    return streaks_df
+
+
+def update_streaks(streak_index: StreakIndex, streaks_df: pd.DataFrame, new_matches_df: pd.DataFrame,
+                   info_string: str = "") -> Tuple[StreakIndex, pd.DataFrame]:
+    """
+    Adds new matches to the index and recomputes the streaks of only the players in them;
+    every other row of streaks_df is kept as is.
+
+    Returns:
+        Tuple[StreakIndex, pd.DataFrame]: the updated index and streaks, sorted by playerId.
+    """
+    streak_index = update_streak_index(streak_index, new_matches_df)
+    affected_ids = pd.concat([new_matches_df['winnerId'], new_matches_df['loserId']]).dropna().to_numpy(dtype=np.int64)
+    if len(affected_ids) == 0:
+        return streak_index, streaks_df
+
+    updated_df = compute_streaks(streak_index, affected_ids, info_string)
+    kept_df = streaks_df[~streaks_df['playerId'].isin(updated_df['playerId'])]
+    streaks_df = pd.concat([kept_df, updated_df], ignore_index=True).sort_values(by='playerId').reset_index(drop=True)
+    return streak_index, streaks_df
@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from utils.networks import build_player_index, build_adjacency_matrix
+
+UNKNOWN_LABEL = 'Unknown'
+
+
+@dataclass
+class ScheduleMatrix:
+    """
+    Player x opponent match counts, one block per slice.
+
+    Node slice * n_players + i is player_ids[i] within slice_labels[slice]; counts is the
+    block-diagonal symmetric CSR matrix of matches between nodes, so one sparse product
+    averages any per-player vector over the opponents of every player in every slice.
+    wins / matches are the per-node totals.
+    """
+    player_ids: np.ndarray
+    slice_labels: pd.DataFrame
+    counts: sp.csr_matrix
+    wins: np.ndarray
+    matches: np.ndarray
+
+    @property
+    def n_players(self) -> int:
+        return len(self.player_ids)
+
+    def tile(self, player_values: np.ndarray) -> np.ndarray:
+        """
+        Repeats a per-player vector for every slice.
+        """
+        return np.tile(player_values, len(self.slice_labels))
+
+
+def _slice_columns(matches_df: pd.DataFrame, by: Sequence[str], events_df: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """
+    The by columns of matches_df as strings; 'year' is taken from matchDate and missing
+    event columns (e.g. 'TableSponsor', 'EventType') are joined from events_df on eventId.
+    """
+    event_cols = [col for col in by if col not in matches_df.columns and col != 'year']
+    if event_cols and events_df is not None:
+        event_cols = [col for col in event_cols if col in events_df.columns]
+        event_lookup = events_df[['eventId'] + event_cols].drop_duplicates(subset='eventId')
+        match_cols = [col for col in ['eventId', 'matchDate'] + list(by) if col in matches_df.columns]
+        matches_df = matches_df[list(dict.fromkeys(match_cols))].merge(event_lookup, on='eventId', how='left') \
+            .set_axis(matches_df.index)
+
+    slice_df = pd.DataFrame(index=matches_df.index)
+    for col in by:
+        if col == 'year' and col not in matches_df.columns:
+            slice_df[col] = matches_df['matchDate'].astype(str).str[:4]
+        elif col in matches_df.columns:
+            slice_df[col] = matches_df[col].fillna(UNKNOWN_LABEL).astype(str)
+        else:
+            slice_df[col] = UNKNOWN_LABEL
+    return slice_df
+
+
+def build_schedule_matrix(matches_df: pd.DataFrame,
+                          by: Optional[List[str]] = None,
+                          events_df: Optional[pd.DataFrame] = None) -> ScheduleMatrix:
+    """
+    Builds the player x opponent match-count matrix of matches_df, split into one block per
+    combination of the by columns (e.g. ['year', 'TableSponsor', 'EventType'], the winrate
+    cube slices). Matches with a missing player id are ignored.
+    """
+    matches_df = matches_df[matches_df['winnerId'].notna() & matches_df['loserId'].notna()]
+    player_ids, winner_idx, loser_idx = build_player_index(matches_df['winnerId'].to_numpy(),
+                                                           matches_df['loserId'].to_numpy())
+    n_players = len(player_ids)
+
+    if by:
+        slice_df = _slice_columns(matches_df, by, events_df)
+        slice_codes, slice_uniques = pd.factorize(pd.MultiIndex.from_frame(slice_df), sort=True)
+        slice_labels = slice_uniques.to_frame(index=False, name=list(by))
+    else:
+        slice_codes = np.zeros(len(matches_df), dtype=np.int64)
+        slice_labels = pd.DataFrame(index=pd.RangeIndex(1))
+
+    n_nodes = len(slice_labels) * n_players
+    winner_node = slice_codes * n_players + winner_idx
+    loser_node = slice_codes * n_players + loser_idx
+
+    return ScheduleMatrix(
+        player_ids=player_ids,
+        slice_labels=slice_labels,
+        counts=build_adjacency_matrix(winner_node, loser_node, n_nodes),
+        wins=np.bincount(winner_node, minlength=n_nodes),
+        matches=np.bincount(np.concatenate([winner_node, loser_node]), minlength=n_nodes),
+    )
+
+
+def _player_vector(schedule: ScheduleMatrix, values_df: pd.DataFrame, col: str) -> np.ndarray:
+    """
+    values_df[col] aligned with schedule.player_ids (NaN for players not in values_df).
+    """
+    values = values_df.drop_duplicates(subset='playerId').set_index('playerId')[col]
+    return pd.to_numeric(values.reindex(schedule.player_ids), errors='coerce').to_numpy(dtype=float)
+
+
+def _opponent_average(counts: sp.csr_matrix, node_values: np.ndarray) -> np.ndarray:
+    """
+    Match-weighted average of node_values over the opponents of every node, for each column
+    of node_values in one sparse product. Opponents with a NaN value are left out
+    (NaN if no opponent has a value).
+    """
+    known = ~np.isnan(node_values)
+    totals = counts @ np.hstack([np.where(known, node_values, 0.0), known.astype(float)])
+    n_cols = node_values.shape[1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals[:, n_cols:] > 0, totals[:, :n_cols] / totals[:, n_cols:], np.nan)
+
+
+def compute_strength_of_schedule(matches_df: pd.DataFrame,
+                                 info_string: str,
+                                 ratings_df: Optional[pd.DataFrame] = None,
+                                 winrates_df: Optional[pd.DataFrame] = None,
+                                 rating_col: Optional[str] = None,
+                                 winrate_col: Optional[str] = None,
+                                 by: Optional[List[str]] = None,
+                                 events_df: Optional[pd.DataFrame] = None,
+                                 second_order: bool = True) -> pd.DataFrame:
+    """
+    Strength of schedule of every player (in every slice) as sparse matrix products:
+    the player x opponent match-count matrix times the opponent rating and winrate vectors.
+
+    The second-order ("opponents' opponents") values average the first-order values of each
+    opponent the same way, i.e. one more product with the same matrix.
+
+    Args:
+        matches_df (pd.DataFrame): Matches containing 'winnerId' and 'loserId' (plus the by columns).
+        info_string (str): Suffix for the data columns, e.g. "Overall".
+        ratings_df (pd.DataFrame, optional): Ratings_Summary (get_final_player_stats). Without it
+                                             the rating columns are skipped.
+        winrates_df (pd.DataFrame, optional): Winrates (compute_winrates). Defaults to the match
+                                              win rates within matches_df (and within each slice).
+        rating_col (str, optional): Rating column. Defaults to the first 'ratingFinal' column.
+        winrate_col (str, optional): Winrate column. Defaults to the first 'MatchWinRate' column.
+        by (List[str], optional): Slice columns, e.g. ['year', 'TableSponsor', 'EventType'].
+                                  Defaults to one slice of all matches.
+        events_df (pd.DataFrame, optional): Master events, for by columns missing from matches_df.
+        second_order (bool, optional): Add the opponents' opponents columns. Defaults to True.
+
+    Returns:
+        pd.DataFrame: playerId (and the by columns), TotalMatches, AvgOpponentRating,
+                      AvgOpponentWinRate and, with second_order, AvgOpponentsOpponentRating and
+                      AvgOpponentsOpponentWinRate; one row per player with matches in each slice,
+                      sorted by playerId.
+    """
+    if (info_string == "") or (not isinstance(info_string, str)) or (info_string.isspace()):
+        print(f"❌ Please specify a valid info_string: {info_string}")
+        return None
+
+    schedule = build_schedule_matrix(matches_df, by, events_df)
+
+    # --- 1. Per-node vectors to average over opponents ---
+    vectors = {}
+    if ratings_df is not None:
+        rating_col = rating_col or next(col for col in ratings_df.columns if col.startswith('ratingFinal'))
+        vectors['Rating'] = schedule.tile(_player_vector(schedule, ratings_df, rating_col))
+    if winrates_df is not None:
+        winrate_col = winrate_col or next(col for col in winrates_df.columns if col.startswith('MatchWinRate'))
+        vectors['WinRate'] = schedule.tile(_player_vector(schedule, winrates_df, winrate_col))
+    else:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vectors['WinRate'] = np.where(schedule.matches > 0, schedule.wins / schedule.matches * 100, np.nan)
+
+    # --- 2. One sparse product per order for every vector, player and slice ---
+    labels = list(vectors)
+    first = _opponent_average(schedule.counts, np.column_stack(list(vectors.values())))
+    data_cols = {f"AvgOpponent{label}": first[:, i] for i, label in enumerate(labels)}
+    if second_order:
+        second = _opponent_average(schedule.counts, first)
+        data_cols.update({f"AvgOpponentsOpponent{label}": second[:, i] for i, label in enumerate(labels)})
+
+    # --- 3. One row per (slice, player) with matches ---
+    nodes = np.flatnonzero(schedule.matches)
+    slice_of_node, player_of_node = np.divmod(nodes, schedule.n_players)
+
+    sos_df = pd.DataFrame({'playerId': schedule.player_ids[player_of_node]})
+    for col in schedule.slice_labels.columns:
+        sos_df[col] = schedule.slice_labels[col].to_numpy()[slice_of_node]
+    sos_df[f"TotalMatches ({info_string})"] = schedule.matches[nodes]
+    for col, values in data_cols.items():
+        sos_df[f"{col} ({info_string})"] = np.round(values[nodes], 2)
+
+    return sos_df.sort_values(by=['playerId'] + list(schedule.slice_labels.columns), kind='stable').reset_index(drop=True)
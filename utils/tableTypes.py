@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+
+from utils.winrates import WINRATE_TOTALS, winrate_columns
+
+UNKNOWN_LABEL = 'Unknown'
+
+# Pseudo-counts pulling a player's per-table rates towards their rate on all tables
+DEFAULT_PRIOR_MATCHES = 20
+DEFAULT_PRIOR_POINTS = 400
+
+
+def sponsor_lookup(events_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dense eventId -> TableSponsor lookup array.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: sponsor code per eventId (indexed by eventId, codes of
+                                       events without a sponsor point to UNKNOWN_LABEL) and the
+                                       sorted sponsor labels (UNKNOWN_LABEL last).
+    """
+    events_df = events_df.drop_duplicates(subset='eventId')
+    event_ids = pd.to_numeric(events_df['eventId'], errors='coerce')
+    events_df, event_ids = events_df[event_ids.notna()], event_ids.dropna().to_numpy(dtype=np.int64)
+
+    sponsors = events_df['TableSponsor'].astype('string').str.strip().replace('', pd.NA)
+    codes, labels = pd.factorize(sponsors, sort=True)
+    labels = np.append(np.asarray(labels, dtype=object), UNKNOWN_LABEL)
+    codes = np.where(codes < 0, len(labels) - 1, codes)
+
+    lookup = np.full(int(event_ids.max()) + 1 if len(event_ids) else 0, len(labels) - 1, dtype=np.int32)
+    lookup[event_ids] = codes
+    return lookup, labels
+
+
+def build_table_type_aggregates(matches_df: pd.DataFrame, events_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Match, set and point totals per player x TableSponsor.
+
+    The sponsor of every match is one indexing of the dense eventId lookup (sponsor_lookup)
+    instead of a merge; the winner and loser views are stacked and every total is reduced
+    over the combined (player, sponsor) index with np.bincount, as in compute_winrates.
+
+    Args:
+        matches_df (pd.DataFrame): Matches with 'winnerId', 'loserId', 'eventId', 'winnerSets',
+                                   'loserSets', 'winnerTotalPoints' and 'loserTotalPoints'.
+        events_df (pd.DataFrame): Master events with 'eventId' and 'TableSponsor'.
+
+    Returns:
+        pd.DataFrame: playerId, TableSponsor and the WINRATE_TOTALS, one row per player and
+                      sponsor they played on, sorted by playerId then TableSponsor.
+    """
+    matches_df = matches_df[matches_df['winnerId'].notna() & matches_df['loserId'].notna()]
+    lookup, labels = sponsor_lookup(events_df)
+    n_sponsors = len(labels)
+
+    event_ids = pd.to_numeric(matches_df['eventId'], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    in_lookup = (event_ids >= 0) & (event_ids < len(lookup))
+    sponsor_codes = np.where(in_lookup, lookup[np.where(in_lookup, event_ids, 0)], n_sponsors - 1) \
+        if len(lookup) else np.full(len(event_ids), n_sponsors - 1)
+
+    def count(col):
+        return pd.to_numeric(matches_df[col], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+
+    n_matches = len(matches_df)
+    winner_sets, loser_sets = count('winnerSets'), count('loserSets')
+    winner_points, loser_points = count('winnerTotalPoints'), count('loserTotalPoints')
+
+    # --- 1. Stacked winner and loser views on one (player, sponsor) index ---
+    player_idx, player_ids = pd.factorize(
+        np.concatenate([matches_df['winnerId'].to_numpy(dtype=np.int64), matches_df['loserId'].to_numpy(dtype=np.int64)]),
+        sort=True)
+    cell = player_idx * n_sponsors + np.tile(sponsor_codes, 2)
+    n_cells = len(player_ids) * n_sponsors
+
+    stacked_totals = {
+        'TotalWins': np.repeat([1, 0], n_matches),
+        'TotalLosses': np.repeat([0, 1], n_matches),
+        'TotalSetsWon': np.concatenate([winner_sets, loser_sets]),
+        'TotalSetsLost': np.concatenate([loser_sets, winner_sets]),
+        'TotalPointsWon': np.concatenate([winner_points, loser_points]),
+        'TotalPointsLost': np.concatenate([loser_points, winner_points]),
+    }
+
+    # --- 2. Grouped reductions, keeping the non-empty cells ---
+    played = np.bincount(cell, minlength=n_cells)
+    cells = np.flatnonzero(played)
+    aggregates_df = pd.DataFrame({
+        'playerId': np.asarray(player_ids, dtype=np.int64)[cells // n_sponsors],
+        'TableSponsor': pd.Categorical.from_codes(cells % n_sponsors, categories=labels),
+    })
+    for col in WINRATE_TOTALS:
+        totals = np.bincount(cell, weights=stacked_totals[col], minlength=n_cells)
+        aggregates_df[col] = np.rint(totals[cells]).astype(np.int64)
+
+    return aggregates_df
+
+
+def table_type_winrates(aggregates_df: pd.DataFrame, info_string: str) -> pd.DataFrame:
+    """
+    Match, set and point win rates per player x TableSponsor, named as compute_winrates does.
+    """
+    if (info_string == "") or (not isinstance(info_string, str)) or (info_string.isspace()):
+        print(f"❌ Please specify a valid info_string: {info_string}")
+        return None
+
+    return winrate_columns(aggregates_df, info_string)
+
+
+def _shrunk_effect(won: np.ndarray, played: np.ndarray, player_won: np.ndarray, player_played: np.ndarray,
+                   prior: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Raw rate, shrunk rate and shrunk effect (percentage points) of one table against the
+    player's rate on all tables: shrunk = (won + prior * overall) / (played + prior).
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        overall = np.nan_to_num(player_won / player_played)
+        raw = np.nan_to_num(won / played)
+    shrunk = (won + prior * overall) / (played + prior)
+    return raw * 100, shrunk * 100, (shrunk - overall) * 100
+
+
+def compute_table_type_effects(aggregates_df: pd.DataFrame,
+                               prior_matches: float = DEFAULT_PRIOR_MATCHES,
+                               prior_points: float = DEFAULT_PRIOR_POINTS,
+                               min_matches: int = 0) -> pd.DataFrame:
+    """
+    How much better or worse each player does on each table than on all tables.
+
+    Per player x TableSponsor, the match and point win rates are shrunk towards the player's
+    rate on all tables by prior_matches / prior_points pseudo-observations (empirical Bayes),
+    so a few matches on a table give a small effect rather than a noisy one.
+
+    Args:
+        aggregates_df (pd.DataFrame): Output of build_table_type_aggregates (any pre-filtered subset of players).
+        prior_matches (float, optional): Pseudo-matches of the match win rate prior. Defaults to 20.
+        prior_points (float, optional): Pseudo-points of the point win rate prior. Defaults to 400.
+        min_matches (int, optional): Only keep cells with at least this many matches. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: playerId, TableSponsor, TotalMatches, MatchWinRate, MatchWinRateAll,
+                      MatchWinRateShrunk, MatchWinRateEffect, TotalPointsPlayed, PointWinRate,
+                      PointWinRateAll, PointWinRateShrunk and PointWinRateEffect (rates and
+                      effects in percentage points).
+    """
+    wins = aggregates_df['TotalWins'].to_numpy(dtype=float)
+    matches = wins + aggregates_df['TotalLosses'].to_numpy(dtype=float)
+    points_won = aggregates_df['TotalPointsWon'].to_numpy(dtype=float)
+    points = points_won + aggregates_df['TotalPointsLost'].to_numpy(dtype=float)
+
+    # Player totals over all tables, broadcast back to the cells
+    player_idx, _ = pd.factorize(aggregates_df['playerId'])
+
+    def player_total(values):
+        return np.bincount(player_idx, weights=values)[player_idx]
+
+    match_rate, match_shrunk, match_effect = _shrunk_effect(
+        wins, matches, player_total(wins), player_total(matches), prior_matches)
+    point_rate, point_shrunk, point_effect = _shrunk_effect(
+        points_won, points, player_total(points_won), player_total(points), prior_points)
+
+    effects_df = pd.DataFrame({
+        'playerId': aggregates_df['playerId'].to_numpy(),
+        'TableSponsor': aggregates_df['TableSponsor'].to_numpy(),
+        'TotalMatches': matches.astype(np.int64),
+        'MatchWinRate': np.round(match_rate, 2),
+        'MatchWinRateAll': np.round(player_total(wins) / player_total(matches) * 100, 2),
+        'MatchWinRateShrunk': np.round(match_shrunk, 2),
+        'MatchWinRateEffect': np.round(match_effect, 2),
+        'TotalPointsPlayed': points.astype(np.int64),
+        'PointWinRate': np.round(point_rate, 2),
+        'PointWinRateAll': np.round(np.nan_to_num(player_total(points_won) / np.maximum(player_total(points), 1)) * 100, 2),
+        'PointWinRateShrunk': np.round(point_shrunk, 2),
+        'PointWinRateEffect': np.round(point_effect, 2),
+    })
+    return effects_df[effects_df['TotalMatches'] >= min_matches].reset_index(drop=True)
+
+
+def get_table_type_leaders(effects_df: pd.DataFrame, table_sponsor: str, players_df: Optional[pd.DataFrame] = None,
+                           top_n: int = 20, by: str = 'MatchWinRateEffect', ascending: bool = False) -> pd.DataFrame:
+    """
+    The top_n players with the largest (or, with ascending, smallest) effect on one table,
+    with PlayerName / Gender / CountryName joined from players_df when given.
+    """
+    leaders_df = effects_df[effects_df['TableSponsor'] == table_sponsor]
+    leaders_df = leaders_df.sort_values(by=by, ascending=ascending).head(top_n)
+    if players_df is not None:
+        player_cols = [col for col in ['playerId', 'PlayerName', 'Gender', 'CountryName'] if col in players_df.columns]
+        leaders_df = leaders_df.merge(players_df[player_cols].drop_duplicates(subset='playerId'), on='playerId', how='left')
+    return leaders_df.reset_index(drop=True)
@@ -0,0 +1,195 @@
+import os
+import re
+import glob
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from utils.ratingIndex import RatingIndex, add_pre_match_ratings
+from utils.winrates import WINRATE_TOTALS, winrate_columns
+
+# --- Path Definitions ---
+# This pattern ensures paths are relative to this file
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR) # Goes up one level from /utils
+DEFAULT_WINRATE_CUBE_DIR = os.path.join(PROJECT_ROOT, 'Data', 'Master', 'Winrates_Cube')
+
+CUBE_DIMENSIONS = ['playerId', 'year', 'TableSponsor', 'EventType', 'opponentBand']
+
+# Opponent pre-match rating bands (upper edges); opponents without a rating are 'Unrated'
+DEFAULT_RATING_BANDS = [1400, 1600, 1800, 2000]
+UNRATED_BAND = 'Unrated'
+UNKNOWN_LABEL = 'Unknown'
+
+
+def rating_band_labels(band_edges: Sequence[float] = DEFAULT_RATING_BANDS) -> List[str]:
+    """
+    e.g. [1400, 1600] -> ['<1400', '1400-1600', '1600+']
+    """
+    edges = [int(edge) for edge in band_edges]
+    return [f"<{edges[0]}"] + [f"{low}-{high}" for low, high in zip(edges, edges[1:])] + [f"{edges[-1]}+"]
+
+
+def _opponent_bands(opponent_rating: np.ndarray, band_edges: Sequence[float]) -> pd.Categorical:
+    labels = rating_band_labels(band_edges) + [UNRATED_BAND]
+    codes = np.searchsorted(np.asarray(band_edges, dtype=float), opponent_rating, side='right')
+    codes = np.where(np.isnan(opponent_rating), len(labels) - 1, codes)
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+
+def build_winrate_cube(matches_df: pd.DataFrame,
+                       events_df: Optional[pd.DataFrame] = None,
+                       rating_index: Optional[RatingIndex] = None,
+                       band_edges: Sequence[float] = DEFAULT_RATING_BANDS) -> pd.DataFrame:
+    """
+    Pre-aggregates wins, losses, sets and points per
+    player x year x TableSponsor x EventType x opponent rating band.
+
+    Every match adds a winner row and a loser row (as in compute_winrates); the opponent
+    band is the opponent's rating just before the match, looked up in rating_index.
+    Only non-empty cells are stored, so the cube stays close to the size of the match table
+    and any slice is answered by rollup_winrates without scanning matches again.
+
+    Args:
+        matches_df (pd.DataFrame): Matches with 'winnerId', 'loserId', 'matchDate', 'eventId',
+                                   'winnerSets', 'loserSets', 'winnerTotalPoints', 'loserTotalPoints'.
+        events_df (pd.DataFrame, optional): Master events; 'TableSponsor' and 'EventType' are
+                                            joined on eventId unless matches_df already has them.
+        rating_index (RatingIndex, optional): For the opponent bands (build_rating_index).
+                                              Without it every band is 'Unrated'.
+        band_edges (Sequence[float], optional): Rating band edges. Defaults to DEFAULT_RATING_BANDS.
+
+    Returns:
+        pd.DataFrame: CUBE_DIMENSIONS (categoricals, playerId int) and the WINRATE_TOTALS counts.
+    """
+    print(f"--- 🧊 Building winrate cube from {len(matches_df)} matches ---")
+    matches_df = matches_df[matches_df['winnerId'].notna() & matches_df['loserId'].notna()]
+
+    event_cols = [col for col in ['TableSponsor', 'EventType'] if col not in matches_df.columns]
+    if event_cols and events_df is not None:
+        matches_df = matches_df.merge(events_df[['eventId'] + event_cols].drop_duplicates(subset='eventId'),
+                                      on='eventId', how='left')
+
+    if rating_index is not None:
+        matches_df = add_pre_match_ratings(matches_df, rating_index)
+        winner_rating = matches_df['winnerRatingAsOf'].to_numpy(dtype=float)
+        loser_rating = matches_df['loserRatingAsOf'].to_numpy(dtype=float)
+    else:
+        winner_rating = loser_rating = np.full(len(matches_df), np.nan)
+
+    def dimension(col):
+        values = matches_df[col] if col in matches_df.columns else pd.Series(UNKNOWN_LABEL, index=matches_df.index)
+        return values.fillna(UNKNOWN_LABEL).astype(str).to_numpy()
+
+    def count(col):
+        return pd.to_numeric(matches_df[col], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+
+    n_matches = len(matches_df)
+    year = np.tile(matches_df['matchDate'].astype(str).str[:4].to_numpy(), 2)
+    winner_sets, loser_sets = count('winnerSets'), count('loserSets')
+    winner_points, loser_points = count('winnerTotalPoints'), count('loserTotalPoints')
+
+    # --- Stacked winner and loser views ---
+    stacked_df = pd.DataFrame({
+        'playerId': np.concatenate([matches_df['winnerId'].to_numpy(dtype=np.int64),
+                                    matches_df['loserId'].to_numpy(dtype=np.int64)]),
+        'year': pd.Categorical(year),
+        'TableSponsor': pd.Categorical(np.tile(dimension('TableSponsor'), 2)),
+        'EventType': pd.Categorical(np.tile(dimension('EventType'), 2)),
+        'opponentBand': _opponent_bands(np.concatenate([loser_rating, winner_rating]), band_edges),
+        'TotalWins': np.repeat([1, 0], n_matches),
+        'TotalLosses': np.repeat([0, 1], n_matches),
+        'TotalSetsWon': np.concatenate([winner_sets, loser_sets]),
+        'TotalSetsLost': np.concatenate([loser_sets, winner_sets]),
+        'TotalPointsWon': np.concatenate([winner_points, loser_points]),
+        'TotalPointsLost': np.concatenate([loser_points, winner_points]),
+    })
+
+    cube_df = stacked_df.groupby(CUBE_DIMENSIONS, observed=True, sort=True)[WINRATE_TOTALS].sum().reset_index()
+    print(f"✅ Winrate cube built: {len(cube_df)} cells.")
+    return cube_df
+
+
+def slice_cube(cube_df: pd.DataFrame, filters: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+    """
+    Cells of the cube matching {dimension: value or list of values}, e.g.
+    {'year': '2024', 'EventType': 'WTT Champions'}.
+    """
+    mask = np.ones(len(cube_df), dtype=bool)
+    for dim, value in (filters or {}).items():
+        if dim not in CUBE_DIMENSIONS:
+            raise ValueError(f"Unknown cube dimension: {dim} (use {CUBE_DIMENSIONS})")
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        if dim == 'year':
+            values = [str(v) for v in values]
+        mask &= cube_df[dim].isin(values).to_numpy()
+    return cube_df[mask]
+
+
+def rollup_winrates(cube_df: pd.DataFrame, info_string: str,
+                    filters: Optional[Dict[str, object]] = None,
+                    by: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Winrates for any slice of the cube, rolled up from the pre-aggregated cells.
+
+    e.g. rollup_winrates(cube_df, "WTT Champions 2024", {'year': 2024, 'EventType': 'WTT Champions'})
+    or   rollup_winrates(cube_df, "By Table", by=['TableSponsor']).
+
+    Args:
+        cube_df (pd.DataFrame): Output of build_winrate_cube.
+        info_string (str): Suffix for the data columns.
+        filters (Dict[str, object], optional): Dimension values to keep.
+        by (List[str], optional): Dimensions kept next to playerId. Defaults to per player only.
+
+    Returns:
+        pd.DataFrame: Same columns as compute_winrates (plus the by dimensions), sorted by playerId.
+    """
+    if (info_string == "") or (not isinstance(info_string, str)) or (info_string.isspace()):
+        print(f"❌ Please specify a valid info_string: {info_string}")
+        return None
+
+    keys = ['playerId'] + [dim for dim in (by or []) if dim != 'playerId']
+    sliced_df = slice_cube(cube_df, filters)
+    totals_df = sliced_df.groupby(keys, observed=True, sort=True)[WINRATE_TOTALS].sum().reset_index()
+    return winrate_columns(totals_df, info_string)
+
+
+def save_winrate_cube(cube_df: pd.DataFrame, cube_dir: str = DEFAULT_WINRATE_CUBE_DIR) -> str:
+    """
+    Saves the cube as {date}_winrate_cube.csv.
+    """
+    os.makedirs(cube_dir, exist_ok=True)
+    date_string = datetime.now().strftime("%Y%m%d")
+    cube_filepath = os.path.join(cube_dir, f"{date_string}_winrate_cube.csv")
+    cube_df.to_csv(cube_filepath, index=False)
+    print(f"✅✅Saved winrate cube to {cube_filepath}")
+    return cube_filepath
+
+
+def get_latest_winrate_cube(cube_dir: str = DEFAULT_WINRATE_CUBE_DIR,
+                            band_edges: Sequence[float] = DEFAULT_RATING_BANDS) -> pd.DataFrame:
+    """
+    Reads the latest saved cube, with the dimensions back as categoricals and the
+    opponent bands in rating order (band_edges must be the ones the cube was built with).
+    """
+    search_pattern = re.compile(r'^\d{8}_winrate_cube\.csv$')
+    files = sorted(file for file in glob.glob(os.path.join(cube_dir, "*.csv"))
+                   if search_pattern.match(os.path.basename(file)))
+    if not files:
+        print(f"❌ No existing winrate cube found in {cube_dir}")
+        return pd.DataFrame(columns=CUBE_DIMENSIONS + WINRATE_TOTALS)
+
+    latest_file = files[-1]
+    try:
+        cube_df = pd.read_csv(latest_file, dtype={dim: 'category' for dim in CUBE_DIMENSIONS[1:]})
+        band_labels = rating_band_labels(band_edges) + [UNRATED_BAND]
+        if set(cube_df['opponentBand'].cat.categories).issubset(band_labels):
+            cube_df['opponentBand'] = cube_df['opponentBand'].cat.set_categories(band_labels)
+        else:
+            print(f"❌ Opponent bands of {latest_file} do not match band_edges {list(band_edges)}, keeping their saved order")
+        print(f"✅ {len(cube_df)} winrate cube cells found in latest MASTER: {latest_file}")
+        return cube_df
+    except Exception as e:
+        print(f"❌ Error reading latest winrate cube, {latest_file}: {e}")
+        return pd.DataFrame(columns=CUBE_DIMENSIONS + WINRATE_TOTALS)
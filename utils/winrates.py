@@ -1,4 +1,5 @@
 from flag import info
+import numpy as np
 import pandas as pd
 import re 
 from datetime import datetime
@@ -188,6 +189,95 @@ def compute_point_winrates(master_matches_df: pd.DataFrame, info_string: str) ->
 
     return point_stats    
 
+# Per-player totals summed by compute_winrates, in stacked (long format) column order
+WINRATE_TOTALS = ['TotalWins', 'TotalLosses', 'TotalSetsWon', 'TotalSetsLost', 'TotalPointsWon', 'TotalPointsLost']
+
+
+def compute_winrates(master_matches_df: pd.DataFrame, info_string: str) -> pd.DataFrame:
+    """
+    Match, set and point win rates for every player in one pass.
+
+    Same output as outer-merging compute_match_winrates, compute_set_winrates and
+    compute_point_winrates on 'playerId' (as in notebook 12), but the winner and loser
+    views are stacked once into int arrays, the players are mapped to dense indices
+    once, and every total is reduced over those indices with np.bincount.
+
+    Args:
+        master_matches_df (pd.DataFrame): Matches containing 'winnerId', 'loserId', 'winnerSets',
+                                          'loserSets', 'winnerTotalPoints' and 'loserTotalPoints'.
+                                          PRE-FILTER it for a slice (e.g. by year or event type).
+        info_string (str): Suffix for the data columns, e.g. "Overall".
+
+    Returns:
+        pd.DataFrame: playerId and the match, set and point totals and win rates, sorted by playerId.
+    """
+    if (info_string == "") or (not isinstance(info_string, str)) or (info_string.isspace()):
+        print(f"❌ Please specify a valid info_string: {info_string}")
+        return None
+
+    winner_ids = master_matches_df['winnerId']
+    loser_ids = master_matches_df['loserId']
+    n_matches = len(master_matches_df)
+
+    def as_int(col):
+        return pd.to_numeric(master_matches_df[col], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+
+    winner_sets, loser_sets = as_int('winnerSets'), as_int('loserSets')
+    winner_points, loser_points = as_int('winnerTotalPoints'), as_int('loserTotalPoints')
+
+    # --- 1. Stack winner and loser views: one int column per (match, player), one row per total ---
+    stacked_totals = np.empty((len(WINRATE_TOTALS), 2 * n_matches), dtype=np.int64)
+    stacked_totals[0, :n_matches], stacked_totals[0, n_matches:] = 1, 0
+    stacked_totals[1, :n_matches], stacked_totals[1, n_matches:] = 0, 1
+    for row, winner_view, loser_view in [(2, winner_sets, loser_sets), (4, winner_points, loser_points)]:
+        stacked_totals[row, :n_matches], stacked_totals[row, n_matches:] = winner_view, loser_view
+        stacked_totals[row + 1, :n_matches], stacked_totals[row + 1, n_matches:] = loser_view, winner_view
+
+    # Dense player index, numbered in playerId order; rows with a missing id go to an extra last bin
+    player_idx, player_ids = pd.factorize(pd.concat([winner_ids, loser_ids], ignore_index=True), sort=True)
+    n_players = len(player_ids)
+    player_idx[player_idx < 0] = n_players
+
+    # --- 2. Grouped reduction of every total over the same dense index ---
+    totals = np.column_stack([
+        np.bincount(player_idx, weights=stacked_totals[row], minlength=n_players + 1)[:n_players]
+        for row in range(len(WINRATE_TOTALS))
+    ])
+    totals = np.rint(totals).astype(np.int64)
+
+    stats = pd.DataFrame(totals, columns=WINRATE_TOTALS)
+    stats.insert(0, 'playerId', np.asarray(player_ids))
+    return winrate_columns(stats, info_string)
+
+
+def winrate_columns(totals_df: pd.DataFrame, info_string: str) -> pd.DataFrame:
+    """
+    Adds match / set / point totals and win rates to per-player WINRATE_TOTALS
+    and names the columns as compute_winrates does.
+    """
+    stats = totals_df.copy()
+
+    def rate(won, played):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (won / played * 100).fillna(0).round(2)
+
+    stats['TotalMatches'] = stats['TotalWins'] + stats['TotalLosses']
+    stats['MatchWinRate'] = rate(stats['TotalWins'], stats['TotalMatches'])
+    stats['TotalSetsPlayed'] = stats['TotalSetsWon'] + stats['TotalSetsLost']
+    stats['SetWinRate'] = rate(stats['TotalSetsWon'], stats['TotalSetsPlayed'])
+    stats['TotalPointsPlayed'] = stats['TotalPointsWon'] + stats['TotalPointsLost']
+    stats['PointWinRate'] = rate(stats['TotalPointsWon'], stats['TotalPointsPlayed'])
+
+    data_cols = [
+        'TotalWins', 'TotalLosses', 'TotalMatches', 'MatchWinRate',
+        'TotalSetsWon', 'TotalSetsLost', 'TotalSetsPlayed', 'SetWinRate',
+        'TotalPointsWon', 'TotalPointsLost', 'TotalPointsPlayed', 'PointWinRate',
+    ]
+    key_cols = [col for col in stats.columns if col not in data_cols and col not in WINRATE_TOTALS]
+    stats = stats[key_cols + data_cols]
+    return stats.rename(columns={col: f"{col} ({info_string})" for col in data_cols})
+
+
 def save_winrates(df, info_string, winrates_dir ="../Data/Master/Winrates/" ):
 
     if (info_string == "") or (not isinstance(info_string, str)) or (info_string.isspace()):